@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Benchmark of the time taken by `import ipydatawidgets`.
+
+The dependencies (numpy, ipywidgets) are imported first, so that only the
+import of ipydatawidgets itself is timed. Each sample runs in a fresh
+interpreter. Exits with an error if the median exceeds the given budget.
+
+Usage: python benchmarks/import_time.py [n_samples] [budget_ms]
+"""
+
+import statistics
+import subprocess
+import sys
+
+
+_code = '''
+import time
+import numpy, ipywidgets
+start = time.perf_counter()
+import ipydatawidgets
+print(time.perf_counter() - start)
+'''
+
+
+def main(n_samples=10, budget_ms=100.0):
+    samples = [
+        float(subprocess.check_output([sys.executable, '-c', _code])) * 1e3
+        for _ in range(n_samples)
+    ]
+    median = statistics.median(samples)
+    print('import ipydatawidgets: %.1f ms median, %.1f ms min (%d samples)' % (
+        median, min(samples), n_samples))
+    if median > budget_ms:
+        sys.exit('Import time exceeds budget of %.1f ms' % budget_ms)
+
+
+if __name__ == '__main__':
+    main(*(float(arg) if i else int(arg) for i, arg in enumerate(sys.argv[1:])))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Load test of data widget workloads against many simulated front-ends.
+
+Captures the traffic of a workload with a LoadHarness, and reports the
+throughput, latency percentiles and kernel peak memory for the given
+number of clients. The workloads are:
+
+- ndarray: Repeated full updates of an NDArrayWidget.
+- union: DataImages sharing one NDArrayWidget through their DataUnion,
+  with the shared data updated by segments.
+- image: Repeated updates of a PNG encoded DataImage.
+
+Usage: python benchmarks/load_test.py [workload] [n_clients] [bandwidth_mbit] [trace_file]
+
+If a trace file is given, the captured trace is saved to it, and can be
+replayed later with `ipydatawidgets.loadtest.replay`.
+"""
+
+import sys
+
+import numpy as np
+
+from ipydatawidgets import DataImage, NDArrayWidget
+from ipydatawidgets.loadtest import LoadHarness, SimulatedClient
+
+
+def ndarray_workload(harness, n_updates=50):
+    w = NDArrayWidget(np.zeros((512, 512), dtype=np.float32))
+    for i in range(n_updates):
+        w.array = np.random.rand(512, 512).astype(np.float32)
+        harness.poll()
+
+
+def union_workload(harness, n_updates=50, n_images=4):
+    shared = NDArrayWidget(np.zeros((256, 256), dtype=np.float32))
+    images = [DataImage(data=shared, value_range=(0, 1)) for _ in range(n_images)]
+    for i in range(n_updates):
+        row = (16 * i) % 256
+        shared.array[row:row + 16] = np.random.rand(16, 256)
+        shared.send_segment([(row * 256, (row + 16) * 256)])
+        harness.poll()
+    return images
+
+
+def image_workload(harness, n_updates=50):
+    image = DataImage(data=np.zeros((256, 256, 4), dtype=np.uint8), format='png')
+    for i in range(n_updates):
+        data = np.zeros((256, 256, 4), dtype=np.uint8)
+        data[..., 3] = 255
+        data[(4 * i) % 256:, :, :3] = 200
+        image.data = data
+        harness.poll()
+
+
+workloads = {
+    'ndarray': ndarray_workload,
+    'union': union_workload,
+    'image': image_workload,
+}
+
+
+def main(workload='ndarray', n_clients=20, bandwidth_mbit=100, trace_file=None):
+    clients = [SimulatedClient(bandwidth=float(bandwidth_mbit) * 125e3)
+               for _ in range(int(n_clients))]
+    harness = LoadHarness(clients)
+    with harness.capture():
+        workloads[workload](harness)
+    if trace_file:
+        harness.trace.save(trace_file)
+    print('%s workload:' % workload)
+    print(harness.report())
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
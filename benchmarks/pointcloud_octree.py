@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Benchmark of building and querying the octree of a PointCloudWidget.
+
+Builds the octree of a random point cloud, and selects the nodes for a
+view of half of the cloud within a point budget. Reports the build time,
+the number of nodes, and the selection time.
+
+Usage: python benchmarks/pointcloud_octree.py [n_points] [node_size] [point_budget]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from ipydatawidgets.ndarray.pointcloud import PointCloudWidget, build_octree
+
+
+def main(n_points=10000000, node_size=65536, point_budget=1000000):
+    positions = np.random.default_rng(0).random((n_points, 3)).astype(np.float32)
+    start = time.perf_counter()
+    order, nodes, origin, size = build_octree(positions, node_size)
+    print('build: %.2f s, %d nodes, depth %d' % (
+        time.perf_counter() - start, len(nodes), nodes[:, 0].max()))
+
+    w = PointCloudWidget(positions, node_size=node_size, point_budget=point_budget)
+    # Everything with x below 0.5
+    planes = [[-1, 0, 0, 0.5], [1, 0, 0, 0], [0, 1, 0, 0], [0, -1, 0, 1], [0, 0, 1, 0], [0, 0, -1, 1]]
+    start = time.perf_counter()
+    selected = w.select_nodes(planes, camera_position=[0, 0.5, 0.5])
+    print('select: %.1f ms, %d nodes, %d points' % (
+        (time.perf_counter() - start) * 1e3, len(selected), w.nodes[selected, 4].sum()))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Benchmark of DataUnion bookkeeping with many owners sharing a few widgets.
+
+Repeatedly creates many owners of a DataUnion trait, that all use one of
+a few shared data widgets, assigns new values, and closes them again.
+Reports the time per assignment, and the memory still allocated after
+each round, which should stay flat.
+
+Usage: python benchmarks/union_registry.py [n_owners] [n_rounds]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from ipywidgets import Widget
+
+from ipydatawidgets import DataUnion, NDArrayWidget
+
+
+class Owner(Widget):
+    data = DataUnion()
+
+
+def run_round(shared, n_owners):
+    owners = [Owner(data=shared[i % len(shared)]) for i in range(n_owners)]
+    start = time.perf_counter()
+    for i, owner in enumerate(owners):
+        owner.data = shared[(i + 1) % len(shared)]
+    elapsed = time.perf_counter() - start
+    for owner in owners:
+        owner.close()
+    del owners
+    gc.collect()
+    return elapsed / n_owners
+
+
+def main(n_owners=10000, n_rounds=5):
+    shared = [NDArrayWidget(np.zeros((256, 256), dtype=np.float32)) for _ in range(4)]
+    tracemalloc.start()
+    baseline = None
+    for i in range(n_rounds):
+        per_assignment = run_round(shared, n_owners)
+        current, _ = tracemalloc.get_traced_memory()
+        if baseline is None:
+            baseline = current
+        print('round %d: %6.1f us/assignment, %+8.1f KiB retained, %d links' % (
+            i, per_assignment * 1e6, (current - baseline) / 1024,
+            sum(len(w._union_links) for w in shared)))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
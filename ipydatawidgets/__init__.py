@@ -4,8 +4,36 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
-from .ndarray import *
-from .widgets import DataWidget
 from ._version import __version__, version_info
 
 from .nbextension import _jupyter_nbextension_paths
+
+from . import ndarray as _ndarray
+from .memory import memory_report, set_memory_budget
+from .sync import batched_sync
+from .widgets import DataWidget
+
+
+__all__ = list(_ndarray.__all__) + [
+    'DataWidget',
+    'batched_sync',
+    'memory_report',
+    'set_memory_budget',
+]
+
+# Like `from .ndarray import *`, without resolving its lazy attributes
+globals().update((name, getattr(_ndarray, name)) for name in _ndarray.__all__
+                 if name not in _ndarray._lazy_attributes)
+
+
+def __getattr__(name):
+    # The lazily imported attributes of ipydatawidgets.ndarray
+    if name in _ndarray.__all__:
+        value = getattr(_ndarray, name)
+        globals()[name] = value
+        return value
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Compact embedding of widget state with data widgets.
+
+The standard widget embedding stores every binary buffer as base64,
+uncompressed and once per occurrence. The compact format instead:
+
+- compresses array buffers that the front-end can decompress,
+- stores identical buffers only once, keyed by their SHA-256 hash,
+- optionally writes the buffers to sidecar files next to the embedding,
+  which are fetched by the front-end when needed.
+
+Buffers of data widget models are replaced by references of the form
+{'datawidgets_ref': hash} at their place in the model state, and the
+referenced buffers are stored in the 'datawidgets_buffers' entry of the
+manager state, as either {'encoding': 'base64', 'data': ...} or
+{'url': ...}. The data widget models of the jupyter-datawidgets package
+resolve the references when they are created, whether the state is
+loaded by the standard HTML embed manager, or by `loadCompactState`.
+The buffers of other models are left in the standard format.
+"""
+
+import base64
+import hashlib
+import os
+import zlib
+
+from ipywidgets.embed import embed_data
+from ipywidgets.widgets.widget import _instances
+
+from ._frontend import module_name
+
+
+buffer_ref_key = 'datawidgets_ref'
+
+
+def _compressible_traits(widget):
+    """The names of the traits whose arrays the front-end can decompress."""
+    from .ndarray.serializers import array_to_compressed_json, table_to_json
+    if widget is None:
+        return ()
+    return {name for name, trait in widget.traits(sync=True).items()
+            if trait.metadata.get('to_json') in (array_to_compressed_json, table_to_json)}
+
+
+def _decode(entry):
+    if entry.get('encoding', 'base64') == 'base64':
+        return base64.standard_b64decode(entry['data'])
+    elif entry['encoding'] == 'hex':
+        return bytes.fromhex(entry['data'])
+    raise ValueError('Unknown buffer encoding: %r' % entry['encoding'])
+
+
+def _get_container(state, path):
+    """Get the dict or list holding the value at a path of keys and indices."""
+    for key in path[:-1]:
+        state = state[key]
+    return state
+
+
+def _put(state, path, value):
+    """Set a value at a path of keys and indices in a state."""
+    _get_container(state, path)[path[-1]] = value
+
+
+def _copy_path(state, path):
+    """Copy the containers along a path, so setting a value does not modify `state`."""
+    state = dict(state)
+    container = state
+    for key in path[:-1]:
+        child = container[key]
+        child = list(child) if isinstance(child, list) else dict(child)
+        container[key] = child
+        container = child
+    return state
+
+
+def _find_refs(value, path=()):
+    """Yield the paths and hashes of the buffer references in a state."""
+    if isinstance(value, dict):
+        if set(value) == {buffer_ref_key}:
+            yield list(path), value[buffer_ref_key]
+            return
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return
+    for key, child in items:
+        for found in _find_refs(child, path + (key,)):
+            yield found
+
+
+def compact_manager_state(manager_state, compression_level=6,
+                          sidecar_dir=None, sidecar_url=None):
+    """Convert a widget manager state to the compact embedding format.
+
+    Parameters
+    ----------
+    manager_state : dict
+        The manager state, as given by `Widget.get_manager_state`.
+    compression_level : int
+        The zlib compression level for array buffers, or 0 for none.
+        Arrays that are already compressed are left as they are.
+    sidecar_dir : str or None
+        If given, buffers are written to files named by their hash in
+        this directory, instead of being embedded.
+    sidecar_url : str or None
+        The URL of the sidecar directory, as seen from the embedding
+        document. Defaults to `sidecar_dir`.
+
+    Returns
+    -------
+    A new manager state in the compact format.
+    """
+    if sidecar_dir is not None:
+        os.makedirs(sidecar_dir, exist_ok=True)
+        if sidecar_url is None:
+            sidecar_url = sidecar_dir.replace(os.sep, '/')
+    buffers = {}
+    models = {}
+    for model_id, model in manager_state['state'].items():
+        model = dict(model)
+        models[model_id] = model
+        if 'buffers' not in model or model.get('model_module') != module_name:
+            # Other front-end models only understand standard buffers
+            continue
+        compressible = _compressible_traits(_instances.get(model_id))
+        state = model['state']
+        for entry in model.pop('buffers'):
+            path = list(entry['path'])
+            data = _decode(entry)
+            if (compression_level > 0 and path[0] in compressible and
+                    path[-1] == 'buffer'):
+                data = zlib.compress(data, compression_level)
+                path[-1] = 'compressed_buffer'
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in buffers:
+                if sidecar_dir is None:
+                    buffers[digest] = {
+                        'encoding': 'base64',
+                        'data': base64.standard_b64encode(data).decode('ascii'),
+                    }
+                else:
+                    filename = digest + '.bin'
+                    with open(os.path.join(sidecar_dir, filename), 'wb') as f:
+                        f.write(data)
+                    buffers[digest] = {'url': sidecar_url.rstrip('/') + '/' + filename}
+            state = _copy_path(state, path)
+            _put(state, path, {buffer_ref_key: digest})
+        model['state'] = state
+    compact = dict(manager_state)
+    compact['state'] = models
+    compact['datawidgets_buffers'] = buffers
+    return compact
+
+
+def expand_manager_state(manager_state, sidecar_dir=None):
+    """Convert a compact manager state back to the standard format.
+
+    Buffers stay compressed, as the front-end serializers decompress them.
+
+    Parameters
+    ----------
+    manager_state : dict
+        A manager state in the compact format.
+    sidecar_dir : str or None
+        The directory of the sidecar files, if any.
+    """
+    stored = manager_state.get('datawidgets_buffers', {})
+    models = {}
+    for model_id, model in manager_state['state'].items():
+        model = dict(model)
+        models[model_id] = model
+        refs = list(_find_refs(model['state']))
+        if not refs:
+            continue
+        entries = list(model.get('buffers', []))
+        state = model['state']
+        for path, digest in refs:
+            buffer = stored[digest]
+            if 'url' in buffer:
+                filename = buffer['url'].rsplit('/', 1)[-1]
+                with open(os.path.join(sidecar_dir, filename), 'rb') as f:
+                    data = base64.standard_b64encode(f.read()).decode('ascii')
+            else:
+                data = buffer['data']
+            entries.append({'path': path, 'encoding': 'base64', 'data': data})
+            # Buffers are not part of the standard state
+            state = _copy_path(state, path)
+            del _get_container(state, path)[path[-1]]
+        model['state'] = state
+        model['buffers'] = entries
+    expanded = dict(manager_state)
+    expanded.pop('datawidgets_buffers', None)
+    expanded['state'] = models
+    return expanded
+
+
+def embed_data_compact(views, drop_defaults=True, state=None, compression_level=6,
+                       sidecar_dir=None, sidecar_url=None):
+    """Gets data for embedding, with the manager state in the compact format.
+
+    This is the compact counterpart of `ipywidgets.embed.embed_data`,
+    see `compact_manager_state` for the other parameters.
+
+    Returns
+    -------
+    A dictionary with the following entries:
+        manager_state: dict of the compact widget manager state data
+        view_specs: a list of widget view specs
+    """
+    data = embed_data(views, drop_defaults=drop_defaults, state=state)
+    data['manager_state'] = compact_manager_state(
+        data['manager_state'], compression_level=compression_level,
+        sidecar_dir=sidecar_dir, sidecar_url=sidecar_url)
+    return data
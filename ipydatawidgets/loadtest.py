@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Offline load testing of data widgets against simulated front-ends.
+
+A `LoadHarness` captures the comm traffic of widgets created in its
+`capture` context, without a kernel or browser. The recorded `Trace`
+is played through a set of `SimulatedClient`s, that model the network
+bandwidth, latency and decoding cost of connected front-ends, to
+report throughput and latency per client. Traces can be saved, and
+replayed later against other client configurations.
+
+Example
+-------
+>>> harness = LoadHarness([SimulatedClient(bandwidth=10e6, latency=0.05)] * 20)
+>>> with harness.capture():
+...     w = NDArrayWidget(np.zeros((512, 512), dtype=np.float32))
+...     for i in range(100):
+...         w.array = np.random.rand(512, 512).astype(np.float32)
+>>> print(harness.report())
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import comm
+    from comm.base_comm import BaseComm
+except ImportError:
+    # Before ipywidgets 8, widgets do not create their comms through the
+    # comm package, so their traffic can not be captured. Traces can
+    # still be simulated and replayed.
+    comm = None
+    BaseComm = object
+
+
+class TraceEvent(namedtuple('TraceEvent', 'time model_id msg_type method seq nbytes')):
+    """A message sent from the kernel to the front-end.
+
+    Attributes
+    ----------
+    time : float
+        When the message was sent, in seconds since the start of the trace.
+    model_id : str
+        The model id of the widget that sent the message.
+    msg_type : str
+        'comm_open', 'comm_msg' or 'comm_close'.
+    method : str or None
+        The method of the message, e.g. 'update' or 'custom'.
+    seq : int or None
+        The sequence number of the message, for data widgets.
+    nbytes : int
+        The size of the message, JSON and binary buffers together.
+    """
+    __slots__ = ()
+
+
+class Trace(object):
+    """A recording of widget traffic from the kernel."""
+
+    def __init__(self, events=None):
+        self.events = list(events or [])
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def nbytes(self):
+        return sum(e.nbytes for e in self.events)
+
+    @property
+    def duration(self):
+        return self.events[-1].time - self.events[0].time if self.events else 0.0
+
+    def save(self, path):
+        """Save the trace as JSON lines. Message contents are not stored."""
+        with open(path, 'w') as f:
+            for event in self.events:
+                f.write(json.dumps(event._asdict()) + '\n')
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(TraceEvent(**json.loads(line)) for line in f if line.strip())
+
+
+def _message_size(data, buffers):
+    size = len(json.dumps(data, default=repr))
+    for b in buffers or ():
+        size += memoryview(b).nbytes
+    return size
+
+
+class SimulatedClient(object):
+    """A model of a front-end connected to the kernel.
+
+    Messages are transferred one at a time over a link with the given
+    bandwidth, arrive after the latency, and are then decoded one at a
+    time at the given rate.
+
+    Parameters
+    ----------
+    bandwidth : float
+        The link bandwidth in bytes per second.
+    latency : float
+        The one-way latency in seconds.
+    decode_rate : float
+        How many bytes per second the front-end decodes and applies.
+    """
+
+    def __init__(self, bandwidth=12.5e6, latency=0.02, decode_rate=500e6):
+        self.bandwidth = float(bandwidth)
+        self.latency = float(latency)
+        self.decode_rate = float(decode_rate)
+
+    def __repr__(self):
+        return 'SimulatedClient(bandwidth=%g, latency=%g, decode_rate=%g)' % (
+            self.bandwidth, self.latency, self.decode_rate)
+
+
+class _Simulation(object):
+    """The state of the links and decoders of simulated clients."""
+
+    def __init__(self, clients, server_bandwidth=None):
+        self.clients = clients
+        self.server_bandwidth = server_bandwidth
+        self.server_free = 0.0
+        self.link_free = [0.0] * len(clients)
+        self.decode_free = [0.0] * len(clients)
+
+    def advance(self, event):
+        """Send a message to all clients, returning when each client applied it."""
+        applied = []
+        for j, client in enumerate(self.clients):
+            start = event.time
+            if self.server_bandwidth is not None:
+                self.server_free = max(start, self.server_free) + event.nbytes / self.server_bandwidth
+                start = self.server_free
+            self.link_free[j] = max(start, self.link_free[j]) + event.nbytes / client.bandwidth
+            arrival = self.link_free[j] + client.latency
+            self.decode_free[j] = max(arrival, self.decode_free[j]) + event.nbytes / client.decode_rate
+            applied.append(self.decode_free[j])
+        return applied
+
+
+def simulate(trace, clients, server_bandwidth=None):
+    """Play a trace through simulated clients.
+
+    Parameters
+    ----------
+    trace : Trace
+        The recorded traffic.
+    clients : list of SimulatedClient
+        The connected front-ends, that all receive every message.
+    server_bandwidth : float or None
+        The total outgoing bandwidth of the server in bytes per second,
+        shared by all clients, or None for no limit.
+
+    Returns
+    -------
+    An array of shape (n_clients, n_messages), with the times at which
+    each client applied each message.
+    """
+    simulation = _Simulation(clients, server_bandwidth)
+    applied = np.empty((len(clients), len(trace)))
+    for i, event in enumerate(trace.events):
+        applied[:, i] = simulation.advance(event)
+    return applied
+
+
+class LoadReport(object):
+    """Throughput and latency of a trace played through simulated clients."""
+
+    def __init__(self, trace, clients, applied, peak_memory=None):
+        self.trace = trace
+        self.clients = clients
+        self.peak_memory = peak_memory
+        sent = np.array([e.time for e in trace.events])
+        self.latencies = [times - sent for times in applied]
+        self.completion = [times.max() - sent.min() if len(times) else 0.0
+                           for times in applied]
+
+    def latency_percentile(self, q):
+        """A latency percentile (0-100) over all messages and clients."""
+        if not len(self.trace):
+            return 0.0
+        return float(np.percentile(np.concatenate(self.latencies), q))
+
+    @property
+    def throughput(self):
+        """The mean bytes per second applied per client."""
+        rates = [self.trace.nbytes / t for t in self.completion if t > 0]
+        return float(np.mean(rates)) if rates else 0.0
+
+    def summary(self):
+        return {
+            'messages': len(self.trace),
+            'bytes': self.trace.nbytes,
+            'clients': len(self.clients),
+            'throughput': self.throughput,
+            'latency_p50': self.latency_percentile(50),
+            'latency_p95': self.latency_percentile(95),
+            'latency_p99': self.latency_percentile(99),
+            'latency_max': self.latency_percentile(100),
+            'completion_max': max(self.completion) if self.completion else 0.0,
+            'kernel_peak_memory': self.peak_memory,
+        }
+
+    def __str__(self):
+        s = self.summary()
+        lines = [
+            '%d messages, %.1f MB, %d clients' % (
+                s['messages'], s['bytes'] / 1e6, s['clients']),
+            'throughput: %.1f MB/s per client' % (s['throughput'] / 1e6),
+            'latency: p50 %.1f ms, p95 %.1f ms, p99 %.1f ms, max %.1f ms' % tuple(
+                1e3 * s[k] for k in ('latency_p50', 'latency_p95', 'latency_p99', 'latency_max')),
+        ]
+        if s['kernel_peak_memory'] is not None:
+            lines.append('kernel peak memory: %.1f MB' % (s['kernel_peak_memory'] / 1e6))
+        return '\n'.join(lines)
+
+
+class _HarnessComm(BaseComm):
+    """A comm that records its messages in a LoadHarness."""
+
+    def __init__(self, harness, **kwargs):
+        self.harness = harness
+        super(_HarnessComm, self).__init__(**kwargs)
+
+    def publish_msg(self, msg_type, data=None, metadata=None, buffers=None, **keys):
+        self.harness._record(self, msg_type, data or {}, buffers)
+
+
+class LoadHarness(object):
+    """Captures widget traffic, and plays it through simulated clients.
+
+    Parameters
+    ----------
+    clients : list of SimulatedClient
+        The simulated front-ends.
+    server_bandwidth : float or None
+        The total outgoing bandwidth of the server, see `simulate`.
+    """
+
+    def __init__(self, clients, server_bandwidth=None):
+        self.clients = list(clients)
+        self.server_bandwidth = server_bandwidth
+        self.trace = Trace()
+        self.peak_memory = None
+        self._start = None
+        self._comms = {}
+        # Simulated in step with the capture, to know when acks are due
+        self._simulation = _Simulation(self.clients, server_bandwidth)
+        self._first_applied = []
+        self._acked = 0
+
+    @contextmanager
+    def capture(self, track_memory=True):
+        """Capture the traffic of widgets created in this context.
+
+        Parameters
+        ----------
+        track_memory : bool
+            Whether to track the peak memory allocated in the kernel
+            while capturing. This slows down allocations.
+        """
+        if comm is None:
+            raise ImportError('Capturing widget traffic requires ipywidgets 8 or later '
+                              '(the comm package)')
+        original = comm.create_comm
+        comm.create_comm = lambda **kwargs: _HarnessComm(self, **kwargs)
+        started_tracing = track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self._start is None:
+            self._start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            comm.create_comm = original
+            if started_tracing:
+                self.peak_memory = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+    def now(self):
+        """The time since capturing started, in seconds."""
+        return time.perf_counter() - self._start
+
+    def _record(self, channel, msg_type, data, buffers):
+        self._comms[channel.comm_id] = channel
+        event = TraceEvent(
+            self.now(), channel.comm_id, msg_type, data.get('method'),
+            data.get('seq'), _message_size(data, buffers))
+        self.trace.events.append(event)
+        applied = self._simulation.advance(event)
+        self._first_applied.append(min(applied) if applied else event.time)
+
+    def poll(self):
+        """Deliver the acknowledgements due at the current time.
+
+        Data widgets are acknowledged once the first client has applied
+        a message, so that producers can react to backpressure (see
+        `DataWidget.congested`), and transport tuning can measure the
+        link (see `ipydatawidgets.transport`), during a captured run.
+        """
+        now = self.now()
+        events = self.trace.events
+        # Messages are applied in order, so acks are due in order
+        while self._acked < len(events) and self._first_applied[self._acked] <= now:
+            event = events[self._acked]
+            self._acked += 1
+            channel = self._comms.get(event.model_id)
+            if event.seq is not None and channel is not None:
+                decode_time = min(event.nbytes / c.decode_rate for c in self.clients)
+                channel.handle_msg({
+                    'content': {'data': {'method': 'custom', 'content': {
+                        'method': 'ack', 'seq': event.seq, 'decode_time': decode_time}}},
+                    'buffers': [],
+                })
+
+    def report(self):
+        """Play the captured trace through the clients, and report the result."""
+        return replay(self.trace, self.clients, self.server_bandwidth, self.peak_memory)
+
+
+def replay(trace, clients, server_bandwidth=None, peak_memory=None):
+    """Play a (saved) trace through simulated clients.
+
+    Returns
+    -------
+    A LoadReport.
+    """
+    applied = simulate(trace, clients, server_bandwidth)
+    return LoadReport(trace, clients, applied, peak_memory)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Memory accounting for data widgets.
+
+All data widgets alive in the kernel, open or closed, are tracked in a
+weak registry. `memory_report` lists the memory each of them holds:
+
+- data: The arrays and tables in the traits of the widget. Data widgets
+  referenced by the traits (e.g. by a DataUnion) are counted separately.
+- cache: Serialized copies of the data kept for re-sending, e.g. cast,
+  encoded or compressed buffers. Buffers that are views of the data are
+  not counted.
+- batched: Buffers of messages collected by an active `batched_sync`.
+
+A memory budget can be set with `set_memory_budget`. It is checked
+whenever a data widget sends a message, and when it is exceeded, the
+caches are evicted and stale batched messages dropped, or a warning is
+given. To keep sending cheap, a running total is kept for the budget,
+and only the usage of the sending widget is measured again.
+"""
+
+import warnings
+import weakref
+
+import numpy as np
+
+
+# All live data widgets
+_data_widgets = weakref.WeakSet()
+
+_budget = None
+_budget_action = 'evict'
+_over_budget = False
+
+budget_actions = ('evict', 'warn')
+
+
+def value_nbytes(value):
+    """The size of the array data in a trait value.
+
+    Numpy arrays, Arrow tables and arrays, and lists, tuples and dicts
+    of these are counted. Anything else counts as zero.
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(value_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(value_nbytes(v) for v in value)
+    if type(value).__module__.startswith('pyarrow'):
+        return getattr(value, 'nbytes', 0)
+    return 0
+
+
+def buffers_nbytes(buffers, exclude=()):
+    """The size of buffers, not counting views of the arrays in `exclude`."""
+    n = 0
+    for buffer in buffers:
+        nbytes = memoryview(buffer).nbytes
+        if nbytes and exclude:
+            view = np.frombuffer(buffer, dtype=np.uint8)
+            if any(np.may_share_memory(view, a) for a in exclude):
+                continue
+        n += nbytes
+    return n
+
+
+class MemoryReport(object):
+    """The memory held by data widgets, per widget and in total.
+
+    Attributes
+    ----------
+    entries : list of dict
+        One entry per widget, sorted by decreasing total, with the
+        'widget', its 'model_id' (None when closed), the 'data', 'cache'
+        and 'batched' bytes and their 'total'.
+    """
+
+    categories = ('data', 'cache', 'batched')
+
+    def __init__(self, widgets):
+        self.entries = []
+        for widget in widgets:
+            usage = widget._memory_usage()
+            entry = dict(widget=widget, model_id=widget.model_id if widget.comm else None)
+            entry.update((c, usage.get(c, 0)) for c in self.categories)
+            entry['total'] = sum(usage.get(c, 0) for c in self.categories)
+            self.entries.append(entry)
+        self.entries.sort(key=lambda e: e['total'], reverse=True)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def total(self):
+        """The total bytes held by all data widgets."""
+        return sum(e['total'] for e in self.entries)
+
+    def by_category(self):
+        """The total bytes held in each category."""
+        return {c: sum(e[c] for e in self.entries) for c in self.categories}
+
+    def largest(self, n=5):
+        """The entries of the n widgets holding the most memory."""
+        return self.entries[:n]
+
+    def __str__(self):
+        lines = ['%-32s %-20s %10s %10s %10s' % ('model_id', 'class', 'data', 'cache', 'batched')]
+        for e in self.entries:
+            lines.append('%-32s %-20s %10s %10s %10s' % (
+                e['model_id'] or '(closed)', type(e['widget']).__name__,
+                _format_bytes(e['data']), _format_bytes(e['cache']),
+                _format_bytes(e['batched'])))
+        totals = self.by_category()
+        lines.append('%-32s %-20s %10s %10s %10s' % (
+            'total', '%d widgets' % len(self.entries),
+            _format_bytes(totals['data']), _format_bytes(totals['cache']),
+            _format_bytes(totals['batched'])))
+        return '\n'.join(lines)
+
+
+def _format_bytes(n):
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1000:
+            return '%.0f %s' % (n, unit) if unit == 'B' else '%.1f %s' % (n, unit)
+        n /= 1000.
+    return '%.1f GB' % n
+
+
+def _widget_total(widget):
+    usage = widget._memory_usage()
+    return sum(usage.get(c, 0) for c in MemoryReport.categories)
+
+
+class _MemoryAccount(object):
+    """The last measured bytes held by each data widget, and their total."""
+
+    def __init__(self):
+        self.totals = {}
+        self.total = 0
+
+    def update(self, widget):
+        """Measure the bytes held by a widget again."""
+        key = id(widget)
+        if key not in self.totals:
+            self.totals[key] = 0
+            weakref.finalize(widget, self._forget, key)
+        nbytes = _widget_total(widget)
+        self.total += nbytes - self.totals[key]
+        self.totals[key] = nbytes
+
+    def update_all(self):
+        for widget in list(_data_widgets):
+            self.update(widget)
+
+    def _forget(self, key):
+        self.total -= self.totals.pop(key, 0)
+
+
+_account = _MemoryAccount()
+
+
+def memory_report():
+    """Report the memory held by all live data widgets.
+
+    Returns
+    -------
+    A MemoryReport.
+    """
+    return MemoryReport(list(_data_widgets))
+
+
+def set_memory_budget(nbytes, action='evict'):
+    """Set a budget for the memory held by data widgets.
+
+    The budget is checked every time a data widget sends a message.
+
+    Parameters
+    ----------
+    nbytes : int or None
+        The budget in bytes, or None to remove the budget.
+    action : str
+        What to do when the budget is exceeded. With 'evict', the
+        serialized caches of all data widgets are evicted, and batched
+        messages superseded by later messages are dropped. A warning is
+        given if this is not enough. With 'warn', only a warning is given.
+    """
+    global _budget, _budget_action, _over_budget
+    if action not in budget_actions:
+        raise ValueError('Unknown budget action %r, expected one of %r' % (
+            action, budget_actions))
+    _budget = nbytes
+    _budget_action = action
+    _over_budget = False
+    if nbytes is not None:
+        _account.update_all()
+
+
+def check_memory_budget(widget=None):
+    """Check the memory budget, and act if it is exceeded.
+
+    This is called automatically when a data widget sends a message.
+
+    Parameters
+    ----------
+    widget : DataWidget or None
+        The widget whose memory usage may have changed since the last
+        check, or None to measure all data widgets again.
+
+    Returns
+    -------
+    Whether the memory held by data widgets is within the budget.
+    """
+    global _over_budget
+    if _budget is None:
+        return True
+    if widget is None:
+        _account.update_all()
+    else:
+        _account.update(widget)
+    if _account.total > _budget and _budget_action == 'evict':
+        from .widgets import DataWidget
+        for other in list(_data_widgets):
+            other._evict_caches()
+        batch = DataWidget._active_batch
+        if batch is not None:
+            batch.drop_stale()
+        _account.update_all()
+    if _account.total <= _budget:
+        _over_budget = False
+        return True
+    if not _over_budget:
+        # Only warn when the budget is first exceeded
+        _over_budget = True
+        report = memory_report()
+        largest = ', '.join('%s %s (%s)' % (
+            type(e['widget']).__name__, e['model_id'] or '(closed)',
+            _format_bytes(e['total'])) for e in report.largest(3))
+        warnings.warn('Data widgets hold %s, above the memory budget of %s. '
+                      'Largest: %s' % (_format_bytes(report.total),
+                                       _format_bytes(_budget), largest))
+    return False
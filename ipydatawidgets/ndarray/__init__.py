@@ -4,8 +4,19 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
-from .media import DataImage
+# The modules defining widgets are imported eagerly, so that their
+# classes are registered for models created by the front-end. Heavy
+# optional dependencies (pyarrow, Pillow) are only imported when used,
+# and the shared memory transport on first access of its attributes.
+
+from importlib import import_module
+
+from .arrow import ArrowTableWidget, arrow_serialization
+from .chunked import ChunkedArrayWidget
+from .media import DataImage, TiledDataImage
+from .pointcloud import PointCloudWidget
 from .serializers import array_serialization, data_union_serialization
+from .table import NDArrayTable
 from .traits import NDArray, shape_constraints
 from .union import DataUnion, get_union_array
 from .widgets import (
@@ -13,5 +24,39 @@ from .widgets import (
     NDArrayBase,
     NDArraySource,
     create_constrained_arraywidget,
+    create_array_widgets,
     ConstrainedNDArrayWidget,
 )
+
+
+_lazy_attributes = {
+    'attach_shared_array': '.shared',
+}
+
+__all__ = [
+    'ArrowTableWidget', 'arrow_serialization',
+    'ChunkedArrayWidget',
+    'DataImage', 'TiledDataImage',
+    'PointCloudWidget',
+    'array_serialization', 'data_union_serialization',
+    'NDArrayTable',
+    'NDArray', 'shape_constraints',
+    'DataUnion', 'get_union_array',
+    'NDArrayWidget', 'NDArrayBase', 'NDArraySource',
+    'create_constrained_arraywidget', 'create_array_widgets',
+    'ConstrainedNDArrayWidget',
+] + list(_lazy_attributes)
+
+
+def __getattr__(name):
+    try:
+        module = _lazy_attributes[name]
+    except KeyError:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
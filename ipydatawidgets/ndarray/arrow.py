@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Apache Arrow support for data widgets.
+
+Arrow data is sent over the wire in the Arrow IPC stream format, which
+can carry record batches, nullable data and dictionary encoded columns.
+pyarrow is an optional dependency, and is only imported when needed.
+
+Arrow IPC is used for tables (`ArrowTableWidget`). The arrays of
+`NDArrayWidget` are numpy arrays, so pyarrow arrays assigned to it are
+viewed as numpy arrays without a copy where possible (see
+`arrow_to_numpy`), and are sent in the regular array format.
+"""
+
+from ipywidgets import register
+from traitlets import TraitType, TraitError, Undefined, Unicode
+
+from ..widgets import DataWidget
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('pyarrow is needed for Arrow support in ipydatawidgets')
+    return pyarrow
+
+
+def is_arrow_object(value):
+    """Whether value is a pyarrow object, checked without importing pyarrow."""
+    return type(value).__module__.startswith('pyarrow')
+
+
+def arrow_to_numpy(value):
+    """Convert a pyarrow Array or ChunkedArray to a numpy array.
+
+    A copy is only made if the data cannot be viewed directly, e.g. if
+    it is nullable, or split over several chunks.
+    """
+    pa = _import_pyarrow()
+    if not isinstance(value, (pa.Array, pa.ChunkedArray)):
+        raise TraitError('Cannot convert %r to an array, only Arrow arrays are supported'
+                         % type(value))
+    if isinstance(value, pa.ChunkedArray):
+        if value.num_chunks == 1:
+            value = value.chunk(0)
+        else:
+            return value.to_numpy()
+    try:
+        return value.to_numpy(zero_copy_only=True)
+    except pa.ArrowInvalid:
+        return value.to_numpy(zero_copy_only=False)
+
+
+def as_arrow_table(value):
+    """Coerce a table-like object to a pyarrow Table or RecordBatch.
+
+    Objects with a `to_arrow` method (e.g. polars DataFrames) are
+    converted with that method, which does not copy the data.
+    """
+    pa = _import_pyarrow()
+    if isinstance(value, (pa.Table, pa.RecordBatch)):
+        return value
+    if hasattr(value, 'to_arrow'):
+        return as_arrow_table(value.to_arrow())
+    if hasattr(value, '__arrow_c_stream__'):
+        return pa.table(value)
+    raise TraitError('Cannot convert %r to an Arrow table' % type(value))
+
+
+class ArrowTable(TraitType):
+    """A trait for pyarrow Tables or RecordBatches."""
+
+    info_text = 'an Arrow table or record batch'
+
+    def validate(self, obj, value):
+        if value is None or value is Undefined:
+            return value
+        return as_arrow_table(value)
+
+
+# Format:
+# {'format': 'arrow-ipc', 'buffer': memoryview}
+
+def arrow_to_json(value, widget):
+    """Arrow table JSON serializer, using the Arrow IPC stream format."""
+    if value is None:
+        return None
+    if value is Undefined:
+        raise TraitError('Cannot serialize undefined table!')
+    pa = _import_pyarrow()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, value.schema) as writer:
+        writer.write(value)
+    return {
+        'format': 'arrow-ipc',
+        'buffer': memoryview(sink.getvalue()),
+    }
+
+
+def arrow_from_json(value, widget):
+    """Arrow table JSON de-serializer."""
+    if value is None:
+        return None
+    pa = _import_pyarrow()
+    return pa.ipc.open_stream(pa.py_buffer(value['buffer'])).read_all()
+
+
+arrow_serialization = dict(to_json=arrow_to_json, from_json=arrow_from_json)
+
+
+@register
+class ArrowTableWidget(DataWidget):
+    """A widget representing an Apache Arrow table.
+
+    The table is synced in the Arrow IPC format, so nullable and
+    dictionary encoded columns are supported. Anything that can
+    be converted to an Arrow table without a copy, e.g. a polars
+    DataFrame, can be assigned directly.
+    """
+    _model_name = Unicode('ArrowTableModel').tag(sync=True)
+
+    table = ArrowTable().tag(sync=True, **arrow_serialization)
+
+    def __init__(self, table=Undefined, **kwargs):
+        super(ArrowTableWidget, self).__init__(table=table, **kwargs)
+
+    @property
+    def num_rows(self):
+        return self.table.num_rows
+
+    @property
+    def column_names(self):
+        return list(self.table.schema.names)
+
+    def notify_changed(self):
+        """Use this to mark that the table is changed.
+
+        This respects hold_trait_notifications and hold_sync.
+        """
+        self._notify_trait('table', self.table, self.table)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Data widget for chunked, lazy arrays (e.g. dask, xarray or zarr).
+
+Lazy arrays assigned to `NDArrayWidget.array` are still computed as a
+whole, as the widget and its front-end model hold the full array. Use
+`ChunkedArrayWidget` to only compute the chunks a view requests.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+import warnings
+
+from ipywidgets import register
+from traitlets import Any, Int, List, Unicode, TraitError
+import numpy as np
+
+from .serializers import array_to_json
+from .widgets import NDArraySource
+
+
+def normalize_chunks(shape, chunks):
+    """Normalize chunk specification to a tuple of chunk sizes per dimension.
+
+    `chunks` can be either the size of the chunks along each dimension
+    (as used by zarr), or an explicit tuple of chunk sizes for each
+    dimension (as used by dask).
+    """
+    if len(chunks) != len(shape):
+        raise TraitError('Chunks %r do not match shape %r' % (chunks, shape))
+    normalized = []
+    for size, dim_chunks in zip(shape, chunks):
+        if isinstance(dim_chunks, (int, np.integer)):
+            dim_chunks = int(dim_chunks)
+            if dim_chunks <= 0:
+                raise TraitError('Chunk sizes must be positive, got %r' % (chunks,))
+            n_full, remainder = divmod(size, dim_chunks)
+            dim_chunks = (dim_chunks,) * n_full + ((remainder,) if remainder else ())
+        dim_chunks = tuple(int(c) for c in dim_chunks)
+        if size and any(c <= 0 for c in dim_chunks):
+            raise TraitError('Chunk sizes must be positive, got %r' % (chunks,))
+        if sum(dim_chunks) != size:
+            raise TraitError('Chunks %r do not match shape %r' % (chunks, shape))
+        normalized.append(dim_chunks)
+    return tuple(normalized)
+
+
+def _wire_dtype(dtype):
+    """The dtype data will have after serialization."""
+    dtype = str(dtype)
+    if dtype in ('int64', 'uint64'):
+        return dtype.replace('64', '32')
+    return dtype
+
+
+@register
+class ChunkedArrayWidget(NDArraySource):
+    """A widget representing a chunked array, that is computed lazily.
+
+    The source array can be anything with a shape, a dtype and numpy-style
+    slicing, e.g. a dask array, an xarray DataArray or a zarr array. It is
+    never computed as a whole. Instead, the front-end requests the chunks
+    that it needs, which are then computed in parallel and sent as
+    separate messages as they complete.
+    """
+    _model_name = Unicode('ChunkedArrayModel').tag(sync=True)
+
+    source = Any(help='The chunked source array')
+
+    array_shape = List(help='The shape of the full array').tag(sync=True)
+    array_dtype = Unicode(help='The dtype of the serialized data').tag(sync=True)
+    chunks = List(help='The chunk sizes along each dimension').tag(sync=True)
+
+    max_workers = Int(4, help='The maximum number of chunks to compute in parallel. '
+        'Only used when the first chunks are computed.')
+
+    def __init__(self, source, chunks=None, **kwargs):
+        if hasattr(source, 'dims') and hasattr(source, 'data'):
+            # Unwrap xarray objects
+            source = source.data
+        if chunks is None:
+            chunks = getattr(source, 'chunks', None)
+            if chunks is None:
+                raise TraitError('Chunks must be specified for non-chunked sources')
+        chunks = normalize_chunks(source.shape, chunks)
+        # Created on first use, with the futures of front-end requests
+        self._executor = None
+        self._requests = set()
+        super(ChunkedArrayWidget, self).__init__(
+            source=source,
+            array_shape=list(source.shape),
+            array_dtype=_wire_dtype(source.dtype),
+            chunks=[list(c) for c in chunks],
+            **kwargs)
+        self.on_msg(self._handle_chunk_msg)
+
+    def _get_shape(self):
+        return tuple(self.array_shape)
+
+    def _get_dtype(self):
+        return np.dtype(self.array_dtype)
+
+    @property
+    def num_chunks(self):
+        """The number of chunks along each dimension."""
+        return tuple(len(c) for c in self.chunks)
+
+    def chunk_slices(self, index):
+        """Get the slices of the source array that make up a chunk."""
+        slices = []
+        for i, dim_chunks in zip(index, self.chunks):
+            start = sum(dim_chunks[:i])
+            slices.append(slice(start, start + dim_chunks[i]))
+        return tuple(slices)
+
+    def compute_chunk(self, index):
+        """Compute the data of a single chunk."""
+        return np.asarray(self.source[self.chunk_slices(index)])
+
+    def send_chunks(self, indices):
+        """Compute and send chunks to the front-end.
+
+        The chunks are computed in parallel, and each chunk is sent
+        as soon as it is ready. This returns once all chunks are sent.
+
+        Parameters
+        ----------
+        indices : iterable of tuples
+            The chunk indices of the chunks to send.
+        """
+        futures = self._submit_chunks(indices)
+        # Sending happens from this thread, as chunks complete
+        for future in as_completed(futures):
+            self._send_chunk(futures[future], future.result())
+
+    def _submit_chunks(self, indices):
+        """Start computing chunks, returning a dict of futures to indices."""
+        indices = [tuple(int(i) for i in index) for index in indices]
+        for index in indices:
+            if len(index) != len(self.chunks) or any(
+                    not 0 <= i < n for i, n in zip(index, self.num_chunks)):
+                raise IndexError('Invalid chunk index: %r' % (index,))
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return {self._executor.submit(self.compute_chunk, index): index
+                for index in indices}
+
+    def stream_all(self):
+        """Compute and send all chunks to the front-end."""
+        self.send_chunks(itertools.product(*(range(n) for n in self.num_chunks)))
+
+    def invalidate(self):
+        """Mark that the source has changed.
+
+        The front-end will discard all chunks it has received, and
+        request new ones as needed.
+        """
+        self.send({'method': 'invalidate_chunks'})
+
+    def _send_chunk(self, index, data):
+        state = array_to_json(data, self)
+        buffer = state.pop('buffer')
+        msg = {'method': 'chunk_data', 'index': list(index),
+               'shape': list(state['shape']), 'dtype': state['dtype']}
+        self.send(msg, [buffer])
+
+    def _handle_chunk_msg(self, widget, content, buffers):
+        if content.get('method') == 'request_chunks':
+            # Do not block the kernel while computing, each chunk is
+            # sent from its worker thread when it completes
+            futures = self._submit_chunks(content['indices'])
+            self._requests.update(futures)
+            for future, index in futures.items():
+                future.add_done_callback(
+                    lambda future, index=index: self._on_chunk_done(index, future))
+
+    def _on_chunk_done(self, index, future):
+        self._requests.discard(future)
+        if future.cancelled() or self.comm is None:
+            return
+        error = future.exception()
+        if error is not None:
+            warnings.warn('Failed to compute chunk %r: %r' % (index, error))
+            return
+        self._send_chunk(index, future.result())
+
+    def close(self):
+        # Also called on garbage collection, if __init__ failed early
+        if getattr(self, '_executor', None) is not None:
+            # Pending requests are dropped, as there is no one to send them to
+            for future in list(self._requests):
+                future.cancel()
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        super(ChunkedArrayWidget, self).close()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Dtype-aware encodings for array serialization.
+
+The encoded payload is always placed in the 'buffer' key of the state,
+so that any compression is applied to the encoded data. Supported
+encodings:
+
+- 'bitpack': Boolean arrays packed to one bit per element.
+- 'rle': Run-length encoding, with the run values in 'buffer' and the
+  run lengths in 'run_lengths'. Useful for label maps and masks.
+- 'dictionary': Low-cardinality arrays as indices ('buffer') into an
+  array of unique values ('dictionary').
+"""
+
+import warnings
+
+import numpy as np
+
+
+encodings = ('none', 'auto', 'bitpack', 'rle', 'dictionary')
+
+
+def _runs(flat):
+    """Get the start indices of all runs of equal values."""
+    if flat.size == 0:
+        return np.zeros(0, dtype=np.intp)
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    return np.concatenate(([0], changes))
+
+
+def _index_dtype(n_values):
+    if n_values <= 256:
+        return np.dtype('uint8')
+    if n_values <= 65536:
+        return np.dtype('uint16')
+    return None
+
+
+def choose_encoding(array):
+    """Pick the encoding giving the smallest payload for an array."""
+    if array.size == 0 or not (array.dtype == bool or array.dtype.kind in 'iu'):
+        return 'none'
+    flat = array.ravel()
+    itemsize = array.dtype.itemsize
+    sizes = {
+        'none': array.nbytes,
+        'rle': len(_runs(flat)) * (itemsize + 4),
+    }
+    if array.dtype == bool:
+        sizes['bitpack'] = (array.size + 7) // 8
+    elif itemsize > 1 and sizes['rle'] > array.nbytes // 4:
+        # Only check cardinality when run-length encoding is not very effective
+        n_unique = len(np.unique(flat))
+        index_dtype = _index_dtype(n_unique)
+        if index_dtype is not None:
+            sizes['dictionary'] = array.size * index_dtype.itemsize + n_unique * itemsize
+    return min(sizes, key=sizes.get)
+
+
+def encode_array(state, array, encoding):
+    """Encode the array of a serialized array state in-place.
+
+    Parameters
+    ----------
+    state : dict
+        The serialized state, as given by `array_to_json`.
+    array : ndarray
+        The (C-contiguous) array that was serialized.
+    encoding : str
+        One of the supported encodings, 'auto' or 'none'.
+    """
+    if encoding == 'auto':
+        encoding = choose_encoding(array)
+    if encoding == 'none':
+        return state
+    flat = array.ravel()
+    if encoding == 'bitpack':
+        if array.dtype != bool:
+            warnings.warn('Bit-packing is only supported for bool arrays, '
+                          'sending %s array unencoded.' % array.dtype)
+            return state
+        state['buffer'] = memoryview(np.packbits(flat, bitorder='little'))
+    elif encoding == 'rle':
+        starts = _runs(flat)
+        lengths = np.diff(np.append(starts, flat.size)).astype(np.uint32)
+        state['buffer'] = memoryview(np.ascontiguousarray(flat[starts]))
+        state['run_lengths'] = memoryview(lengths)
+    elif encoding == 'dictionary':
+        dictionary, indices = np.unique(flat, return_inverse=True)
+        index_dtype = _index_dtype(len(dictionary))
+        if index_dtype is None:
+            warnings.warn('Too many unique values for dictionary encoding, '
+                          'sending array unencoded.')
+            return state
+        state['buffer'] = memoryview(indices.astype(index_dtype))
+        state['dictionary'] = memoryview(dictionary)
+        state['index_dtype'] = str(index_dtype)
+    else:
+        raise ValueError('Unknown array encoding: %r' % encoding)
+    state['encoding'] = encoding
+    return state
+
+
+def decode_array(value):
+    """Decode a serialized array state to a flat array.
+
+    The 'buffer' of the state is expected to already be decompressed.
+    """
+    encoding = value['encoding']
+    dtype = np.dtype(value['dtype'])
+    size = int(np.prod(value['shape']))
+    if encoding == 'bitpack':
+        bits = np.frombuffer(value['buffer'], dtype=np.uint8)
+        return np.unpackbits(bits, count=size, bitorder='little').astype(bool)
+    elif encoding == 'rle':
+        values = np.frombuffer(value['buffer'], dtype=dtype)
+        lengths = np.frombuffer(value['run_lengths'], dtype=np.uint32)
+        return np.repeat(values, lengths)
+    elif encoding == 'dictionary':
+        indices = np.frombuffer(value['buffer'], dtype=value['index_dtype'])
+        dictionary = np.frombuffer(value['dictionary'], dtype=dtype)
+        return dictionary[indices]
+    raise ValueError('Unknown array encoding: %r' % encoding)
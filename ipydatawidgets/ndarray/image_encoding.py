@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Image codecs for encoded image transport.
+
+PNG encoding is implemented directly with zlib, while JPEG and WebP
+use Pillow, which is an optional dependency.
+"""
+
+import io
+import struct
+import zlib
+
+import numpy as np
+
+
+image_formats = ('raw', 'png', 'jpeg', 'webp')
+
+_png_color_types = {
+    # channels: PNG color type
+    1: 0,  # grayscale
+    3: 2,  # RGB
+    4: 6,  # RGBA
+}
+
+
+def _png_chunk(tag, data):
+    chunk = tag + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xffffffff)
+
+
+def encode_png(image, compression=6):
+    """Encode an 8-bit image of shape (height, width[, channels]) as PNG."""
+    if image.dtype != np.uint8:
+        raise ValueError('PNG encoding requires uint8 data, got %s' % image.dtype)
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    height, width, channels = image.shape
+    if channels not in _png_color_types:
+        raise ValueError('Cannot PNG encode an image with %d channels' % channels)
+    # Each scanline is prefixed with a filter type byte (0 = none)
+    raw = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * channels)
+    header = struct.pack('>IIBBBBB', width, height, 8, _png_color_types[channels], 0, 0, 0)
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', header),
+        _png_chunk(b'IDAT', zlib.compress(raw, compression)),
+        _png_chunk(b'IEND', b''),
+    ])
+
+
+def _import_pillow():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ImportError('Pillow is needed for JPEG and WebP image encoding')
+    return Image
+
+
+def encode_image(image, format, quality=85):
+    """Encode an 8-bit image of shape (height, width[, channels]).
+
+    Parameters
+    ----------
+    image : ndarray
+        The image data.
+    format : str
+        One of 'png', 'jpeg' or 'webp'.
+    quality : int
+        The quality of lossy encodings, from 1 to 100.
+    """
+    if format == 'png':
+        return encode_png(image)
+    Image = _import_pillow()
+    pil_image = Image.fromarray(image)
+    if format == 'jpeg':
+        # JPEG does not support transparency
+        pil_image = pil_image.convert('RGB' if image.ndim == 3 else 'L')
+    elif format != 'webp':
+        raise ValueError('Unknown image format: %r' % format)
+    out = io.BytesIO()
+    pil_image.save(out, format=format.upper(), quality=quality)
+    return out.getvalue()
+
+
+def decode_image(data):
+    """Decode an encoded image to an RGBA array."""
+    Image = _import_pillow()
+    return np.asarray(Image.open(io.BytesIO(data)).convert('RGBA'))
@@ -4,26 +4,204 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
+import warnings
 
 from ipywidgets import DOMWidget
-from traitlets import Unicode
+from traitlets import Unicode, Enum, Int, Float, Tuple, TraitError, observe
+import numpy as np
 
 from .._frontend import EXTENSION_SPEC_VERSION, module_name
 from ..widgets import DataWidget
-from .union import DataUnion, data_union_serialization
-from .traits import shape_constraints
+from .image_encoding import image_formats, encode_image
+from .serializers import array_serialization, image_union_serialization
+from .union import DataUnion
+from .traits import NDArray, shape_constraints
+from .widgets import NDArrayBase
+
+
+scalar_image_dtypes = ('uint8', 'uint16', 'float32')
+
+
+def image_shape_constraint(trait, value):
+    """Validate that value is shaped like RGBA (h, w, 4) or scalar (h, w) image data"""
+    shape = tuple(value.shape)
+    if len(shape) == 2 or (len(shape) == 3 and shape[2] == 4):
+        return value
+    raise TraitError('%s should have the shape (height, width, 4) or (height, width), '
+                     'but got %s' % (trait.name, shape))
+
+
+class ImageDataUnion(DataUnion):
+    """A DataUnion for image data.
+
+    Accepts either RGBA data of shape (height, width, 4) and dtype uint8,
+    or scalar data of shape (height, width) with one of the dtypes in
+    `scalar_image_dtypes`. Arrays of other dtypes are coerced.
+    """
+
+    def validate(self, obj, value):
+        value = super(ImageDataUnion, self).validate(obj, value)
+        if value is None:
+            return value
+        allowed = scalar_image_dtypes if len(value.shape) == 2 else ('uint8',)
+        if str(value.dtype) in allowed:
+            return value
+        if isinstance(value, NDArrayBase):
+            raise TraitError('Image data of shape %s should have one of the dtypes %s, '
+                             'but got %s' % (value.shape, allowed, value.dtype))
+        if len(allowed) == 1:
+            target = allowed[0]
+        elif value.dtype.kind == 'f':
+            target = 'float32'
+        else:
+            target = 'uint8' if value.dtype.itemsize == 1 else 'uint16'
+        warnings.warn(
+            'Given image data dtype "%s" does not match supported types %s. '
+            'A coerced copy has been created.' % (value.dtype, allowed))
+        return value.astype(target)
 
 
 class DataImage(DataWidget, DOMWidget):
     """A data-widgets based Image widget.
+
+    The data is either RGBA data of shape (height, width, 4), or scalar
+    data of shape (height, width). Scalar data is mapped to colors in
+    the front-end, using `colormap` as a lookup table for values over
+    `value_range`. Changing the colormap or the range then only
+    transfers the lookup table, and not the image.
+
+    Set `format` to have the kernel encode RGBA images before sending them,
+    either losslessly ('png'), or lossy ('jpeg' or 'webp') according to
+    `quality`. The encoded image is then decoded natively by the browser.
+    Encoding only applies when `data` is an array, not a data widget.
     """
     _model_name = Unicode('DataImageModel').tag(sync=True)
     _view_name = Unicode('DataImageView').tag(sync=True)
     _view_module = Unicode(module_name).tag(sync=True)
     _view_module_version = Unicode(EXTENSION_SPEC_VERSION).tag(sync=True)
 
-    data = DataUnion(
-        [],
-        dtype='uint8',
-        shape_constraint=shape_constraints(None, None, 4),  # 2D RGBA
-    ).tag(sync=True, **data_union_serialization)
+    data = ImageDataUnion(
+        np.zeros((0, 0, 4), dtype=np.uint8),
+        shape_constraint=image_shape_constraint,
+    ).tag(sync=True, **image_union_serialization)
+
+    colormap = NDArray(None, allow_none=True, dtype=np.uint8,
+        help='A lookup table of RGBA colors, of shape (n, 4), used to map '
+        'scalar image data to colors. If None, a grayscale map is used.'
+    ).tag(sync=True, **array_serialization).valid(shape_constraints(None, 4))
+
+    value_range = Tuple(Float(), Float(), default_value=None, allow_none=True,
+        help='The range of scalar values mapped to the ends of the colormap. '
+        'If None, the full range of the dtype is used ([0, 1] for floats).'
+    ).tag(sync=True)
+
+    format = Enum(image_formats, 'raw',
+        help='The format used to transfer RGBA image data. JPEG and WebP '
+        'encodings need Pillow to be installed.')
+
+    quality = Int(85, min=1, max=100,
+        help='The quality of lossy image formats (JPEG and WebP).')
+
+    @observe('format', 'quality')
+    def _on_encoding_change(self, change):
+        # Resend the image with the new encoding
+        self._notify_trait('data', self.data, self.data)
+
+
+class TiledDataImage(DataWidget, DOMWidget):
+    """An image widget for RGBA images too large to send in one message.
+
+    The image is split into square tiles of `tile_size` pixels. The
+    front-end only requests the tiles that intersect its viewport, and
+    updating a region of the image with `sync_region` only re-sends the
+    affected tiles that the front-end has already received. Tiles can be
+    encoded according to `format` and `quality`, as for DataImage.
+    """
+    _model_name = Unicode('TiledDataImageModel').tag(sync=True)
+    _view_name = Unicode('TiledDataImageView').tag(sync=True)
+    _view_module = Unicode(module_name).tag(sync=True)
+    _view_module_version = Unicode(EXTENSION_SPEC_VERSION).tag(sync=True)
+
+    data = NDArray(dtype=np.uint8).valid(shape_constraints(None, None, 4))
+
+    image_shape = Tuple(Int(), Int(), default_value=(0, 0),
+        help='The (height, width) of the image.').tag(sync=True)
+
+    tile_size = Int(256, min=1, help='The size of the square tiles, in pixels.').tag(sync=True)
+
+    format = Enum(image_formats, 'raw',
+        help='The format used to transfer the tiles. JPEG and WebP '
+        'encodings need Pillow to be installed.')
+
+    quality = Int(85, min=1, max=100,
+        help='The quality of lossy image formats (JPEG and WebP).')
+
+    def __init__(self, data, **kwargs):
+        self._sent_tiles = set()
+        super(TiledDataImage, self).__init__(data=data, **kwargs)
+        self.on_msg(self._handle_tile_msg)
+
+    @property
+    def num_tiles(self):
+        """The number of tiles along the (rows, columns) of the image."""
+        height, width = self.image_shape
+        return (-(-height // self.tile_size), -(-width // self.tile_size))
+
+    def get_tile(self, row, col):
+        """Get the pixel data of a tile."""
+        size = self.tile_size
+        return self.data[row * size:(row + 1) * size, col * size:(col + 1) * size]
+
+    def send_tiles(self, tiles):
+        """Send tiles to the front-end.
+
+        Parameters
+        ----------
+        tiles : iterable of two-tuples
+            The (row, column) indices of the tiles to send.
+        """
+        n_rows, n_cols = self.num_tiles
+        for row, col in tiles:
+            row, col = int(row), int(col)
+            if not (0 <= row < n_rows and 0 <= col < n_cols):
+                raise IndexError('Invalid tile index: %r' % ((row, col),))
+            tile = np.ascontiguousarray(self.get_tile(row, col))
+            msg = {'method': 'tile_data', 'tile': [row, col],
+                   'shape': list(tile.shape), 'format': self.format}
+            if self.format == 'raw':
+                buffer = memoryview(tile)
+            else:
+                buffer = encode_image(tile, self.format, self.quality)
+            self._sent_tiles.add((row, col))
+            self.send(msg, [buffer])
+
+    def sync_region(self, y_start, y_stop, x_start, x_stop):
+        """Sync a modified region of the image.
+
+        Only the tiles that intersect the region, and that have already
+        been sent to the front-end, are re-sent.
+        """
+        size = self.tile_size
+        rows = range(y_start // size, -(-y_stop // size))
+        cols = range(x_start // size, -(-x_stop // size))
+        self.send_tiles(sorted(
+            tile for tile in self._sent_tiles
+            if tile[0] in rows and tile[1] in cols))
+
+    @observe('data')
+    def _on_data_change(self, change):
+        self.image_shape = tuple(self.data.shape[:2])
+        self._invalidate()
+
+    @observe('tile_size', 'format', 'quality')
+    def _on_tiling_change(self, change):
+        self._invalidate()
+
+    def _invalidate(self):
+        # Let the front-end discard its tiles, and request the ones it needs
+        self._sent_tiles.clear()
+        self.send({'method': 'invalidate_tiles'})
+
+    def _handle_tile_msg(self, widget, content, buffers):
+        if content.get('method') == 'request_tiles':
+            self.send_tiles(content['tiles'])
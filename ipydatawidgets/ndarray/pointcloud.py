@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Data widget for large point clouds, streamed by level of detail.
+
+The points are organized in an octree on the kernel. Each node of the
+octree holds a random subsample (of at most `node_size` points) of the
+points in its cube that are not already held by its ancestors, so that
+the nodes of the coarse levels together give an overview of the whole
+cloud, and deeper levels add detail. The front-end sends its camera
+frustum, and the kernel streams the visible nodes, coarse levels first,
+until the point budget is reached.
+"""
+
+import heapq
+
+from ipywidgets import register
+from traitlets import Float, Int, List, Unicode, TraitError, observe, validate
+import numpy as np
+
+from .serializers import array_serialization
+from .traits import NDArray, shape_constraints
+from .widgets import NDArraySource
+
+
+# The maximum octree depth, so that Morton codes of three axes fit in 64 bits
+max_octree_depth = 21
+
+
+def _spread_bits(x):
+    """Spread the lower 21 bits of x, so that there are two zero bits between each."""
+    x = x.astype(np.uint64) & np.uint64(0x1fffff)
+    x = (x | x << np.uint64(32)) & np.uint64(0x1f00000000ffff)
+    x = (x | x << np.uint64(16)) & np.uint64(0x1f0000ff0000ff)
+    x = (x | x << np.uint64(8)) & np.uint64(0x100f00f00f00f00f)
+    x = (x | x << np.uint64(4)) & np.uint64(0x10c30c30c30c30c3)
+    x = (x | x << np.uint64(2)) & np.uint64(0x1249249249249249)
+    return x
+
+
+def morton_codes(cells):
+    """Compute the Morton (z-order) codes of integer cell coordinates.
+
+    Parameters
+    ----------
+    cells : ndarray
+        Integer cell coordinates of shape (n, 3), each below 2**21.
+
+    Returns
+    -------
+    A uint64 array of n codes. Sorting by the codes groups the cells
+    by octree node, on all levels.
+    """
+    cells = np.asarray(cells)
+    return (_spread_bits(cells[:, 0])
+            | _spread_bits(cells[:, 1]) << np.uint64(1)
+            | _spread_bits(cells[:, 2]) << np.uint64(2))
+
+
+def octree_depth(n_points, node_size):
+    """The smallest depth at which the leaves can hold n_points on average."""
+    depth = 0
+    while node_size * 8 ** depth < n_points and depth < max_octree_depth:
+        depth += 1
+    return depth
+
+
+def build_octree(positions, node_size=65536, depth=None, seed=0):
+    """Build a level-of-detail octree of points.
+
+    Parameters
+    ----------
+    positions : ndarray
+        The point positions, of shape (n, 3).
+    node_size : int
+        The maximum number of points in the inner nodes. The leaves
+        hold all the remaining points of their cube.
+    depth : int or None
+        The depth of the leaves. If None, it is chosen such that the
+        leaves would hold node_size points for uniformly spread points.
+    seed : int
+        The seed of the random subsampling.
+
+    Returns
+    -------
+    A tuple (order, nodes, origin, size). `order` is the permutation of
+    the points that makes the points of each node contiguous. `nodes` is
+    an int64 array of shape (n_nodes, 6), with the level, the cell
+    coordinates (x, y, z) at that level, and the start and count of the
+    points in `order` for each node. The nodes are sorted by level. The
+    root cube has its lower corner at `origin`, and the edge length
+    `size`.
+    """
+    positions = np.asarray(positions)
+    n = len(positions)
+    if depth is None:
+        depth = octree_depth(n, node_size)
+    if not 0 <= depth <= max_octree_depth:
+        raise ValueError('Octree depth must be between 0 and %d' % max_octree_depth)
+    if n == 0:
+        return (np.zeros(0, dtype=np.intp), np.zeros((0, 6), dtype=np.int64),
+                np.zeros(3), 1.0)
+    origin = positions.min(axis=0).astype(np.float64)
+    extent = float((positions.max(axis=0) - origin).max())
+    size = extent * (1 + 1e-6) if extent > 0 else 1.0
+    n_cells = 1 << depth
+    cells = ((positions - origin) * (n_cells / size)).astype(np.int64)
+    np.clip(cells, 0, n_cells - 1, out=cells)
+    codes = morton_codes(cells)
+    priority = np.random.default_rng(seed).random(n)
+
+    remaining = np.arange(n)
+    order = []
+    nodes = []
+    offset = 0
+    for level in range(depth + 1):
+        if len(remaining) == 0:
+            break
+        shift = depth - level
+        node_codes = codes[remaining] >> np.uint64(3 * shift)
+        # Group by node, with the points of each node in random order
+        grouped = np.lexsort((priority[remaining], node_codes))
+        node_codes = node_codes[grouped]
+        starts = np.flatnonzero(np.r_[True, node_codes[1:] != node_codes[:-1]])
+        counts = np.diff(np.r_[starts, len(grouped)])
+        if level < depth:
+            rank = np.arange(len(grouped)) - np.repeat(starts, counts)
+            taken = rank < node_size
+            counts = np.minimum(counts, node_size)
+        else:
+            taken = np.ones(len(grouped), dtype=bool)
+        node_cells = cells[remaining[grouped[starts]]] >> shift
+        node_starts = offset + np.cumsum(counts) - counts
+        nodes.append(np.column_stack([
+            np.full(len(starts), level), node_cells, node_starts, counts]))
+        order.append(remaining[grouped[taken]])
+        offset += int(counts.sum())
+        remaining = remaining[grouped[~taken]]
+    return np.concatenate(order), np.concatenate(nodes).astype(np.int64), origin, size
+
+
+@register
+class PointCloudWidget(NDArraySource):
+    """A widget representing a point cloud, streamed by level of detail.
+
+    The points are never sent as a whole. Instead, the kernel builds an
+    octree (see `build_octree`), and the front-end sends its camera view
+    with `update_view`. The nodes intersecting the view frustum are then
+    sent, coarse levels and nearby nodes first, until `point_budget`
+    points are shown.
+
+    The synced `nodes` array describes the octree, with the level, the
+    cell coordinates (x, y, z) at that level and the point count of each
+    node. Node data is sent as custom messages, with the positions (and
+    colors, if any) of the node's points as buffers.
+
+    To change the number of points of a colored point cloud, set both
+    positions and colors inside `hold_trait_notifications`. After
+    modifying positions or colors in-place, call `notify_changed`.
+    """
+    _model_name = Unicode('PointCloudModel').tag(sync=True)
+
+    positions = NDArray(dtype=np.float32).valid(shape_constraints(None, 3))
+
+    colors = NDArray(None, allow_none=True, dtype=np.uint8,
+        help='Optional RGBA colors of the points, of shape (n, 4).'
+    ).valid(shape_constraints(None, 4))
+
+    node_size = Int(65536, min=1, help='The maximum number of points in inner octree nodes.')
+
+    point_budget = Int(1000000, min=0,
+        help='The maximum number of points to show in the front-end.').tag(sync=True)
+
+    num_points = Int(0, read_only=True, help='The total number of points.').tag(sync=True)
+
+    origin = List(Float(), read_only=True,
+        help='The lower corner of the octree root cube.').tag(sync=True)
+
+    size = Float(1.0, read_only=True,
+        help='The edge length of the octree root cube.').tag(sync=True)
+
+    nodes = NDArray(np.zeros((0, 5), dtype=np.int32), read_only=True, dtype=np.int32,
+        help='The octree nodes, as rows of (level, x, y, z, count).'
+    ).tag(sync=True, **array_serialization)
+
+    def __init__(self, positions, colors=None, **kwargs):
+        self._sent_nodes = set()
+        self._octree_key = None
+        super(PointCloudWidget, self).__init__(positions=positions, colors=colors, **kwargs)
+        self.on_msg(self._handle_view_msg)
+
+    def _get_shape(self):
+        return self.positions.shape
+
+    def _get_dtype(self):
+        return self.positions.dtype
+
+    @validate('positions', 'colors')
+    def _validate_points(self, proposal):
+        value = proposal['value']
+        if proposal['trait'].name == 'positions':
+            positions, colors = value, self.colors
+        else:
+            positions, colors = self._trait_values.get('positions', None), value
+        if colors is not None and positions is not None and len(colors) != len(positions):
+            raise TraitError('Got %d colors for %d points' % (len(colors), len(positions)))
+        return value
+
+    @observe('positions', 'colors', 'node_size')
+    def _on_points_change(self, change):
+        # Changes set together only rebuild the octree once
+        key = (id(self.positions), id(self.colors), self.node_size)
+        if key == self._octree_key:
+            return
+        self._octree_key = key
+        self._build()
+        self.invalidate()
+
+    def notify_changed(self):
+        """Use this to mark that the points are changed.
+
+        This rebuilds the octree and lets the front-end discard all
+        nodes, and is needed when the positions or colors have been
+        modified in-place, as that does not notify any change.
+        """
+        self._octree_key = None
+        self._on_points_change(None)
+
+    def _build(self):
+        positions = self.positions
+        order, nodes, origin, size = build_octree(positions, self.node_size)
+        self._order = order
+        self._octree = nodes
+        children = [[] for _ in range(len(nodes))]
+        index = {}
+        for i, (level, x, y, z) in enumerate(nodes[:, :4].tolist()):
+            index[level, x, y, z] = i
+            if level > 0:
+                children[index[level - 1, x >> 1, y >> 1, z >> 1]].append(i)
+        self._children = children
+        with self.hold_sync():
+            self.set_trait('num_points', len(positions))
+            self.set_trait('origin', [float(c) for c in origin])
+            self.set_trait('size', float(size))
+            self.set_trait('nodes', np.column_stack(
+                [nodes[:, :4], nodes[:, 5]]).astype(np.int32).reshape(-1, 5))
+
+    def node_bounds(self):
+        """The lower and upper corners of all nodes, as two (n_nodes, 3) arrays."""
+        cell_size = self.size / (2.0 ** self._octree[:, 0])
+        lower = np.asarray(self.origin) + self._octree[:, 1:4] * cell_size[:, np.newaxis]
+        return lower, lower + cell_size[:, np.newaxis]
+
+    def nodes_in_frustum(self, planes):
+        """Find the nodes that intersect a view frustum.
+
+        Parameters
+        ----------
+        planes : array-like
+            The frustum planes as rows of (a, b, c, d), where a point is
+            inside if a*x + b*y + c*z + d >= 0 for all planes.
+
+        Returns
+        -------
+        A bool array with one element per node. Nodes whose cube is
+        outside one of the planes are excluded, which is conservative
+        near the corners of the frustum.
+        """
+        planes = np.asarray(planes, dtype=np.float64).reshape(-1, 4)
+        lower, upper = self.node_bounds()
+        normals = planes[:, :3]
+        # The corner of each cube furthest along each plane normal
+        corners = np.where(normals >= 0, upper[:, np.newaxis], lower[:, np.newaxis])
+        return ((corners * normals).sum(axis=-1) + planes[:, 3] >= 0).all(axis=1)
+
+    def select_nodes(self, planes, camera_position=None, point_budget=None):
+        """Select the nodes to show for a view, within the point budget.
+
+        Starting from the root, visible nodes are selected in order of
+        priority, and their visible children considered in turn. Without
+        a camera position, the priority is the node size, i.e. the octree
+        is selected level by level. With a camera position, it is the node
+        size over the distance from the camera, so nearby nodes are refined
+        first.
+
+        Returns
+        -------
+        The indices of the selected nodes, in order of priority.
+        """
+        if point_budget is None:
+            point_budget = self.point_budget
+        if len(self._octree) == 0:
+            return []
+        visible = self.nodes_in_frustum(planes)
+        cell_size = self.size / (2.0 ** self._octree[:, 0])
+        if camera_position is None:
+            priority = cell_size
+        else:
+            lower, upper = self.node_bounds()
+            camera = np.asarray(camera_position, dtype=np.float64)
+            distance = np.linalg.norm(
+                np.maximum(0, np.maximum(lower - camera, camera - upper)), axis=1)
+            priority = cell_size / np.maximum(distance, 1e-3 * cell_size)
+        counts = self._octree[:, 5]
+        selected = []
+        total = 0
+        heap = [(-priority[0], 0)] if visible[0] else []
+        while heap:
+            _, i = heapq.heappop(heap)
+            if total + counts[i] > point_budget:
+                continue
+            selected.append(i)
+            total += counts[i]
+            for child in self._children[i]:
+                if visible[child]:
+                    heapq.heappush(heap, (-priority[child], child))
+        return selected
+
+    def get_node(self, index):
+        """Get the positions and colors (or None) of the points of a node."""
+        start, count = self._octree[index, 4:6]
+        points = self._order[start:start + count]
+        colors = None if self.colors is None else self.colors[points]
+        return self.positions[points], colors
+
+    def send_nodes(self, indices):
+        """Send the data of nodes to the front-end."""
+        for index in indices:
+            index = int(index)
+            if not 0 <= index < len(self._octree):
+                raise IndexError('Invalid node index: %r' % index)
+            positions, colors = self.get_node(index)
+            buffers = [positions]
+            if colors is not None:
+                buffers.append(colors)
+            self._sent_nodes.add(index)
+            self.send({'method': 'node_data', 'node': index,
+                       'count': len(positions), 'colors': colors is not None}, buffers)
+
+    def update_view(self, planes, camera_position=None):
+        """Show the nodes for a view, and send the ones not yet sent.
+
+        The front-end is first told which nodes to show, and the missing
+        nodes are then sent in order of priority.
+        """
+        selected = self.select_nodes(planes, camera_position)
+        self.send({'method': 'visible_nodes', 'nodes': selected})
+        self.send_nodes([i for i in selected if i not in self._sent_nodes])
+        return selected
+
+    def invalidate(self):
+        """Let the front-end discard all nodes, e.g. after the points changed."""
+        self._sent_nodes.clear()
+        self.send({'method': 'invalidate_nodes'})
+
+    def _handle_view_msg(self, widget, content, buffers):
+        method = content.get('method')
+        if method == 'update_view':
+            self.update_view(content['planes'], content.get('camera_position'))
+        elif method == 'request_nodes':
+            self.send_nodes(content['nodes'])
@@ -46,21 +46,30 @@ import zlib
 from traitlets import Undefined, TraitError
 from ipywidgets import widget_serialization, Widget
 
+from .traits import as_ndarray
+
 # Format:
 # {'dtype': string, 'shape': tuple, 'array': memoryview}
 
+def cast_int64(value):
+    """Cast (u)int64 data to a C-contiguous (u)int32 array, with a warning."""
+    warnings.warn('Cannot serialize (u)int64 data, Javascript does not support it. '
+                  'Casting to (u)int32.')
+    return value.astype(str(value.dtype).replace('64', '32'), order='C')
+
+
 def array_to_json(value, widget):
     """Array JSON serializer."""
     if value is None:
         return None
     if value is Undefined:
         raise TraitError('Cannot serialize undefined array!')
+    # View other array producers (buffer protocol, DLPack, ...) without copying
+    value = as_ndarray(value)
     # Workaround added to deal with slices: FIXME: what's the best place to put this?
     if isinstance(value, np.ndarray):
         if str(value.dtype) in ('int64', 'uint64'):
-            warnings.warn('Cannot serialize (u)int64 data, Javascript does not support it. '
-                          'Casting to (u)int32.')
-            value = value.astype(str(value.dtype).replace('64', '32'), order='C')
+            value = cast_int64(value)
         elif not value.flags['C_CONTIGUOUS']:
             value = np.ascontiguousarray(value)
     return {
@@ -75,8 +84,12 @@ def array_from_json(value, widget):
     """Array JSON de-serializer."""
     if value is None:
         return None
-    # may need to copy the array if the underlying buffer is readonly
-    n = np.frombuffer(value['buffer'], dtype=value['dtype'])
+    if 'encoding' in value:
+        from .encodings import decode_array
+        n = decode_array(value)
+    else:
+        # may need to copy the array if the underlying buffer is readonly
+        n = np.frombuffer(value['buffer'], dtype=value['dtype'])
     n.shape = value['shape']
     return n
 
@@ -84,13 +97,79 @@ array_serialization = dict(to_json=array_to_json, from_json=array_from_json)
 
 
 def array_to_compressed_json(value, widget):
-    """Compressed array JSON serializer."""
+    """Compressed array JSON serializer.
+
+    If the widget keeps an array version counter (`_array_version`), the
+    serialized state is cached on the widget, and reused until the
+    version, the array or the serialization options change. With
+    `auto_compression`, the compression level is chosen again for every
+    use, as the link estimate changes (see `ipydatawidgets.transport`),
+    so the uncompressed state is also cached.
+
+    Arrays kept in shared memory by the widget are serialized as a handle
+    to the shared memory instead.
+    """
+    shared = getattr(widget, '_shared', None)
+    if shared is not None and value is shared.array:
+        # Only send the handle, see shared.py
+        return shared.handle()
+    version = getattr(widget, '_array_version', None)
+    if version is None or value is None or value is Undefined:
+        return _array_to_compressed_json(value, widget)
+    auto = getattr(widget, 'auto_compression', False)
+    key = (
+        version,
+        id(value),
+        getattr(widget, 'compression_level', 0),
+        getattr(widget, 'array_encoding', 'none'),
+        auto,
+    )
+    cached = widget._serialized_cache
+    if cached is None or cached[0] != key:
+        raw = _array_to_encoded_json(value, widget)
+        level = _compression_level(raw, widget)
+        cached = (key, raw if auto else None, level, _compress_json(raw, level))
+    elif auto:
+        level = _compression_level(cached[1], widget)
+        if level != cached[2]:
+            cached = (key, cached[1], level, _compress_json(cached[1], level))
+    widget._serialized_cache = cached
+    # Return a copy, so that the cached state is never modified
+    return dict(cached[3])
+
+
+def _array_to_compressed_json(value, widget):
+    state = _array_to_encoded_json(value, widget)
+    if state is None:
+        return state
+    return _compress_json(state, _compression_level(state, widget))
+
+
+def _array_to_encoded_json(value, widget):
     state = array_to_json(value, widget)
     if state is None:
         return state
+    encoding = getattr(widget, 'array_encoding', 'none')
+    if encoding != 'none':
+        from .encodings import encode_array
+        encode_array(state, np.asarray(state['buffer']), encoding)
+    return state
+
+
+def _compression_level(state, widget):
     compression = getattr(widget, 'compression_level', 0)
+    if getattr(widget, 'auto_compression', False):
+        from ..transport import choose_compression_level
+        level = choose_compression_level(state['buffer'])
+        if level is not None:
+            compression = level
+    return compression
+
+
+def _compress_json(state, compression):
     if compression == 0:
         return state
+    state = dict(state)
     buffer = state.pop('buffer')
     state['compressed_buffer'] = zlib.compress(
         buffer,
@@ -131,3 +210,66 @@ def data_union_from_json(value, widget):
 data_union_serialization = dict(
     to_json=data_union_to_json,
     from_json=data_union_from_json)
+
+
+#  Serializers for tables (dict of named arrays):
+
+def table_to_json(value, widget):
+    """Table JSON serializer.
+
+    Each column is serialized as a separate array, so that every column
+    ends up as its own binary buffer in a single message.
+    """
+    if value is None:
+        return None
+    return {name: array_to_compressed_json(column, widget)
+            for name, column in value.items()}
+
+
+def table_from_json(value, widget):
+    """Table JSON de-serializer."""
+    if value is None:
+        return None
+    return {name: array_from_compressed_json(column, widget)
+            for name, column in value.items()}
+
+
+table_serialization = dict(
+    to_json=table_to_json,
+    from_json=table_from_json)
+
+
+#  Serializers for image data union, with optional image encoding:
+
+def image_union_to_json(value, widget):
+    """Serializer for image data, encoding arrays according to the widget format.
+
+    Widget references are passed as is, since the referenced data widget
+    syncs its own data. Only RGBA data is encoded, as scalar data is
+    mapped to colors in the front-end.
+    """
+    format = getattr(widget, 'format', 'raw')
+    if (value is None or isinstance(value, Widget) or format == 'raw' or
+            value.ndim != 3):
+        return data_union_to_json(value, widget)
+    from .image_encoding import encode_image
+    value = np.ascontiguousarray(value)
+    return {
+        'shape': value.shape,
+        'dtype': str(value.dtype),
+        'format': format,
+        'buffer': memoryview(encode_image(value, format, getattr(widget, 'quality', 85))),
+    }
+
+
+def image_union_from_json(value, widget):
+    """Deserializer for image data, decoding encoded images"""
+    if isinstance(value, dict) and value.get('format', 'raw') != 'raw':
+        from .image_encoding import decode_image
+        return decode_image(bytes(value['buffer']))
+    return data_union_from_json(value, widget)
+
+
+image_union_serialization = dict(
+    to_json=image_union_to_json,
+    from_json=image_union_from_json)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Shared memory transport of arrays, for consumers on the same host.
+
+The array is placed in a `multiprocessing.shared_memory` block, after a
+small header holding the version of the data. Instead of the data, only
+a handle with the name of the block, the shape and the dtype is sent,
+and consumers attach to the block with `attach_shared_array`, without
+copying. Browser front-ends can not attach to shared memory.
+
+Header layout (64 bytes, followed by the C-contiguous array data):
+
+- 8 bytes: the magic string b'DWSHM001'
+- 8 bytes: the version of the data, as a little-endian int64
+"""
+
+import ctypes
+from multiprocessing import shared_memory
+import struct
+
+import numpy as np
+
+
+header_size = 64
+
+_magic = b'DWSHM001'
+_version_format = '<q'
+
+# The names of the blocks created by this process
+_owned_names = set()
+
+
+def _open_shared_memory(name):
+    """Attach to an existing shared memory block, without tracking it.
+
+    Otherwise, the resource tracker of this process would unlink the
+    block when this process exits, even though the owner still uses it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13, attached blocks are always tracked
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _owned_names:
+            # This process does not own the block. If it did, this would
+            # also drop the registration of the owner.
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class _SharedMemoryView(object):
+    """Exposes an array in a shared memory block to numpy.
+
+    Arrays viewing the block reference this object, which keeps the
+    block mapped until the last of them is garbage collected. A numpy
+    array created directly from the block's memoryview would not,
+    so closing the block would leave it pointing to unmapped memory.
+    """
+
+    def __init__(self, shm, shape, dtype, offset, readonly):
+        self.shm = shm
+        # Holds an export of the block's buffer, so it can not be released
+        self._pointer = ctypes.c_char.from_buffer(shm.buf, offset)
+        self.__array_interface__ = {
+            'shape': tuple(shape),
+            'typestr': dtype.str,
+            'descr': dtype.descr,
+            'data': (ctypes.addressof(self._pointer), readonly),
+            'version': 3,
+        }
+
+    def __del__(self):
+        # Release the export first, so the block can be closed
+        self._pointer = None
+
+
+class SharedArrayBuffer(object):
+    """An array in a shared memory block, with a version header.
+
+    Use `create` to allocate a new block, or `attach_shared_array` to
+    attach to a block created by another process.
+    """
+
+    def __init__(self, shm, shape, dtype, owner, readonly=False):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = owner
+        self.array = np.asarray(_SharedMemoryView(
+            shm, self.shape, self.dtype, header_size, readonly))
+
+    @classmethod
+    def create(cls, shape, dtype):
+        """Allocate a new shared memory block for an array."""
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=header_size + max(nbytes, 1))
+        _owned_names.add(shm.name)
+        shm.buf[:len(_magic)] = _magic
+        buffer = cls(shm, shape, dtype, owner=True)
+        buffer.version = 0
+        return buffer
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def version(self):
+        """The version of the data, as last set by the owner."""
+        return struct.unpack_from(_version_format, self.shm.buf, len(_magic))[0]
+
+    @version.setter
+    def version(self, value):
+        struct.pack_into(_version_format, self.shm.buf, len(_magic), value)
+
+    def handle(self):
+        """A JSON-able description of the block, to attach to it."""
+        return {
+            'shared_memory': self.name,
+            'offset': header_size,
+            'shape': list(self.shape),
+            'dtype': str(self.dtype),
+            'version': self.version,
+        }
+
+    def close(self):
+        """Release the block.
+
+        The owner also unlinks it, so no new consumers can attach. The
+        block stays mapped in this process until all views of `array`
+        are garbage collected, and the memory is freed by the OS once
+        all processes have detached.
+        """
+        if self.shm is None:
+            return
+        shm, self.shm = self.shm, None
+        self.array = None
+        if self.owner:
+            _owned_names.discard(shm.name)
+            shm.unlink()
+
+
+def attach_shared_array(handle, readonly=True):
+    """Attach to an array shared by a data widget in another process.
+
+    Parameters
+    ----------
+    handle : dict
+        The handle of the shared array, as sent instead of the array
+        data by a widget with `transport='shared_memory'`, or as given
+        by its `shared_handle` property.
+    readonly : bool
+        Whether to make the attached array read-only.
+
+    Returns
+    -------
+    A SharedArrayBuffer. Its `array` is a view of the shared memory,
+    and its `version` is incremented by the owner on every change.
+    """
+    shm = _open_shared_memory(handle['shared_memory'])
+    if bytes(shm.buf[:len(_magic)]) != _magic:
+        raise ValueError('Shared memory block %r does not hold a data widget array'
+                         % handle['shared_memory'])
+    return SharedArrayBuffer(shm, handle['shape'], handle['dtype'],
+                             owner=False, readonly=readonly)
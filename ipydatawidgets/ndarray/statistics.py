@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Summary statistics of arrays, for shipping alongside the array data.
+"""
+
+import numpy as np
+
+
+def array_statistics(array, bins=32):
+    """Compute summary statistics of a numeric array.
+
+    Non-finite values are excluded from all statistics except the NaN
+    count. All values are plain Python types, so that the result can
+    be serialized as JSON.
+
+    Parameters
+    ----------
+    array : ndarray
+        The array to summarize.
+    bins : int
+        The number of equal-width histogram bins between min and max.
+
+    Returns
+    -------
+    A dict with keys 'min', 'max', 'mean', 'nan_count', 'histogram' and
+    'bin_edges', or an empty dict if the array is not numeric.
+    """
+    if array.dtype.kind not in 'biuf':
+        return {}
+    if array.dtype == bool:
+        array = array.view(np.uint8)
+    nan_count = 0
+    if array.dtype.kind == 'f':
+        finite = np.isfinite(array)
+        if not finite.all():
+            nan_count = int(np.count_nonzero(np.isnan(array)))
+            array = array[finite]
+    if array.size == 0:
+        return {
+            'min': None, 'max': None, 'mean': None, 'nan_count': nan_count,
+            'histogram': [], 'bin_edges': [],
+        }
+    vmin = array.min()
+    vmax = array.max()
+    histogram, bin_edges = np.histogram(array, bins=bins, range=(vmin, vmax))
+    return {
+        'min': vmin.item(),
+        'max': vmax.item(),
+        'mean': float(array.mean(dtype=np.float64)),
+        'nan_count': nan_count,
+        'histogram': histogram.tolist(),
+        'bin_edges': bin_edges.tolist(),
+    }
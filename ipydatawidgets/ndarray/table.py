@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Data widget for columnar tables of numpy arrays.
+"""
+
+from contextlib import contextmanager
+
+from ipywidgets import register
+from traitlets import Unicode, Bool, Dict, Int, List, TraitError, validate
+import numpy as np
+
+from ..widgets import DataWidget
+from .arrow import as_arrow_table, arrow_to_numpy
+from .traits import NDArray
+from .serializers import cast_int64, table_serialization
+
+
+@register
+class NDArrayTable(DataWidget):
+    """A widget representing a table of named, typed columns.
+
+    All columns share the same number of rows (the length of their
+    first dimension), and are synced together in a single message,
+    with one binary buffer per column. This ensures that the columns
+    are always updated atomically in the front-end.
+
+    Columns can have more than one dimension, e.g. a column of
+    positions could have the shape (n_rows, 3).
+    """
+    _model_name = Unicode('NDArrayTableModel').tag(sync=True)
+
+    _rows_to_send = List()
+
+    columns = Dict(value_trait=NDArray()).tag(sync=True, **table_serialization)
+
+    compression_level = Int(0,
+        help='If above 0, compress the data with zlib during serialization. '
+        'Note: It is often more efficient to turn on compression on the '
+        'notebook application level than to use this option.').tag(sync=True)
+
+    auto_compression = Bool(False,
+        help='Whether to pick the compression level of each message from the '
+        'measured link to the front-end, to minimize the time until the data '
+        'is displayed. compression_level is used until the link has been measured.')
+
+    def __init__(self, columns=None, **kwargs):
+        if columns is None:
+            columns = {}
+        super(NDArrayTable, self).__init__(columns=columns, **kwargs)
+
+    @classmethod
+    def from_arrow(cls, table, **kwargs):
+        """Create a table widget from an Arrow table.
+
+        Columns without nulls that consist of a single chunk are
+        viewed directly, without copying the data.
+        """
+        table = as_arrow_table(table)
+        columns = {name: arrow_to_numpy(table.column(name))
+                   for name in table.schema.names}
+        return cls(columns, **kwargs)
+
+    @property
+    def num_rows(self):
+        """The number of rows shared by all columns."""
+        for column in self.columns.values():
+            return column.shape[0]
+        return 0
+
+    @property
+    def column_names(self):
+        return list(self.columns.keys())
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @validate('columns')
+    def _validate_columns(self, proposal):
+        value = proposal['value']
+        num_rows = None
+        for name, column in value.items():
+            if column.ndim == 0:
+                raise TraitError('Column %r needs at least one dimension' % name)
+            if num_rows is None:
+                num_rows = column.shape[0]
+            elif column.shape[0] != num_rows:
+                raise TraitError(
+                    'All columns must have the same number of rows, but column '
+                    '%r has %d rows (expected %d)' % (name, column.shape[0], num_rows))
+        return value
+
+    def notify_changed(self):
+        """Use this to mark that the columns are changed.
+
+        This will cause the table to be synced as it normally would
+        after a change, and is useful when the columns have been
+        modified in-place.
+
+        This respects hold_trait_notifications and hold_sync.
+        """
+        self._notify_trait('columns', self.columns, self.columns)
+
+    def sync_rows(self, start, stop):
+        """Sync a range of rows across all columns.
+
+        By only syncing a range of rows, a full transmission of the
+        updated table is avoided. However, this does put the responsibility
+        of ensuring the correct sync state on the caller.
+
+        This respects hold_sync, so several row ranges can be stacked with
+        multiple calls when holding the sync.
+
+        Parameters
+        ----------
+        start : int
+            The first row to sync.
+        stop : int
+            The end of the row range to sync (exclusive).
+        """
+        if self._holding_sync:
+            self._rows_to_send.append((start, stop))
+        else:
+            self.send_rows(start, stop)
+
+    def send_rows(self, start, stop):
+        """Send a range of rows of all columns to the front-end.
+
+        Note: This does not respect hold_sync. If that is wanted, use
+        sync_rows instead.
+
+        Parameters
+        ----------
+        start : int
+            The first row to send.
+        stop : int
+            The end of the row range to send (exclusive).
+        """
+        start, stop, _ = slice(start, stop).indices(self.num_rows)
+        names = []
+        buffers = []
+        for name, column in self.columns.items():
+            names.append(name)
+            rows = column[start:stop]
+            if str(rows.dtype) in ('int64', 'uint64'):
+                # As for the full state, see array_to_json
+                rows = cast_int64(rows)
+            buffers.append(np.ascontiguousarray(rows))
+
+        msg = {'method': 'update_table_rows', 'name': 'columns',
+               'start': start, 'columns': names}
+        self.send(msg, buffers)
+
+    @contextmanager
+    def hold_sync(self):
+        with super(NDArrayTable, self).hold_sync():
+            try:
+                yield
+            finally:
+                for start, stop in self._rows_to_send:
+                    self.send_rows(start, stop)
+                self._rows_to_send = []
@@ -8,20 +8,65 @@
 Array trait types and helpers
 """
 
+from functools import lru_cache
 import warnings
 
 import numpy as np
 from traitlets import TraitError, Undefined
 from traittypes import Array, SciType
 
+from .arrow import is_arrow_object, arrow_to_numpy
+
+
+def as_ndarray(value):
+    """View an array-like data producer as a numpy array, without copying.
+
+    This accepts objects implementing the DLPack protocol (e.g. CPU torch
+    tensors), the numpy array interface or the buffer protocol, as well
+    as pyarrow arrays. Other values are returned unchanged.
+    """
+    if isinstance(value, np.ndarray):
+        return value
+    if is_arrow_object(value):
+        return arrow_to_numpy(value)
+    if hasattr(value, '__dlpack__') and hasattr(np, 'from_dlpack'):
+        try:
+            return np.from_dlpack(value)
+        except (BufferError, TypeError, RuntimeError):
+            # E.g. device memory, or a tensor that requires grad.
+            # Fall back to the other protocols.
+            pass
+    if hasattr(value, '__array_interface__') or hasattr(value, '__array_struct__'):
+        return np.asarray(value)
+    try:
+        view = memoryview(value)
+    except TypeError:
+        return value
+    return np.asarray(view)
+
+
+def is_frontend_update(obj, name):
+    """Whether the trait `name` of obj is being set by the front-end.
+
+    The front-end only sends a value when it has changed, so for these
+    updates the (potentially expensive) equality check can be skipped.
+    """
+    return name in getattr(obj, '_property_lock', ())
+
 
 class NDArray(Array):
-    """A numpy array trait type."""
+    """A numpy array trait type.
+
+    Anything implementing the DLPack protocol, the numpy array interface
+    or the buffer protocol is viewed directly, so that no copy is made
+    unless the dtype needs to be coerced.
+    """
 
     def __init__(self, default_value=Undefined, dtype=None, **kwargs):
         super(NDArray, self).__init__(default_value=default_value, dtype=dtype, **kwargs)
 
     def validate(self, obj, value):
+        value = as_ndarray(value)
         value = super(NDArray, self).validate(obj, value)
         if value is None or value is Undefined:
             return value
@@ -29,9 +74,22 @@ class NDArray(Array):
             raise TraitError('Object dtype not supported')
         return value
 
+    def set(self, obj, value):
+        if not is_frontend_update(obj, self.name):
+            return super(NDArray, self).set(obj, value)
+        new_value = self._validate(obj, value)
+        old_value = obj._trait_values.get(self.name, self.default_value)
+        obj._trait_values[self.name] = new_value
+        obj._notify_trait(self.name, old_value, new_value)
+
 
+@lru_cache(maxsize=256)
 def shape_constraints(*args):
-    """Example: shape_constraints(None,3) insists that the shape looks like (*,3)"""
+    """Example: shape_constraints(None,3) insists that the shape looks like (*,3)
+
+    Validators of recently used constraints are cached, so that equal
+    constraints give the same validator (and constrained widget class).
+    """
 
     def validator(trait, value):
         if value is None or value is Undefined:
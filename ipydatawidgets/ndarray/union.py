@@ -4,16 +4,57 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
-from functools import partial
+import weakref
 
 import numpy as np
+from ipywidgets import Widget
 from traitlets import Union, Instance, Undefined, TraitError
 
 from .serializers import data_union_serialization
-from .traits import NDArray
+from .traits import NDArray, is_frontend_update
 from .widgets import NDArrayWidget, NDArrayBase, NDArraySource
 
 
+class _UnionLink(object):
+    """The link between an owner of a DataUnion and a widget it uses.
+
+    The link validates changes to the widget's array against the union,
+    and forwards array change notifications to the owner. It only holds
+    a weak reference to the owner, so that widgets used by many owners
+    do not keep those alive. When the owner is garbage collected, the
+    link detaches itself.
+    """
+    __slots__ = ('trait', 'owner_ref', 'widget', '__weakref__')
+
+    def __init__(self, trait, owner, widget):
+        self.trait = trait
+        self.owner_ref = weakref.ref(owner, self._on_owner_collected)
+        self.widget = widget
+
+    def attach(self):
+        self.widget._instance_validators.add(self.validate)
+        self.widget._union_links[self] = None
+
+    def detach(self):
+        self.widget._instance_validators.discard(self.validate)
+        self.widget._union_links.pop(self, None)
+
+    def validate(self, value):
+        owner = self.owner_ref()
+        if owner is None:
+            return value
+        # We can validate directly, since the union validator accepts arrays also:
+        return self.trait._validate_child(owner, value)
+
+    def notify(self):
+        owner = self.owner_ref()
+        if owner is not None:
+            owner._notify_trait(self.trait.name, self.widget, self.widget)
+
+    def _on_owner_collected(self, ref):
+        self.detach()
+
+
 class DataUnion(Union):
     """
     Union trait of NDArray and NDArrayBase for numpy arrays.
@@ -34,8 +75,8 @@ class DataUnion(Union):
 
         self.tag(**data_union_serialization)
 
-        self._registered_validators = {}
-        self._registered_observer = {}
+        # The links to widgets used by owners, keyed by owner
+        self._links = weakref.WeakKeyDictionary()
 
     def set(self, obj, value):
         new_value = self._validate(obj, value)
@@ -45,6 +86,9 @@ class DataUnion(Union):
             old_value = self.default_value
 
         obj._trait_values[self.name] = new_value
+        if is_frontend_update(obj, self.name):
+            obj._notify_trait(self.name, old_value, new_value)
+            return
         try:
             silent = np.array_equal(old_value, new_value)
         except:
@@ -62,30 +106,26 @@ class DataUnion(Union):
 
     def instance_init(self, inst):
         inst.observe(self._on_instance_value_change, self.name)
+        if isinstance(inst, Widget):
+            inst.observe(self._on_owner_comm_change, 'comm')
 
     def _on_instance_value_change(self, change):
         inst = change['owner']
-        if isinstance(change['old'], NDArrayWidget):
-            f = self._registered_validators.pop(inst, None)
-            if f is not None:
-                change['old']._instance_validators.remove(f)
-
-            f = self._registered_observer.pop(inst, None)
-            if f is not None:
-                change['old'].unobserve(f)
+        self._unlink(inst)
         if isinstance(change['new'], NDArrayWidget):
-            # We can validate directly, since our validator accepts arrays also:
-            f = partial(self._validate_child, inst)
-            self._registered_validators[inst] = f
-            change['new']._instance_validators.add(f)
-
-            f = partial(self._on_widget_array_change, inst)
-            self._registered_observer[inst] = f
-            change['new'].observe(f, 'array')
-
-    def _on_widget_array_change(self, union, change):
-        inst = change['owner']
-        union._notify_trait(self.name, inst, inst)
+            link = _UnionLink(self, inst, change['new'])
+            self._links[inst] = link
+            link.attach()
+
+    def _on_owner_comm_change(self, change):
+        if change['new'] is None:
+            # The owner was closed, release the widget it uses
+            self._unlink(change['owner'])
+
+    def _unlink(self, inst):
+        link = self._links.pop(inst, None)
+        if link is not None:
+            link.detach()
 
     def _validate_child(self, obj, value):
         try:
@@ -8,15 +8,30 @@
 Data widgets for numpy arrays.
 """
 
+from collections import deque
 from contextlib import contextmanager
-
-from ipywidgets import register
-from traitlets import Unicode, Set, Undefined, Int, validate
+import warnings
+import weakref
+import zlib
+
+from ipywidgets import register, CallbackDispatcher
+from traitlets import (
+    Unicode, Set, Undefined, Bool, Dict, Int, Enum, TraitError, observe, validate
+)
 import numpy as np
 
+from ..memory import buffers_nbytes
+from ..sync import batched_sync
 from ..widgets import DataWidget
 from .traits import NDArray
+from .encodings import encodings
 from .serializers import compressed_array_serialization
+from .statistics import array_statistics
+
+
+# The size of the blocks of arrays copied into shared memory that are
+# checksummed, to detect changes to the copied array (see NDArrayWidget)
+_shared_check_block = 1 << 20
 
 
 class NDArrayBase(DataWidget):
@@ -66,9 +81,78 @@ class NDArrayWidget(NDArrayBase):
         'Note: It is often more efficient to turn on compression on the '
         'notebook application level than to use this option.').tag(sync=True)
 
+    auto_compression = Bool(False,
+        help='Whether to pick the compression level of each message from the '
+        'measured link to the front-end, to minimize the time until the data '
+        'is displayed. compression_level is used until the link has been measured.')
+
+    array_encoding = Enum(encodings, 'none',
+        help='Encoding to apply to the data during serialization. Use "bitpack" '
+        'for bool arrays, "rle" for label maps or masks with long runs of equal '
+        'values, "dictionary" for integer arrays with few unique values, or '
+        '"auto" to pick the encoding giving the smallest payload.')
+
+    compute_statistics = Bool(False,
+        help='Whether to keep the statistics of the array up to date, and '
+        'sync them to the front-end.')
+
+    histogram_bins = Int(32, help='The number of bins in the histogram of the statistics.')
+
+    statistics = Dict(read_only=True,
+        help='Summary statistics of the array: min, max, mean, nan_count, '
+        'and a histogram with its bin_edges. Only computed when '
+        'compute_statistics is enabled.').tag(sync=True)
+
+    transport = Enum(('comm', 'shared_memory'), 'comm',
+        help='How the array data is sent. With "shared_memory", the array is '
+        'kept in a shared memory block, and only a handle to it is sent, '
+        'which consumers on the same host attach to with '
+        'attach_shared_array. Browser front-ends can not display it. '
+        'Assigned arrays are copied into the block, so in-place changes '
+        'must be made to the array attribute, not to the assigned array.')
+
+    resync_log_size = Int(256, min=0,
+        help='The number of segment updates to remember, so that a front-end '
+        'that missed some of them can be resynced without resending the '
+        'full array.')
+
+    # Whether widgets are opened without their array (see create_array_widgets)
+    _defer_array_on_open = False
+
     def __init__(self, array=Undefined, **kwargs):
+        self._defer_array_sync = NDArrayWidget._defer_array_on_open
         self._instance_validators = set()
+        # Links to the DataUnion owners using this widget (see union.py)
+        self._union_links = {}
+        # A version counter for the array data, incremented on every change,
+        # and the serialized state of the last version (see serializers)
+        self._array_version = 0
+        self._serialized_cache = None
+        # The segments changed in each version since the last full change.
+        # Versions after `_log_base` are covered by the log.
+        self._segment_log = deque()
+        self._log_base = 0
+        # The shared memory holding the array, with transport='shared_memory'
+        self._shared = None
+        self._shared_finalizer = None
+        # The last array copied into shared memory, to detect changes to it
+        self._shared_source = None
+        self._statistics_version = None
+        self._segment_change_handlers = CallbackDispatcher()
+        self._initializing = True
         super(NDArrayWidget, self).__init__(array=array, **kwargs)
+        self._initializing = False
+        self.on_msg(self._handle_segment_upload)
+        self.on_msg(self._handle_resync)
+
+    def get_state(self, key=None, drop_defaults=False):
+        if key is None and self._defer_array_sync:
+            key = [k for k in self.keys if k != 'array']
+        state = super(NDArrayWidget, self).get_state(key=key, drop_defaults=drop_defaults)
+        if 'array' in state:
+            # Let the front-end know which version of the array it has
+            state['array_version'] = self._array_version
+        return state
 
     def _get_shape(self):
         return self.array.shape
@@ -89,6 +173,68 @@ class NDArrayWidget(NDArrayBase):
             value = validator(value)
         return value
 
+    def notify_change(self, change):
+        # Bump the version before the new state is sent to the front-end
+        if change['name'] == 'array':
+            # Hold the sync, so updated statistics are sent with the array
+            with self.hold_sync():
+                if self.transport == 'shared_memory':
+                    self._store_shared(change['new'])
+                self._bump_array_version()
+                # The whole array changed, so older versions can not be resynced
+                self._segment_log.clear()
+                self._log_base = self._array_version
+                super(NDArrayWidget, self).notify_change(change)
+            for link in list(self._union_links):
+                link.notify()
+        else:
+            super(NDArrayWidget, self).notify_change(change)
+
+    def _bump_array_version(self):
+        self._array_version += 1
+        self._serialized_cache = None
+        if self._shared is not None:
+            self._shared.version = self._array_version
+        if self.compute_statistics:
+            self._update_statistics()
+
+    def _update_statistics(self):
+        """Compute the statistics, if they are not up to date for this version."""
+        if self._statistics_version == self._array_version:
+            return
+        array = self._trait_values.get('array', None)
+        if array is None or array is Undefined:
+            statistics = {}
+        else:
+            statistics = array_statistics(array, self.histogram_bins)
+        self._statistics_version = self._array_version
+        self.set_trait('statistics', statistics)
+
+    @observe('compute_statistics', 'histogram_bins')
+    def _on_statistics_options_change(self, change):
+        if self._initializing:
+            # Computed when the initial array is set
+            return
+        if change['name'] == 'histogram_bins':
+            self._statistics_version = None
+        if self.compute_statistics:
+            self._update_statistics()
+
+    def _memory_usage(self):
+        usage = super(NDArrayWidget, self)._memory_usage()
+        if self._serialized_cache is not None:
+            array = self._trait_values.get('array', None)
+            exclude = [array] if isinstance(array, np.ndarray) else []
+            _, raw, _, state = self._serialized_cache
+            states = [state] if raw is None or raw is state else [raw, state]
+            usage['cache'] += buffers_nbytes(
+                [v for s in states for v in s.values() if isinstance(v, (memoryview, bytes))],
+                exclude)
+        return usage
+
+    def _evict_caches(self):
+        self._serialized_cache = None
+
     def notify_changed(self):
         """Use this to mark that the array is changed.
 
@@ -96,10 +242,43 @@ class NDArrayWidget(NDArrayBase):
         after a change, and is useful when the array has been modified
         in-place.
 
+        With transport='shared_memory', the array must be modified
+        through the `array` attribute, as assigned arrays are copied
+        into shared memory. A warning is given if the assigned array
+        was modified instead.
+
         This respects hold_trait_notifications and hold_sync.
         """
+        self._check_shared_source()
         self._notify_trait('array', self.array, self.array)
 
+    def replace_array(self, array):
+        """Replace the array, without validating it.
+
+        This is a fast path for e.g. render loops, that repeatedly assign
+        new arrays known to be valid. The new array must be a numpy array
+        with the same dtype and shape as the current array. Since only
+        this metadata is checked, the array is trusted to pass any other
+        constraints on its values, e.g. from a DataUnion using this widget.
+        No equality check is done, so the change is always synced.
+
+        Parameters
+        ----------
+        array : ndarray
+            The new array.
+        """
+        current = self._trait_values.get('array', None)
+        if current is None or current is Undefined:
+            raise TraitError('Cannot replace an unset array, assign it instead')
+        if not isinstance(array, np.ndarray):
+            raise TraitError('Expected a numpy array, got %r' % type(array))
+        if array.dtype != current.dtype or array.shape != current.shape:
+            raise TraitError(
+                'Replacement array must match the current dtype and shape %s %r, '
+                'got %s %r' % (current.dtype, current.shape, array.dtype, array.shape))
+        self._trait_values['array'] = array
+        self._notify_trait('array', current, array)
+
     def sync_segment(self, segments):
         """Sync a segments of contiguous memory.
 
@@ -110,13 +289,18 @@ class NDArrayWidget(NDArrayBase):
         This respects hold_sync, so several segments can be stacked with
         multiple calls when holding the sync.
 
+        With transport='shared_memory', the segments must be modified
+        through the `array` attribute (see `notify_changed`).
+
         Parameters
         ----------
         segments : iterable of two-tuples
             An iterable collection of segments represented by (start, stop) tuples.
         """
         if self._holding_sync:
-            self._segments_to_send.add(*segments)
+            # The version is bumped when the segments are sent
+            self._serialized_cache = None
+            self._segments_to_send.update(tuple(s) for s in segments)
         else:
             self.send_segment(segments)
 
@@ -131,16 +315,234 @@ class NDArrayWidget(NDArrayBase):
         segments : iterable of two-tuples
             An iterable collection of segments represented by (start, stop) tuples.
         """
+        length = self.array.size
+        segments = [slice(*s).indices(length)[:2] for s in segments]
+        self._check_shared_source(segments)
+        base_version = self._array_version
+        self._bump_array_version()
+        self._log_segments(segments)
+        self._send_segments(segments, base_version)
+
+    def _send_segments(self, segments, base_version, resync=False):
+        if self._shared is not None:
+            # The data is already in shared memory, only signal the change
+            self.send({'method': 'update_shared_segment', 'name': 'array',
+                       'segments': [list(s) for s in segments],
+                       'version': self._array_version, 'base_version': base_version,
+                       'resync': resync})
+            return
         starts = []
         buffers = []
         raveled = np.ravel(self.array, order='C')
-        length = len(raveled)
-        for s in segments:
-            starts.append(s[0] if s[0] >= 0 else length - s[0])
-            buffers.append(np.ascontiguousarray(raveled[s[0]:s[1]]))
+        for start, stop in segments:
+            starts.append(start)
+            buffers.append(np.ascontiguousarray(raveled[start:stop]))
+        # The front-end can tell it missed an update if it is not at base_version
+        # Resync replies reach all front-ends, so they are marked as such
+        msg = {'method': 'update_array_segment', 'name': 'array', 'starts': starts,
+               'version': self._array_version, 'base_version': base_version,
+               'resync': resync}
+        self.send(msg, buffers)
+
+    def _log_segments(self, segments):
+        if self.resync_log_size == 0:
+            self._segment_log.clear()
+            self._log_base = self._array_version
+            return
+        while len(self._segment_log) >= self.resync_log_size:
+            self._log_base = self._segment_log.popleft()[0]
+        self._segment_log.append((self._array_version, list(segments)))
+
+    def segments_since(self, version):
+        """Get the segments changed since a version of the array.
+
+        Returns
+        -------
+        A sorted list of non-overlapping (start, stop) segments, or None if
+        the change log does not go back to the version.
+        """
+        if not self._log_base <= version <= self._array_version:
+            return None
+        segments = sorted(s for v, logged in self._segment_log if v > version
+                          for s in logged if s[1] > s[0])
+        merged = []
+        for start, stop in segments:
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], stop)
+            else:
+                merged.append([start, stop])
+        return [tuple(s) for s in merged]
+
+    def resync(self, version):
+        """Bring a front-end holding an older version of the array up to date.
+
+        Only the segments changed since that version are sent, unless the
+        change log does not go back far enough, or the changes cover more
+        than half the array, in which case the full array is sent.
+
+        Parameters
+        ----------
+        version : int
+            The version of the array that the front-end has.
+        """
+        segments = self.segments_since(version)
+        if segments is not None:
+            n_changed = sum(stop - start for start, stop in segments)
+            if n_changed * 2 <= self.array.size:
+                self._send_segments(segments, version, resync=True)
+                return
+        self.send_state('array')
+
+    @property
+    def shared_handle(self):
+        """The handle of the shared array, or None if not using shared memory.
+
+        Pass it to `attach_shared_array` in another process on the same
+        host, to access the array without copying it.
+        """
+        return self._shared.handle() if self._shared is not None else None
+
+    def _store_shared(self, array):
+        """Move an array into shared memory, and use the shared copy."""
+        from .shared import SharedArrayBuffer
+        if array is None or array is Undefined:
+            self._release_shared()
+            return
+        shared = self._shared
+        if shared is not None and array is shared.array:
+            return
+        if shared is None or shared.shape != array.shape or shared.dtype != array.dtype:
+            self._release_shared()
+            shared = self._shared = SharedArrayBuffer.create(array.shape, array.dtype)
+            self._shared_finalizer = weakref.finalize(self, shared.close)
+        shared.array[...] = array
+        self._shared_source = None
+        if array.flags.c_contiguous:
+            data = array.reshape(-1).view(np.uint8)
+            self._shared_source = (weakref.ref(array), [
+                zlib.crc32(data[i:i + _shared_check_block])
+                for i in range(0, data.size, _shared_check_block)])
+        self._trait_values['array'] = shared.array
+
+    def _check_shared_source(self, segments=None):
+        """Warn if the array copied into shared memory was changed instead of the copy.
+
+        Only the blocks overlapping the segments are checked against
+        the checksums taken when the array was copied.
+        """
+        if self._shared_source is None:
+            return
+        ref, checksums = self._shared_source
+        source = ref()
+        if source is None:
+            self._shared_source = None
+            return
+        data = source.reshape(-1).view(np.uint8)
+        if segments is None:
+            blocks = range(len(checksums))
+        else:
+            itemsize = source.dtype.itemsize
+            blocks = sorted(set(
+                b for start, stop in segments if stop > start
+                for b in range(start * itemsize // _shared_check_block,
+                               (stop * itemsize - 1) // _shared_check_block + 1)))
+        for b in blocks:
+            start = b * _shared_check_block
+            if zlib.crc32(data[start:start + _shared_check_block]) != checksums[b]:
+                # Only warn once for each assigned array
+                self._shared_source = None
+                warnings.warn(
+                    'The array assigned to %s was changed, but its data was copied '
+                    'into shared memory, so the change is not synced. With '
+                    'transport="shared_memory", modify the array attribute of the '
+                    'widget instead.' % type(self).__name__)
+                return
+
+    def _release_shared(self):
+        """Unlink the shared memory, keeping a private copy of the array.
+
+        Views of the old shared array, e.g. kept by the user, stay valid.
+        """
+        shared = self._shared
+        if shared is None:
+            return
+        if self._trait_values.get('array', None) is shared.array:
+            self._trait_values['array'] = np.array(shared.array)
+        self._shared = None
+        self._shared_source = None
+        self._shared_finalizer()
+
+    @validate('transport')
+    def _validate_transport(self, proposal):
+        if proposal['value'] == 'shared_memory':
+            try:
+                from . import shared
+            except ImportError:
+                raise TraitError('transport="shared_memory" requires Python 3.8 or later')
+        return proposal['value']
+
+    @observe('transport')
+    def _on_transport_change(self, change):
+        if change['new'] == 'shared_memory':
+            self._store_shared(self._trait_values.get('array', None))
+        else:
+            self._release_shared()
+        if not self._initializing:
+            self.send_state('array')
+
+    @observe('comm')
+    def _on_close_release_shared(self, change):
+        if change['new'] is None:
+            self._release_shared()
+
+    def _handle_resync(self, widget, content, buffers):
+        if content.get('method') == 'resync' and content.get('name', 'array') == 'array':
+            self.resync(int(content['version']))
 
-        msg = {'method': 'update_array_segment', 'name': 'array', 'starts': starts}
-        self._send(msg, buffers)
+    def on_segment_change(self, callback, remove=False):
+        """Register a callback for segments uploaded by the front-end.
+
+        Segment uploads are applied in-place to the array, and do not
+        trigger the observers of the `array` trait. Instead, the callback
+        is called as `callback(widget, segments)`, where segments is a list
+        of the modified (start, stop) ranges of the raveled array.
+
+        Parameters
+        ----------
+        remove : bool
+            If True, unregister the callback.
+        """
+        self._segment_change_handlers.register_callback(callback, remove=remove)
+
+    def _handle_segment_upload(self, widget, content, buffers):
+        if content.get('method') != 'upload_array_segment' or content['name'] != 'array':
+            return
+        array = self.array
+        if not (array.flags.writeable and array.flags.c_contiguous):
+            # E.g. an array received from the front-end is a read-only view of
+            # the message buffer. Copy it once, so that this and later
+            # uploads can be applied in-place.
+            array = np.array(array, order='C')
+            self._trait_values['array'] = array
+        raveled = array.reshape(-1)
+        updates = []
+        for start, buffer in zip(content['starts'], buffers):
+            data = np.frombuffer(buffer, dtype=content['dtype'])
+            stop = start + len(data)
+            if start < 0 or stop > len(raveled):
+                raise IndexError('Uploaded segment (%d, %d) is out of bounds for '
+                                 'array of size %d' % (start, stop, len(raveled)))
+            updates.append((start, stop, data))
+        # Only modify the array once all segments are known to be valid
+        for start, stop, data in updates:
+            raveled[start:stop] = data
+        segments = [(start, stop) for start, stop, _ in updates]
+        self._bump_array_version()
+        # Logged, so other front-ends can resync the uploaded segments
+        self._log_segments(segments)
+        self._segment_change_handlers(self, segments)
+        for link in list(self._union_links):
+            link.notify()
 
     @contextmanager
     def hold_sync(self):
@@ -153,28 +555,36 @@ class NDArrayWidget(NDArrayBase):
                     self._segments_to_send.clear()
 
 
-# Signature SHOULD be create_constrained_arraywidget(*validators, dtype=None),
-# but this is not supported by Python 2.7. For Python 3, we try to be
-# helpful by overriding the signature below.
-def create_constrained_arraywidget(*validators, **kwargs):
+def create_constrained_arraywidget(*validators, dtype=None):
     """Returns a subclass of NDArrayWidget with a constrained array.
 
     Accepts keyword argument 'dtype' in addition to any valdiators.
+    Classes are cached while in use, so calling this again with the same
+    validators and dtype returns the same class. Only hashable validators
+    are cached, and they compare by identity unless they define equality:
+    a new lambda or `functools.partial` gives a new class on every call,
+    so create such validators once (`shape_constraints` caches its own).
     """
-    dtype = kwargs.pop('dtype', None)
-    return type('ConstrainedNDArrayWidget', (NDArrayWidget,), {
+    key = (validators, None if dtype is None else np.dtype(dtype))
+    try:
+        return _constrained_arraywidgets[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Unhashable validators, do not cache
+        key = None
+    cls = type('ConstrainedNDArrayWidget', (NDArrayWidget,), {
         'array': NDArray(dtype=dtype).tag(
             sync=True,
             **compressed_array_serialization
         ).valid(*validators)
     })
+    if key is not None:
+        _constrained_arraywidgets[key] = cls
+    return cls
 
-
-from inspect import Signature, Parameter
-create_constrained_arraywidget.__signature__ = Signature(parameters=(
-    Parameter('validators', Parameter.VAR_POSITIONAL),
-    Parameter('dtype', Parameter.KEYWORD_ONLY, default=None),
-))
+# Weak, so that classes of validators that are not reused are not kept
+_constrained_arraywidgets = weakref.WeakValueDictionary()
 
 
 def ConstrainedNDArrayWidget(*validators, **kwargs):
@@ -182,3 +592,45 @@ def ConstrainedNDArrayWidget(*validators, **kwargs):
     warnings.warn('ConstrainedNDArrayWidget is deprecated, '
                   'use create_constrained_arraywidget instead')
     return create_constrained_arraywidget(*validators, **kwargs)
+
+
+def create_array_widgets(arrays, widget_class=NDArrayWidget, **kwargs):
+    """Create a data widget for each of many arrays.
+
+    The widgets are opened without their array data, which is then sent
+    for all widgets in a single batched message (see `batched_sync`).
+    This is much faster than creating the widgets one by one, e.g. when
+    building a scene with thousands of meshes.
+
+    Parameters
+    ----------
+    arrays : iterable of array-likes
+        The arrays of the widgets.
+    widget_class : type
+        The class of the widgets, NDArrayWidget or a subclass of it,
+        e.g. as returned by `create_constrained_arraywidget`.
+    **kwargs
+        Additional arguments passed to every widget.
+
+    Returns
+    -------
+    A list of the created widgets.
+    """
+    widgets = []
+    with batched_sync():
+        NDArrayWidget._defer_array_on_open = True
+        try:
+            for array in arrays:
+                widgets.append(widget_class(array, **kwargs))
+        except BaseException:
+            # The widgets created so far were opened without their data,
+            # and are not returned, so close them
+            for widget in widgets:
+                widget.close()
+            raise
+        finally:
+            NDArrayWidget._defer_array_on_open = False
+        for widget in widgets:
+            widget._defer_array_sync = False
+            widget.send_state('array')
+    return widgets
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Batched syncing of updates across several data widgets.
+"""
+
+from contextlib import contextmanager
+
+from ipywidgets import register
+from traitlets import Unicode
+
+from .widgets import DataWidget
+
+
+@register
+class SyncBatchWidget(DataWidget):
+    """A widget that delivers batches of updates for other data widgets.
+
+    A single instance is created on demand by `batched_sync`.
+    """
+    _model_name = Unicode('SyncBatchModel').tag(sync=True)
+
+    _instance = None
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None or cls._instance.comm is None:
+            cls._instance = cls()
+        return cls._instance
+
+
+class SyncBatch(object):
+    """A collection of messages from data widgets, to be sent as one."""
+
+    def __init__(self):
+        self.updates = []
+        # The buffers of the updates, per widget
+        self._buffers = {}
+
+    def add(self, widget, msg, buffers=None):
+        buffers = list(buffers or [])
+        self.updates.append((widget, msg, buffers))
+        self._buffers.setdefault(widget, []).extend(buffers)
+
+    def buffers_of(self, widget):
+        """The buffers of the collected updates of a widget."""
+        return self._buffers.get(widget, [])
+
+    def drop_stale(self):
+        """Drop messages that are superseded by later messages in the batch.
+
+        A state update is stale if a later update of the same widget sets
+        all of its keys, and a segment or row update is stale if a later
+        state update sets the trait it modifies.
+
+        Returns
+        -------
+        The number of dropped messages.
+        """
+        kept = []
+        # The keys set by later state updates, per widget
+        covered = {}
+        for widget, msg, buffers in reversed(self.updates):
+            keys = covered.setdefault(widget, set())
+            if msg.get('method') == 'update':
+                state_keys = set(msg['state'])
+                if state_keys <= keys:
+                    continue
+                keys.update(state_keys)
+            elif msg.get('method') == 'custom':
+                name = msg['content'].get('name')
+                if name is not None and name in keys:
+                    continue
+            kept.append((widget, msg, buffers))
+        n_dropped = len(self.updates) - len(kept)
+        self.updates = kept[::-1]
+        self._buffers = {}
+        for widget, msg, buffers in self.updates:
+            self._buffers.setdefault(widget, []).extend(buffers)
+        return n_dropped
+
+    def send(self):
+        """Send the collected messages as a single message."""
+        updates, self.updates = self.updates, []
+        self._buffers = {}
+        if len(updates) == 1:
+            widget, msg, buffers = updates[0]
+            widget._send(msg, buffers)
+            return
+        elif not updates:
+            return
+        entries = []
+        all_buffers = []
+        for widget, msg, buffers in updates:
+            entries.append({
+                'model_id': widget.model_id,
+                'msg': msg,
+                'n_buffers': len(buffers),
+            })
+            all_buffers.extend(buffers)
+        msg = {'method': 'batch_update', 'updates': entries}
+        SyncBatchWidget.instance().send(msg, all_buffers)
+
+
+@contextmanager
+def batched_sync():
+    """Collect updates to data widgets, and send them as one message.
+
+    All state and segment updates of data widgets made inside the
+    context are delivered in a single comm message when the context
+    exits, and the front-end applies them all at once. This avoids
+    the overhead of many small messages, and ensures that views never
+    render with only some of the updates applied.
+
+    Batches can be nested, in which case the updates are sent when the
+    outermost context exits.
+
+    Example
+    -------
+    >>> with batched_sync():
+    ...     positions.array = new_positions
+    ...     colors.array = new_colors
+    """
+    if DataWidget._active_batch is not None:
+        # Nested batch, the outer batch will send
+        yield DataWidget._active_batch
+        return
+    batch = DataWidget._active_batch = SyncBatch()
+    try:
+        yield batch
+    finally:
+        DataWidget._active_batch = None
+        batch.send()
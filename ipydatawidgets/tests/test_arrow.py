@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+import numpy as np
+from traitlets import HasTraits, TraitError
+
+pa = pytest.importorskip('pyarrow')
+
+from ..ndarray.arrow import (
+    ArrowTableWidget, arrow_to_json, arrow_from_json, arrow_to_numpy
+)
+from ..ndarray.table import NDArrayTable
+from ..ndarray.traits import NDArray
+
+
+def test_arrow_json_roundtrip():
+    table = pa.table({
+        'x': pa.array([1.0, None, 3.0]),
+        'label': pa.array(['a', 'b', 'a']).dictionary_encode(),
+    })
+    json_data = arrow_to_json(table, None)
+    assert json_data['format'] == 'arrow-ipc'
+    assert isinstance(json_data['buffer'], memoryview)
+    result = arrow_from_json(json_data, None)
+    assert result.equals(table)
+
+
+def test_arrow_json_none():
+    assert arrow_to_json(None, None) is None
+    assert arrow_from_json(None, None) is None
+
+
+def test_arrow_widget_accepts_record_batch():
+    batch = pa.record_batch([pa.array([1, 2, 3])], names=['x'])
+    w = ArrowTableWidget(batch)
+    assert w.num_rows == 3
+    assert w.column_names == ['x']
+
+
+def test_arrow_widget_rejects_other():
+    with pytest.raises(TraitError):
+        ArrowTableWidget(np.zeros(3))
+
+
+def test_arrow_widget_single_buffer(mock_comm):
+    w = ArrowTableWidget(pa.table({'x': [1, 2, 3]}))
+    w.comm = mock_comm
+    w.table = pa.table({'x': [4, 5], 'y': [1.0, 2.0]})
+    assert len(mock_comm.log_send) == 1
+    assert len(mock_comm.log_send[0][1]['buffers']) == 1
+
+
+def test_arrow_to_numpy_zero_copy():
+    data = np.arange(5, dtype=np.float32)
+    arr = pa.array(data)
+    result = arrow_to_numpy(arr)
+    np.testing.assert_equal(result, data)
+    assert result.ctypes.data == arr.buffers()[1].address
+
+
+def test_arrow_to_numpy_nullable():
+    result = arrow_to_numpy(pa.chunked_array([[1.0, None], [3.0]]))
+    np.testing.assert_equal(result, [1.0, np.nan, 3.0])
+
+
+def test_ndarray_trait_accepts_arrow():
+    class Foo(HasTraits):
+        bar = NDArray()
+
+    foo = Foo(bar=pa.array(np.arange(4, dtype=np.int32)))
+    assert isinstance(foo.bar, np.ndarray)
+    np.testing.assert_equal(foo.bar, np.arange(4))
+
+
+def test_ndarray_trait_rejects_arrow_table():
+    class Foo(HasTraits):
+        bar = NDArray()
+
+    with pytest.raises(TraitError):
+        Foo(bar=pa.table({'x': [1, 2]}))
+    with pytest.raises(TraitError):
+        Foo(bar=pa.scalar(1.0))
+
+
+def test_table_from_arrow():
+    table = pa.table({'x': np.arange(3, dtype=np.float32), 'y': np.ones(3)})
+    w = NDArrayTable.from_arrow(table)
+    assert w.column_names == ['x', 'y']
+    assert w['x'].dtype == np.float32
+    np.testing.assert_equal(w['y'], np.ones(3))
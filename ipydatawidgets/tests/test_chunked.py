@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import threading
+
+import pytest
+
+import numpy as np
+from traitlets import TraitError
+
+from ..ndarray.chunked import ChunkedArrayWidget, normalize_chunks
+
+
+def test_normalize_chunks_sizes():
+    assert normalize_chunks((5, 4), (2, 4)) == ((2, 2, 1), (4,))
+
+
+def test_normalize_chunks_explicit():
+    assert normalize_chunks((5,), ((3, 2),)) == ((3, 2),)
+
+
+def test_normalize_chunks_mismatch():
+    with pytest.raises(TraitError):
+        normalize_chunks((5,), ((3, 3),))
+    with pytest.raises(TraitError):
+        normalize_chunks((5, 4), (2,))
+
+
+def test_normalize_chunks_positive():
+    with pytest.raises(TraitError):
+        normalize_chunks((5,), (0,))
+    with pytest.raises(TraitError):
+        normalize_chunks((5,), ((5, 0),))
+    # Empty dimensions, as chunked by dask
+    assert normalize_chunks((0,), ((0,),)) == ((0,),)
+
+
+def test_chunked_requires_chunks():
+    with pytest.raises(TraitError):
+        ChunkedArrayWidget(np.zeros((4, 4)))
+
+
+def test_chunked_metadata():
+    w = ChunkedArrayWidget(np.zeros((5, 4), dtype=np.int64), chunks=(2, 2))
+    assert w.shape == (5, 4)
+    assert w.dtype == np.int32
+    assert w.num_chunks == (3, 2)
+    assert w.chunk_slices((2, 1)) == (slice(4, 5), slice(2, 4))
+
+
+def test_chunked_send_chunks(mock_comm):
+    data = np.arange(20, dtype=np.float32).reshape(5, 4)
+    w = ChunkedArrayWidget(data, chunks=(2, 2))
+    w.comm = mock_comm
+
+    w.send_chunks([(0, 1), (2, 0)])
+
+    assert len(mock_comm.log_send) == 2
+    received = {}
+    for args, kwargs in mock_comm.log_send:
+        msg = kwargs['data']['content']
+        assert msg['method'] == 'chunk_data'
+        received[tuple(msg['index'])] = (msg['shape'], kwargs['buffers'][0])
+    shape, buffer = received[(0, 1)]
+    assert shape == [2, 2]
+    np.testing.assert_equal(np.frombuffer(buffer, np.float32).reshape(shape), data[0:2, 2:4])
+    shape, buffer = received[(2, 0)]
+    assert shape == [1, 2]
+    np.testing.assert_equal(np.frombuffer(buffer, np.float32).reshape(shape), data[4:5, 0:2])
+
+
+def test_chunked_invalid_index(mock_comm):
+    w = ChunkedArrayWidget(np.zeros((4, 4)), chunks=(2, 2))
+    w.comm = mock_comm
+    with pytest.raises(IndexError):
+        w.send_chunks([(2, 0)])
+
+
+class _BlockingSource(object):
+    """A source that only computes chunks once released."""
+
+    def __init__(self, data):
+        self.data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __getitem__(self, index):
+        self.started.set()
+        assert self.release.wait(5)
+        return self.data[index]
+
+
+def test_chunked_request_from_frontend(mock_comm):
+    source = _BlockingSource(np.zeros((4, 4)))
+    w = ChunkedArrayWidget(source, chunks=(2, 2))
+    w.comm = mock_comm
+    # The handler returns before the chunk is computed
+    w._handle_chunk_msg(w, {'method': 'request_chunks', 'indices': [[1, 1]]}, [])
+    assert len(mock_comm.log_send) == 0
+    future, = w._requests
+    source.release.set()
+    future.result(5)
+    w._executor.shutdown(wait=True)
+    assert len(mock_comm.log_send) == 1
+    assert mock_comm.log_send[0][1]['data']['content']['index'] == [1, 1]
+    assert not w._requests
+
+
+def test_chunked_request_error(mock_comm):
+    w = ChunkedArrayWidget(np.zeros((4, 4)), chunks=(2, 2))
+    w.comm = mock_comm
+    w.compute_chunk = lambda index: 1 / 0
+    with pytest.warns(UserWarning, match='Failed to compute chunk'):
+        w._handle_chunk_msg(w, {'method': 'request_chunks', 'indices': [[0, 0]]}, [])
+        w._executor.shutdown(wait=True)
+    assert len(mock_comm.log_send) == 0
+
+
+def test_chunked_close_cancels_requests(mock_comm):
+    source = _BlockingSource(np.zeros((4, 4)))
+    w = ChunkedArrayWidget(source, chunks=(2, 2), max_workers=1)
+    w.comm = mock_comm
+    w._handle_chunk_msg(w, {'method': 'request_chunks', 'indices': [[0, 0], [1, 1]]}, [])
+    assert source.started.wait(5)
+    running, queued = sorted(w._requests, key=lambda f: not f.running())
+    w.close()
+    assert queued.cancelled()
+    source.release.set()
+    running.result(5)
+    assert len(mock_comm.log_send) == 0
+
+
+def test_chunked_stream_all(mock_comm):
+    w = ChunkedArrayWidget(np.zeros((4, 4)), chunks=(2, 2))
+    w.comm = mock_comm
+    w.stream_all()
+    assert len(mock_comm.log_send) == 4
+
+
+def test_chunked_dask_source(mock_comm):
+    da = pytest.importorskip('dask.array')
+    source = da.arange(16, chunks=5, dtype=np.float32)
+    w = ChunkedArrayWidget(source)
+    w.comm = mock_comm
+    assert w.chunks == [[5, 5, 5, 1]]
+    w.send_chunks([(3,)])
+    np.testing.assert_equal(
+        np.frombuffer(mock_comm.log_send[0][1]['buffers'][0], np.float32), [15])
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import time
+
+import numpy as np
+
+from ..ndarray.widgets import NDArrayWidget
+from .conftest import DummyComm
+
+
+def _widget(size=4, connected=True):
+    w = NDArrayWidget(np.zeros(size, dtype=np.float32))
+    w.comm = DummyComm()
+    if connected:
+        # Messages are tracked once a front-end has acknowledged one
+        _ack(w, 0)
+    return w
+
+
+def _ack(widget, seq, client=None):
+    widget._handle_custom_msg({'method': 'ack', 'seq': seq, 'client': client}, [])
+
+
+def test_messages_are_tagged_with_seq(mock_comm):
+    w = _widget()
+    w.array = np.ones(4, dtype=np.float32)
+    w.send_segment([(0, 2)])
+    seqs = [kwargs['data']['seq'] for _, kwargs in w.comm.log_send]
+    assert seqs == [1, 2]
+
+
+def test_pending_bytes(mock_comm):
+    w = _widget()
+    assert w.pending_messages == 0
+    assert w.pending_bytes == 0
+    w.array = np.ones(4, dtype=np.float32)
+    w.send_segment([(0, 2)])
+    assert w.pending_messages == 2
+    assert w.pending_bytes == 16 + 8
+
+
+def test_no_tracking_without_frontend(mock_comm):
+    w = _widget(connected=False)
+    w.max_in_flight = 1
+    for i in range(5):
+        w.array = np.full(4, i, dtype=np.float32)
+    assert w.pending_messages == 0
+    assert not w.congested
+
+
+def test_ack_from_all_clients(mock_comm):
+    w = _widget(connected=False)
+    _ack(w, 0, 'a')
+    _ack(w, 0, 'b')
+    w.array = np.ones(4, dtype=np.float32)
+    w.array = np.full(4, 2, dtype=np.float32)
+    _ack(w, 2, 'a')
+    assert w.pending_messages == 2
+    _ack(w, 1, 'b')
+    assert w.pending_messages == 1
+    _ack(w, 2, 'b')
+    assert w.pending_messages == 0
+
+
+def test_unresponsive_client_expires(mock_comm):
+    w = _widget()
+    w.ack_timeout = 0.01
+    w.array = np.ones(4, dtype=np.float32)
+    assert w.pending_messages == 1
+    time.sleep(0.02)
+    assert w.pending_messages == 0
+    # Tracking resumes when the front-end responds again
+    _ack(w, 1)
+    w.array = np.full(4, 2, dtype=np.float32)
+    assert w.pending_messages == 1
+
+
+def test_quiet_client_does_not_expire(mock_comm):
+    w = _widget()
+    w.ack_timeout = 0.01
+    w.array = np.ones(4, dtype=np.float32)
+    _ack(w, 1)
+    # All messages are acknowledged, so the front-end is not behind
+    time.sleep(0.02)
+    w.array = np.full(4, 2, dtype=np.float32)
+    assert w.pending_messages == 1
+    _ack(w, 2)
+    assert w.pending_messages == 0
+
+
+def test_ack_is_cumulative(mock_comm):
+    w = _widget()
+    for i in range(3):
+        w.array = np.full(4, i + 1, dtype=np.float32)
+    _ack(w, 2)
+    assert w.pending_messages == 1
+    assert w.pending_bytes == 16
+    _ack(w, 3)
+    assert w.pending_messages == 0
+
+
+def test_congested(mock_comm):
+    w = _widget()
+    assert not w.congested
+    w.max_in_flight = 2
+    w.array = np.ones(4, dtype=np.float32)
+    assert not w.congested
+    w.array = np.full(4, 2, dtype=np.float32)
+    assert w.congested
+    _ack(w, 1)
+    assert not w.congested
+
+
+def test_synced(mock_comm):
+    w = _widget()
+    w.array = np.ones(4, dtype=np.float32)
+    w.array = np.full(4, 2, dtype=np.float32)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_soon(_ack, w, 1)
+        await asyncio.wait_for(w.synced(max_pending=1), 1)
+        assert w.pending_messages == 1
+        loop.call_soon(_ack, w, 2)
+        await asyncio.wait_for(w.synced(), 1)
+        assert w.pending_messages == 0
+
+    asyncio.run(run())
+
+
+def test_synced_without_pending(mock_comm):
+    w = _widget()
+    asyncio.run(asyncio.wait_for(w.synced(), 1))
+
+
+def test_close_releases_waiters(mock_comm):
+    w = _widget()
+    w.array = np.ones(4, dtype=np.float32)
+
+    async def run():
+        asyncio.get_running_loop().call_soon(w.close)
+        await asyncio.wait_for(w.synced(), 1)
+
+    asyncio.run(run())
+    assert w.pending_bytes == 0
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import base64
+import zlib
+
+import numpy as np
+from ipywidgets import Image, Label, Widget
+
+from ..embed import (
+    buffer_ref_key, compact_manager_state, expand_manager_state,
+    embed_data_compact,
+)
+from ..ndarray.widgets import NDArrayWidget
+
+
+def _widgets():
+    data = np.arange(1000, dtype=np.float32)
+    return [
+        NDArrayWidget(data),
+        NDArrayWidget(data.copy()),
+        NDArrayWidget(np.zeros(10, dtype=np.float32)),
+    ]
+
+
+def _model_buffers(state, widget):
+    return state['state'][widget.model_id]['buffers']
+
+
+def _model_array(state, widget):
+    return state['state'][widget.model_id]['state']['array']
+
+
+def test_compact_dedup_and_compress():
+    widgets = _widgets()
+    manager_state = Widget.get_manager_state(widgets=widgets)
+    compact = compact_manager_state(manager_state)
+
+    # The references replace the buffers in the model states
+    assert all('buffers' not in compact['state'][w.model_id] for w in widgets)
+    refs = [_model_array(compact, w)['compressed_buffer'] for w in widgets]
+    assert all(set(r) == {buffer_ref_key} for r in refs)
+    # The identical arrays share a buffer
+    assert refs[0] == refs[1]
+    assert len(compact['datawidgets_buffers']) == 2
+
+    stored = compact['datawidgets_buffers'][refs[0][buffer_ref_key]]
+    data = zlib.decompress(base64.standard_b64decode(stored['data']))
+    np.testing.assert_equal(np.frombuffer(data, np.float32), widgets[0].array)
+    # The input is left untouched
+    assert _model_buffers(manager_state, widgets[0])[0]['encoding'] == 'base64'
+    assert 'compressed_buffer' not in _model_array(manager_state, widgets[0])
+
+
+def test_compact_keeps_other_models():
+    image = Image(value=b'not really a png')
+    manager_state = Widget.get_manager_state(widgets=[image])
+    compact = compact_manager_state(manager_state)
+    assert compact['state'][image.model_id] == manager_state['state'][image.model_id]
+    assert compact['datawidgets_buffers'] == {}
+
+
+def test_compact_without_compression():
+    widgets = _widgets()
+    compact = compact_manager_state(
+        Widget.get_manager_state(widgets=widgets), compression_level=0)
+    array = _model_array(compact, widgets[2])
+    assert set(array['buffer']) == {buffer_ref_key}
+    assert 'compressed_buffer' not in array
+
+
+def test_compact_sidecar(tmp_path):
+    widgets = _widgets()
+    compact = compact_manager_state(
+        Widget.get_manager_state(widgets=widgets),
+        sidecar_dir=str(tmp_path), sidecar_url='data')
+    assert len(list(tmp_path.iterdir())) == 2
+    for digest, stored in compact['datawidgets_buffers'].items():
+        assert stored == {'url': 'data/%s.bin' % digest}
+        assert (tmp_path / ('%s.bin' % digest)).exists()
+
+
+def test_expand_round_trip(tmp_path):
+    widgets = _widgets()
+    compact = compact_manager_state(
+        Widget.get_manager_state(widgets=widgets), sidecar_dir=str(tmp_path))
+    expanded = expand_manager_state(compact, sidecar_dir=str(tmp_path))
+    assert 'datawidgets_buffers' not in expanded
+    assert 'compressed_buffer' not in _model_array(expanded, widgets[0])
+    entry, = _model_buffers(expanded, widgets[0])
+    assert entry['encoding'] == 'base64'
+    assert entry['path'] == ['array', 'compressed_buffer']
+    data = zlib.decompress(base64.standard_b64decode(entry['data']))
+    np.testing.assert_equal(np.frombuffer(data, np.float32), widgets[0].array)
+
+
+def test_embed_data_compact():
+    widgets = _widgets()
+    view = Label('data')
+    state = Widget.get_manager_state(widgets=widgets + [view])['state']
+    data = embed_data_compact(view, state=state)
+    assert data['view_specs'][0]['model_id'] == view.model_id
+    assert 'datawidgets_buffers' in data['manager_state']
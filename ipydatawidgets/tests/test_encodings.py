@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+import numpy as np
+
+from ..ndarray.encodings import choose_encoding
+from ..ndarray.serializers import (
+    array_to_compressed_json, array_from_compressed_json
+)
+from ..ndarray.widgets import NDArrayWidget
+
+
+def _roundtrip(data, encoding, compression=0):
+    widget = NDArrayWidget(data, array_encoding=encoding,
+                           compression_level=compression)
+    json_data = array_to_compressed_json(data, widget)
+    result = array_from_compressed_json(dict(json_data), widget)
+    np.testing.assert_equal(result, data)
+    assert result.dtype == data.dtype
+    assert result.shape == data.shape
+    return json_data
+
+
+def test_bitpack():
+    data = np.random.random((5, 7)) > 0.5
+    json_data = _roundtrip(data, 'bitpack')
+    assert json_data['encoding'] == 'bitpack'
+    assert json_data['dtype'] == 'bool'
+    assert len(json_data['buffer']) == 5
+
+
+def test_bitpack_wrong_dtype():
+    data = np.arange(4, dtype=np.uint8)
+    with pytest.warns(UserWarning):
+        json_data = _roundtrip(data, 'bitpack')
+    assert 'encoding' not in json_data
+
+
+def test_rle():
+    data = np.zeros((8, 8), dtype=np.int32)
+    data[2:4, :] = 3
+    json_data = _roundtrip(data, 'rle')
+    assert json_data['encoding'] == 'rle'
+    np.testing.assert_equal(np.asarray(json_data['buffer']), [0, 3, 0])
+    np.testing.assert_equal(np.asarray(json_data['run_lengths']), [16, 16, 32])
+
+
+def test_rle_empty():
+    _roundtrip(np.zeros((0, 3), dtype=np.int32), 'rle')
+
+
+def test_dictionary():
+    data = np.array([[10, 2000, 10], [2000, 7, 10]], dtype=np.int32)
+    json_data = _roundtrip(data, 'dictionary')
+    assert json_data['encoding'] == 'dictionary'
+    assert json_data['index_dtype'] == 'uint8'
+    np.testing.assert_equal(np.asarray(json_data['dictionary']), [7, 10, 2000])
+
+
+def test_encoding_with_compression():
+    data = np.zeros(1000, dtype=bool)
+    json_data = _roundtrip(data, 'rle', compression=6)
+    assert 'compressed_buffer' in json_data
+    assert 'buffer' not in json_data
+
+
+def test_choose_encoding():
+    assert choose_encoding(np.random.random(100) > 0.5) == 'bitpack'
+    assert choose_encoding(np.zeros(100, dtype=bool)) == 'rle'
+    assert choose_encoding(np.random.randint(0, 5, 1000).astype(np.int32)) == 'dictionary'
+    assert choose_encoding(np.random.randint(0, 2**30, 1000).astype(np.int32)) == 'none'
+    assert choose_encoding(np.zeros(100, dtype=np.float32)) == 'none'
+
+
+def test_auto_encoding():
+    data = np.zeros((16, 16), dtype=np.uint16)
+    json_data = _roundtrip(data, 'auto')
+    assert json_data['encoding'] == 'rle'
+
+
+def test_no_encoding_by_default():
+    data = np.zeros(10, dtype=bool)
+    json_data = array_to_compressed_json(data, NDArrayWidget(data))
+    assert 'encoding' not in json_data
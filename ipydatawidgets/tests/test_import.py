@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import ipydatawidgets
+from ipydatawidgets import ndarray
+
+
+def _run(code):
+    root = os.path.dirname(os.path.dirname(ipydatawidgets.__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [root] + os.environ.get('PYTHONPATH', '').split(os.pathsep)))
+    return subprocess.check_output([sys.executable, '-c', code], env=env).decode()
+
+
+def test_import_registers_widgets():
+    # Models created by the front-end need the classes to be registered
+    out = _run(
+        'import ipydatawidgets\n'
+        'from ipywidgets.widgets.widget import _registry\n'
+        'print(sorted(key[2] for key, _ in _registry.items()))'
+    )
+    models = eval(out)
+    for model in ['NDArrayModel', 'NDArrayTableModel', 'ArrowTableModel',
+                  'ChunkedArrayModel', 'PointCloudModel', 'SyncBatchModel']:
+        assert model in models
+
+
+def test_import_skips_optional_dependencies():
+    out = _run(
+        'import sys, ipydatawidgets\n'
+        'print(sorted(m for m in ("pyarrow", "PIL", "multiprocessing.shared_memory", '
+        '"ipydatawidgets.ndarray.shared") if m in sys.modules))'
+    )
+    assert eval(out) == []
+
+
+def test_serializers_do_not_import_pillow():
+    out = _run(
+        'import sys\n'
+        'import numpy as np\n'
+        'from ipydatawidgets.ndarray.serializers import array_to_json\n'
+        'array_to_json(np.zeros((3, 2), order="F"), None)\n'
+        'print("PIL" in sys.modules)'
+    )
+    assert out.split() == ['False']
+
+
+def test_attribute_access_imports_shared():
+    out = _run(
+        'import sys, ipydatawidgets\n'
+        'ipydatawidgets.attach_shared_array\n'
+        'print("ipydatawidgets.ndarray.shared" in sys.modules)'
+    )
+    assert out.split() == ['True']
+
+
+@pytest.mark.parametrize('module', [ipydatawidgets, ndarray])
+def test_all_attributes_resolve(module):
+    for name in module.__all__:
+        assert getattr(module, name) is not None
+        assert name in dir(module)
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        ipydatawidgets.does_not_exist
+    with pytest.raises(AttributeError):
+        ndarray.does_not_exist
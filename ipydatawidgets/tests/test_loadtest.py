@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import time
+
+import numpy as np
+import pytest
+
+from ..loadtest import (
+    LoadHarness, SimulatedClient, Trace, TraceEvent, replay, simulate
+)
+from ..ndarray.widgets import NDArrayWidget
+
+try:
+    import comm
+except ImportError:
+    comm = None
+
+requires_comm = pytest.mark.skipif(
+    comm is None, reason='capturing requires ipywidgets 8 (the comm package)')
+
+
+def _trace():
+    return Trace([
+        TraceEvent(0.0, 'a', 'comm_msg', 'update', 1, 1000),
+        TraceEvent(0.0, 'a', 'comm_msg', 'update', 2, 1000),
+        TraceEvent(1.0, 'a', 'comm_msg', 'update', 3, 1000),
+    ])
+
+
+def test_simulate():
+    client = SimulatedClient(bandwidth=1000, latency=0.5, decode_rate=2000)
+    applied = simulate(_trace(), [client])
+    # transfer 1 s, latency 0.5 s, decode 0.5 s, and the second
+    # message queues behind the first on the link
+    np.testing.assert_allclose(applied, [[2.0, 3.0, 4.0]])
+
+
+def test_simulate_shared_server_bandwidth():
+    clients = [SimulatedClient(bandwidth=1e9, latency=0, decode_rate=1e9)] * 2
+    applied = simulate(_trace(), clients, server_bandwidth=1000)
+    # Each message is sent once per client over the shared link
+    np.testing.assert_allclose(applied[:, :2], [[1, 3], [2, 4]], atol=1e-5)
+
+
+def test_report():
+    clients = [SimulatedClient(bandwidth=1000, latency=0.5, decode_rate=2000)]
+    report = replay(_trace(), clients)
+    summary = report.summary()
+    assert summary['messages'] == 3
+    assert summary['bytes'] == 3000
+    assert summary['latency_max'] == pytest.approx(3.0)
+    assert summary['latency_p50'] == pytest.approx(3.0)
+    assert report.throughput == pytest.approx(750)
+    assert 'latency' in str(report)
+
+
+def test_trace_save_load(tmp_path):
+    trace = _trace()
+    path = str(tmp_path / 'trace.jsonl')
+    trace.save(path)
+    loaded = Trace.load(path)
+    assert loaded.events == trace.events
+
+
+@requires_comm
+def test_capture():
+    harness = LoadHarness([SimulatedClient()] * 3)
+    with harness.capture():
+        w = NDArrayWidget(np.zeros(1000, dtype=np.float32))
+        w.array = np.ones(1000, dtype=np.float32)
+        w.send_segment([(0, 10)])
+    types = [(e.msg_type, e.method) for e in harness.trace.events]
+    assert types == [
+        ('comm_open', None),
+        ('comm_msg', 'update'),
+        ('comm_msg', 'custom'),
+    ]
+    assert all(e.model_id == w.model_id for e in harness.trace.events)
+    assert harness.trace.events[1].nbytes > 4000
+    assert harness.trace.events[1].seq == 1
+    assert harness.peak_memory > 0
+    assert len(harness.report().latencies) == 3
+
+
+@requires_comm
+def test_poll_delivers_acks():
+    harness = LoadHarness([SimulatedClient(bandwidth=1e9, latency=0.01)])
+    with harness.capture(track_memory=False):
+        w = NDArrayWidget(np.zeros(10, dtype=np.float32))
+        w.array = np.ones(10, dtype=np.float32)
+        # Nothing is tracked until the client has acknowledged a message
+        assert w.pending_messages == 0
+        time.sleep(0.05)
+        harness.poll()
+        w.array = np.full(10, 2, dtype=np.float32)
+        assert w.pending_messages == 1
+        harness.poll()
+        assert w.pending_messages == 1
+        time.sleep(0.05)
+        harness.poll()
+        assert w.pending_messages == 0
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import zlib
+
+import pytest
+
+import numpy as np
+from ipywidgets import widget_serialization
+from traitlets import TraitError
+
+from ..ndarray.image_encoding import encode_png, encode_image, decode_image
+from ..ndarray.media import DataImage, TiledDataImage
+from ..ndarray.serializers import image_union_to_json, image_union_from_json
+from ..ndarray.widgets import NDArrayWidget
+
+
+def _rgba(height=3, width=5):
+    return np.random.randint(0, 255, (height, width, 4)).astype(np.uint8)
+
+
+def test_encode_png_structure():
+    image = _rgba()
+    png = encode_png(image)
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    # IHDR: width, height, bit depth, color type
+    assert png[16:24] == b'\x00\x00\x00\x05\x00\x00\x00\x03'
+    assert png[24:26] == b'\x08\x06'
+    # Check image data, which follows IHDR (8 + 25 bytes) and an IDAT chunk header
+    idat_len = int.from_bytes(png[33:37], 'big')
+    assert png[37:41] == b'IDAT'
+    raw = np.frombuffer(zlib.decompress(png[41:41 + idat_len]), np.uint8).reshape(3, -1)
+    np.testing.assert_equal(raw[:, 0], 0)
+    np.testing.assert_equal(raw[:, 1:].reshape(image.shape), image)
+
+
+def test_encode_png_wrong_dtype():
+    with pytest.raises(ValueError):
+        encode_png(np.zeros((2, 2, 4), dtype=np.float32))
+
+
+def test_png_roundtrip():
+    pytest.importorskip('PIL')
+    image = _rgba()
+    np.testing.assert_equal(decode_image(encode_png(image)), image)
+
+
+def test_jpeg_encoding():
+    pytest.importorskip('PIL')
+    image = np.full((8, 8, 4), 128, dtype=np.uint8)
+    data = encode_image(image, 'jpeg', quality=50)
+    assert data[:2] == b'\xff\xd8'
+    decoded = decode_image(data)
+    assert decoded.shape == (8, 8, 4)
+    assert np.abs(decoded[..., :3].astype(int) - 128).max() < 4
+
+
+def test_image_to_json_raw():
+    image = _rgba()
+    w = DataImage(data=image)
+    json_data = image_union_to_json(image, w)
+    assert json_data['buffer'] == memoryview(image)
+    assert 'format' not in json_data
+
+
+def test_image_to_json_png():
+    image = _rgba()
+    w = DataImage(data=image, format='png')
+    json_data = image_union_to_json(image, w)
+    assert json_data['format'] == 'png'
+    assert json_data['shape'] == (3, 5, 4)
+    assert bytes(json_data['buffer']) == encode_png(image)
+
+
+def test_image_to_json_widget_reference():
+    data_widget = NDArrayWidget(_rgba())
+    w = DataImage(data=data_widget, format='png')
+    json_data = image_union_to_json(data_widget, w)
+    assert json_data == widget_serialization['to_json'](data_widget, w)
+
+
+def test_image_from_json_png():
+    pytest.importorskip('PIL')
+    image = _rgba()
+    json_data = {'shape': (3, 5, 4), 'dtype': 'uint8', 'format': 'png',
+                 'buffer': memoryview(encode_png(image))}
+    np.testing.assert_equal(image_union_from_json(json_data, None), image)
+
+
+def test_format_change_resends(mock_comm):
+    w = DataImage(data=_rgba())
+    w.comm = mock_comm
+    w.format = 'png'
+    assert len(mock_comm.log_send) == 1
+    state = mock_comm.log_send[0][1]['data']['state']
+    assert state['data']['format'] == 'png'
+
+
+def test_scalar_image_data():
+    data = np.random.random((3, 5)).astype(np.float32)
+    w = DataImage(data=data, value_range=(0.2, 0.8))
+    assert w.data is data
+    assert w.value_range == (0.2, 0.8)
+
+
+def test_scalar_image_coercion():
+    with pytest.warns(UserWarning):
+        w = DataImage(data=np.zeros((3, 5), dtype=np.float64))
+    assert w.data.dtype == np.float32
+    with pytest.warns(UserWarning):
+        w.data = np.zeros((3, 5), dtype=np.int32)
+    assert w.data.dtype == np.uint16
+
+
+def test_rgba_image_coercion():
+    with pytest.warns(UserWarning):
+        w = DataImage(data=np.zeros((3, 5, 4), dtype=np.float64))
+    assert w.data.dtype == np.uint8
+
+
+def test_image_invalid_shape():
+    with pytest.raises(TraitError):
+        DataImage(data=np.zeros((3, 5, 3), dtype=np.uint8))
+    with pytest.raises(TraitError):
+        DataImage(data=np.zeros(5, dtype=np.uint8))
+
+
+def test_image_widget_dtype_not_coerced():
+    data_widget = NDArrayWidget(np.zeros((3, 5, 4), dtype=np.float32))
+    with pytest.raises(TraitError):
+        DataImage(data=data_widget)
+    data_widget = NDArrayWidget(np.zeros((3, 5), dtype=np.float32))
+    DataImage(data=data_widget)
+
+
+def test_colormap_validation():
+    w = DataImage(colormap=np.zeros((256, 4), dtype=np.uint8))
+    assert w.colormap.shape == (256, 4)
+    with pytest.raises(TraitError):
+        w.colormap = np.zeros((256, 3), dtype=np.uint8)
+
+
+def test_scalar_image_not_encoded():
+    data = np.zeros((3, 5), dtype=np.uint8)
+    w = DataImage(data=data, format='png')
+    json_data = image_union_to_json(data, w)
+    assert 'format' not in json_data
+    assert json_data['buffer'] == memoryview(data)
+
+
+def test_colormap_change_sends_only_lut(mock_comm):
+    w = DataImage(data=np.zeros((30, 50), dtype=np.uint16))
+    w.comm = mock_comm
+    w.colormap = np.zeros((256, 4), dtype=np.uint8)
+    assert len(mock_comm.log_send) == 1
+    state = mock_comm.log_send[0][1]['data']['state']
+    assert list(state.keys()) == ['colormap']
+
+
+def test_tiled_image_tiles():
+    data = _rgba(600, 300)
+    w = TiledDataImage(data, tile_size=256)
+    assert w.image_shape == (600, 300)
+    assert w.num_tiles == (3, 2)
+    np.testing.assert_equal(w.get_tile(2, 1), data[512:, 256:])
+
+
+def test_tiled_image_invalid_data():
+    with pytest.raises(TraitError):
+        TiledDataImage(np.zeros((4, 4), dtype=np.uint8))
+
+
+def test_tiled_image_request_tiles(mock_comm):
+    data = _rgba(600, 300)
+    w = TiledDataImage(data, tile_size=256)
+    w.comm = mock_comm
+    w._handle_tile_msg(w, {'method': 'request_tiles', 'tiles': [[0, 0], [2, 1]]}, [])
+
+    assert len(mock_comm.log_send) == 2
+    msg = mock_comm.log_send[1][1]['data']['content']
+    assert msg['method'] == 'tile_data'
+    assert msg['tile'] == [2, 1]
+    assert msg['shape'] == [88, 44, 4]
+    np.testing.assert_equal(
+        np.frombuffer(mock_comm.log_send[1][1]['buffers'][0], np.uint8).reshape(88, 44, 4),
+        data[512:, 256:])
+
+
+def test_tiled_image_invalid_tile(mock_comm):
+    w = TiledDataImage(_rgba(10, 10), tile_size=8)
+    w.comm = mock_comm
+    with pytest.raises(IndexError):
+        w.send_tiles([(2, 0)])
+
+
+def test_tiled_image_sync_region_only_sent_tiles(mock_comm):
+    w = TiledDataImage(_rgba(64, 64), tile_size=16)
+    w.comm = mock_comm
+    w.send_tiles([(0, 0), (0, 1), (3, 3)])
+    mock_comm.log_send.clear()
+
+    w.data[0:20, 10:20] = 0
+    w.sync_region(0, 20, 10, 20)
+
+    sent = [m[1]['data']['content']['tile'] for m in mock_comm.log_send]
+    assert sent == [[0, 0], [0, 1]]
+
+
+def test_tiled_image_png_tiles(mock_comm):
+    w = TiledDataImage(_rgba(20, 20), tile_size=16, format='png')
+    w.comm = mock_comm
+    w.send_tiles([(1, 1)])
+    msg = mock_comm.log_send[0][1]
+    assert msg['data']['content']['format'] == 'png'
+    assert bytes(msg['buffers'][0]) == encode_png(w.get_tile(1, 1))
+
+
+def test_tiled_image_new_data_invalidates(mock_comm):
+    w = TiledDataImage(_rgba(20, 20), tile_size=16)
+    w.comm = mock_comm
+    w.send_tiles([(0, 0)])
+    w.data = _rgba(40, 20)
+    assert w.image_shape == (40, 20)
+    methods = [m[1]['data'].get('content', {}).get('method') for m in mock_comm.log_send]
+    assert 'invalidate_tiles' in methods
+    mock_comm.log_send.clear()
+    w.sync_region(0, 40, 0, 20)
+    assert len(mock_comm.log_send) == 0
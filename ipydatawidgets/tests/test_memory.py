@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import gc
+import warnings
+
+import numpy as np
+import pytest
+
+from ..memory import memory_report, set_memory_budget, check_memory_budget
+from ..ndarray.media import DataImage
+from ..ndarray.widgets import NDArrayWidget
+from ..sync import batched_sync, SyncBatchWidget
+from .conftest import DummyComm
+
+
+@pytest.fixture
+def budget():
+    yield set_memory_budget
+    set_memory_budget(None)
+
+
+@pytest.fixture
+def batch_comm(mock_comm):
+    widget = SyncBatchWidget()
+    widget.comm = DummyComm()
+    SyncBatchWidget._instance = widget
+    yield widget.comm
+    SyncBatchWidget._instance = None
+
+
+def _entry(widget):
+    for entry in memory_report().entries:
+        if entry['widget'] is widget:
+            return entry
+    return None
+
+
+def test_memory_report_data(mock_comm):
+    w = NDArrayWidget(np.zeros(1000, dtype=np.float32))
+    entry = _entry(w)
+    assert entry['data'] == 4000
+    assert entry['cache'] == 0
+    assert entry['model_id'] == w.model_id
+    assert 'NDArrayWidget' in str(memory_report())
+
+
+def test_memory_report_union_counted_once(mock_comm):
+    source = NDArrayWidget(np.zeros((10, 10), dtype=np.float32))
+    image = DataImage(data=source)
+    assert _entry(source)['data'] == 400
+    assert _entry(image)['data'] == 0
+
+
+def test_memory_report_closed_and_deleted(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32))
+    w.close()
+    entry = _entry(w)
+    assert entry['model_id'] is None
+    assert entry['data'] == 40
+    del w, entry
+    gc.collect()
+    assert not any(isinstance(e['widget'], NDArrayWidget) and e['data'] == 40
+                   and e['model_id'] is None for e in memory_report().entries)
+
+
+def test_memory_report_cache(mock_comm):
+    w = NDArrayWidget(np.random.rand(1000).astype(np.float32), compression_level=1)
+    w.get_state()
+    assert 0 < _entry(w)['cache'] <= 4100
+    w._evict_caches()
+    assert _entry(w)['cache'] == 0
+
+
+def test_memory_report_uncompressed_cache_is_view(mock_comm):
+    w = NDArrayWidget(np.zeros(1000, dtype=np.float32))
+    w.get_state()
+    assert w._serialized_cache is not None
+    assert _entry(w)['cache'] == 0
+
+
+def test_memory_report_batched(batch_comm):
+    w = NDArrayWidget(np.zeros(100, dtype=np.float32))
+    w.comm = DummyComm()
+    with batched_sync():
+        w.send_segment([(0, 50)])
+        # The buffer is a view of the array
+        assert _entry(w)['batched'] == 0
+        w.compression_level = 1
+        w.array = np.random.rand(100).astype(np.float32)
+        assert _entry(w)['batched'] > 0
+
+
+def test_budget_evicts_caches(mock_comm, budget):
+    w = NDArrayWidget(np.random.rand(1000).astype(np.float32), compression_level=1)
+    w.get_state()
+    assert w._serialized_cache is not None
+    budget(memory_report().total - 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        assert check_memory_budget()
+    assert w._serialized_cache is None
+
+
+def test_budget_warns_once(mock_comm, budget):
+    budget(0, action='warn')
+    w = NDArrayWidget(np.zeros(1000, dtype=np.float32))
+    with pytest.warns(UserWarning, match='memory budget'):
+        w.array = np.ones(1000, dtype=np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        w.array = np.zeros(1000, dtype=np.float32)
+
+
+def test_budget_measures_only_sender(mock_comm, budget, monkeypatch):
+    widgets = [NDArrayWidget(np.zeros(100, dtype=np.float32)) for _ in range(5)]
+    budget(10 ** 9)
+    measured = []
+    original = NDArrayWidget._memory_usage
+    monkeypatch.setattr(NDArrayWidget, '_memory_usage',
+                        lambda self: measured.append(self) or original(self))
+    widgets[0].array = np.ones(100, dtype=np.float32)
+    assert measured == [widgets[0]]
+    budget(None)
+    del measured[:]
+    widgets[1].array = np.ones(100, dtype=np.float32)
+    assert measured == []
+
+
+def test_budget_invalid_action(budget):
+    with pytest.raises(ValueError):
+        budget(100, action='ignore')
+
+
+def test_batch_drop_stale(batch_comm):
+    w = NDArrayWidget(np.zeros(100, dtype=np.float32))
+    w.comm = DummyComm()
+    other = NDArrayWidget(np.zeros(100, dtype=np.float32))
+    other.comm = DummyComm()
+    with batched_sync() as batch:
+        w.array = np.ones(100, dtype=np.float32)
+        w.send_segment([(0, 10)])
+        other.send_segment([(0, 10)])
+        w.array = np.full(100, 2, dtype=np.float32)
+        assert batch.drop_stale() == 2
+        assert [u[0] for u in batch.updates] == [other, w]
+    msg = batch_comm.log_send[0][1]['data']['content']
+    assert [u['model_id'] for u in msg['updates']] == [other.model_id, w.model_id]
@@ -60,6 +60,16 @@ def test_array_to_json_continuous_data():
     assert reinterpreted_data.flags['C_CONTIGUOUS']
 
 
+def test_array_to_json_zero_dim_roundtrip():
+    data = np.array(3.5, dtype=np.float32)
+    json_data = array_to_json(data, None)
+    assert json_data['shape'] == ()
+
+    reinterpreted_data = array_from_json(json_data, None)
+    assert reinterpreted_data.shape == ()
+    np.testing.assert_equal(reinterpreted_data, data)
+
+
 def test_array_to_json_int64_warning():
     data = np.zeros((4, 3), dtype=np.uint64, order='F')
     with pytest.warns(UserWarning) as captured_warnings:
@@ -163,3 +173,12 @@ def test_compressed_to_compressed_json():
     comp = json_data['compressed_buffer']
     zlib.decompress(comp)
     # TODO: Test content of compressed buffer?
+
+
+def test_array_to_json_buffer_producer():
+    data = np.zeros((4, 3), dtype=np.float32)
+    json_data = array_to_json(memoryview(data), None)
+
+    assert json_data['shape'] == (4, 3)
+    assert json_data['dtype'] == 'float32'
+    assert np.shares_memory(np.asarray(json_data['buffer']), data)
@@ -169,3 +169,64 @@ def test_shape_constraint_fails(constraints):
     assert foo.bar is Undefined
     with pytest.raises(TraitError):
         foo.bar = np.zeros((5, 3, 2))
+
+
+class _DLPackProducer(object):
+    """Exposes only the DLPack protocol of a wrapped array"""
+    def __init__(self, array):
+        self._array = array
+
+    def __dlpack__(self, **kwargs):
+        return self._array.__dlpack__(**kwargs)
+
+    def __dlpack_device__(self):
+        return self._array.__dlpack_device__()
+
+
+class _InterfaceProducer(object):
+    """Exposes only the array interface of a wrapped array"""
+    def __init__(self, array):
+        self.__array_interface__ = array.__array_interface__
+        self._array = array
+
+
+@pytest.mark.skipif(not hasattr(np, 'from_dlpack'), reason='numpy without DLPack support')
+def test_accepts_dlpack_without_copy():
+    class Foo(HasTraits):
+        bar = NDArray()
+
+    data = np.arange(12, dtype=np.float32).reshape(3, 4)
+    foo = Foo(bar=_DLPackProducer(data))
+    assert isinstance(foo.bar, np.ndarray)
+    assert foo.bar.shape == (3, 4)
+    assert np.shares_memory(foo.bar, data)
+
+
+def test_accepts_array_interface_without_copy():
+    class Foo(HasTraits):
+        bar = NDArray(dtype=np.float32)
+
+    data = np.arange(12, dtype=np.float32).reshape(3, 4)
+    foo = Foo(bar=_InterfaceProducer(data))
+    assert np.shares_memory(foo.bar, data)
+
+
+def test_accepts_buffer_protocol_without_copy():
+    class Foo(HasTraits):
+        bar = NDArray()
+
+    data = bytearray(16)
+    foo = Foo(bar=data)
+    assert foo.bar.dtype == np.uint8
+    assert foo.bar.shape == (16,)
+    data[3] = 7
+    assert foo.bar[3] == 7
+
+
+def test_buffer_protocol_dtype_coercion():
+    class Foo(HasTraits):
+        bar = NDArray(dtype=np.float32)
+
+    with pytest.warns(UserWarning):
+        foo = Foo(bar=memoryview(np.arange(4, dtype=np.float64)))
+    assert foo.bar.dtype == np.float32
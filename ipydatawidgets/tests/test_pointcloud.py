@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+import numpy as np
+from traitlets import TraitError
+
+from ..ndarray.pointcloud import (
+    PointCloudWidget, build_octree, morton_codes, octree_depth
+)
+
+
+def _points(n, seed=0):
+    return np.random.default_rng(seed).random((n, 3)).astype(np.float32)
+
+
+# A frustum containing the whole unit cube
+_all_planes = [[1, 0, 0, 1], [-1, 0, 0, 2], [0, 1, 0, 1],
+               [0, -1, 0, 2], [0, 0, 1, 1], [0, 0, -1, 2]]
+
+
+def test_morton_codes():
+    cells = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 1], [2, 0, 0]])
+    np.testing.assert_equal(morton_codes(cells), [0, 1, 2, 4, 7, 8])
+
+
+def test_octree_depth():
+    assert octree_depth(100, 100) == 0
+    assert octree_depth(101, 100) == 1
+    assert octree_depth(6401, 100) == 3
+
+
+def test_build_octree():
+    points = _points(5000)
+    order, nodes, origin, size = build_octree(points, node_size=100)
+    # Every point is in exactly one node
+    np.testing.assert_equal(np.sort(order), np.arange(5000))
+    assert nodes[:, 5].sum() == 5000
+    np.testing.assert_equal(nodes[1:, 4], np.cumsum(nodes[:-1, 5]))
+    # Nodes are sorted by level, and inner nodes are full
+    assert (np.diff(nodes[:, 0]) >= 0).all()
+    depth = nodes[:, 0].max()
+    assert (nodes[nodes[:, 0] < depth, 5] == 100).all()
+    # The points of each node are inside its cube
+    for level, x, y, z, start, count in nodes:
+        cell = size / 2 ** level
+        p = points[order[start:start + count]]
+        lower = origin + cell * np.array([x, y, z])
+        assert (p >= lower - 1e-6).all() and (p <= lower + cell + 1e-6).all()
+
+
+def test_build_octree_empty():
+    order, nodes, origin, size = build_octree(np.zeros((0, 3)))
+    assert len(order) == 0
+    assert nodes.shape == (0, 6)
+
+
+def test_pointcloud_metadata(mock_comm):
+    w = PointCloudWidget(_points(3000), node_size=100)
+    assert w.num_points == 3000
+    assert w.shape == (3000, 3)
+    assert w.nodes.shape[1] == 5
+    assert w.nodes[:, 4].sum() == 3000
+    assert w.nodes[0, 0] == 0
+
+
+def test_pointcloud_colors_mismatch():
+    with pytest.raises(TraitError):
+        PointCloudWidget(_points(10), colors=np.zeros((5, 4), dtype=np.uint8))
+
+
+def test_pointcloud_frustum(mock_comm):
+    w = PointCloudWidget(_points(3000), node_size=100)
+    assert w.nodes_in_frustum(_all_planes).all()
+    # Only the half with x < 0.4
+    visible = w.nodes_in_frustum([[-1, 0, 0, 0.4]])
+    lower, upper = w.node_bounds()
+    np.testing.assert_equal(visible, lower[:, 0] <= 0.4)
+
+
+def test_pointcloud_select_budget(mock_comm):
+    w = PointCloudWidget(_points(3000), node_size=100)
+    selected = w.select_nodes(_all_planes, point_budget=1000)
+    assert sum(w.nodes[selected, 4]) <= 1000
+    # Level by level without a camera
+    levels = w.nodes[selected, 0]
+    assert selected[0] == 0
+    assert (np.diff(levels) >= 0).all()
+    assert len(w.select_nodes(_all_planes, point_budget=10 ** 9)) == len(w.nodes)
+
+
+def test_pointcloud_select_near_camera_first(mock_comm):
+    w = PointCloudWidget(_points(20000), node_size=100)
+    selected = w.select_nodes(_all_planes, camera_position=[0, 0, 0], point_budget=2000)
+    lower, upper = w.node_bounds()
+    deepest = [i for i in selected if w.nodes[i, 0] == w.nodes[selected, 0].max()]
+    assert all((lower[i] < 0.5).all() for i in deepest)
+
+
+def test_pointcloud_update_view(mock_comm):
+    points = _points(1000)
+    colors = np.random.default_rng(1).integers(0, 255, (1000, 4), dtype=np.uint8)
+    w = PointCloudWidget(points, colors=colors, node_size=100)
+    w.comm = mock_comm
+    w._handle_view_msg(w, {'method': 'update_view', 'planes': _all_planes,
+                           'camera_position': None}, [])
+    msgs = [m[1] for m in mock_comm.log_send]
+    first = msgs[0]['data']['content']
+    assert first['method'] == 'visible_nodes'
+    assert len(msgs) == 1 + len(first['nodes'])
+    node = msgs[1]['data']['content']
+    assert node['method'] == 'node_data'
+    positions, node_colors = w.get_node(node['node'])
+    np.testing.assert_equal(np.frombuffer(msgs[1]['buffers'][0], np.float32).reshape(-1, 3), positions)
+    np.testing.assert_equal(np.frombuffer(msgs[1]['buffers'][1], np.uint8).reshape(-1, 4), node_colors)
+
+    # Nodes are only sent once
+    mock_comm.log_send.clear()
+    w.update_view(_all_planes)
+    assert len(mock_comm.log_send) == 1
+
+
+def test_pointcloud_new_points_invalidate(mock_comm):
+    w = PointCloudWidget(_points(500), node_size=100)
+    w.comm = mock_comm
+    w.update_view(_all_planes)
+    mock_comm.log_send.clear()
+    w.positions = _points(800, seed=1)
+    assert w.num_points == 800
+    methods = [m[1]['data'].get('content', {}).get('method') for m in mock_comm.log_send]
+    assert methods.count('invalidate_nodes') == 1
+    assert not w._sent_nodes
+
+
+def test_pointcloud_notify_changed(mock_comm):
+    w = PointCloudWidget(_points(500), node_size=100)
+    w.comm = mock_comm
+    w.update_view(_all_planes)
+    mock_comm.log_send.clear()
+    w.positions[:] *= 2
+    # In-place changes are not noticed
+    w.positions = w.positions
+    assert not mock_comm.log_send
+    w.notify_changed()
+    assert w.size > 1.5
+    methods = [m[1]['data'].get('content', {}).get('method') for m in mock_comm.log_send]
+    assert methods.count('invalidate_nodes') == 1
+    assert not w._sent_nodes
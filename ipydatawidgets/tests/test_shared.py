@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import warnings
+
+import pytest
+
+import numpy as np
+
+pytest.importorskip('multiprocessing.shared_memory')
+
+from ..ndarray.shared import SharedArrayBuffer, attach_shared_array
+from ..ndarray import widgets
+from ..ndarray.widgets import NDArrayWidget
+
+
+def _contents(mock_comm):
+    return [m[1]['data'].get('content', m[1]['data']) for m in mock_comm.log_send]
+
+
+def test_shared_array_roundtrip():
+    shared = SharedArrayBuffer.create((3, 4), np.float32)
+    try:
+        shared.array[...] = np.arange(12).reshape(3, 4)
+        shared.version = 5
+        attached = attach_shared_array(shared.handle())
+        try:
+            np.testing.assert_equal(attached.array, shared.array)
+            assert attached.version == 5
+            assert not attached.array.flags.writeable
+            # Changes are visible without copying
+            shared.array[0, 0] = 42
+            shared.version = 6
+            assert attached.array[0, 0] == 42
+            assert attached.version == 6
+        finally:
+            attached.close()
+    finally:
+        shared.close()
+
+
+def test_attach_invalid_block():
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(create=True, size=128)
+    try:
+        with pytest.raises(ValueError):
+            attach_shared_array({'shared_memory': shm.name, 'shape': [1], 'dtype': 'uint8'})
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_widget_shared_transport(mock_comm):
+    data = np.arange(10, dtype=np.float32)
+    w = NDArrayWidget(data, transport='shared_memory')
+    handle = w.shared_handle
+    assert handle['shape'] == [10]
+    assert handle['dtype'] == 'float32'
+    # The widget uses the shared copy
+    assert w.array is w._shared.array
+    np.testing.assert_equal(w.array, data)
+
+    state = w.get_state('array')
+    assert state['array'] == handle
+    attached = attach_shared_array(state['array'])
+    try:
+        np.testing.assert_equal(attached.array, data)
+        assert attached.version == w._array_version
+    finally:
+        attached.close()
+        w.close()
+    assert w._shared is None
+
+
+def test_widget_shared_segment(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32), transport='shared_memory')
+    w.comm = mock_comm
+    attached = attach_shared_array(w.shared_handle)
+    try:
+        base_version = w._array_version
+        w.array[2:4] = 1
+        w.send_segment([(2, 4)])
+        msg, = _contents(mock_comm)
+        assert msg['method'] == 'update_shared_segment'
+        assert msg['segments'] == [[2, 4]]
+        assert (msg['base_version'], msg['version']) == (base_version, w._array_version)
+        assert mock_comm.log_send[0][1]['buffers'] in (None, [])
+        assert attached.version == w._array_version
+        np.testing.assert_equal(attached.array[2:4], 1)
+    finally:
+        attached.close()
+        w.close()
+
+
+def test_widget_shared_new_array(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32), transport='shared_memory')
+    name = w.shared_handle['shared_memory']
+    # Same shape and dtype reuses the block
+    w.array = np.ones(10, dtype=np.float32)
+    assert w.shared_handle['shared_memory'] == name
+    assert w.shared_handle['version'] == w._array_version
+    # Otherwise, a new block is allocated
+    old = w.array
+    w.array = np.ones((2, 3), dtype=np.int16)
+    assert w.shared_handle['shared_memory'] != name
+    assert w.shared_handle['shape'] == [2, 3]
+    # The old block is unlinked, but stays mapped while in use
+    with pytest.raises(FileNotFoundError):
+        attach_shared_array(dict(w.shared_handle, shared_memory=name))
+    np.testing.assert_equal(old, 1)
+    w.close()
+
+
+def test_widget_shared_warns_on_assigned_array_change(mock_comm, monkeypatch):
+    # Checksum blocks of two elements
+    monkeypatch.setattr(widgets, '_shared_check_block', 8)
+    a = np.zeros(10, dtype=np.float32)
+    w = NDArrayWidget(a, transport='shared_memory')
+    w.comm = mock_comm
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            w.array[0:3] = 7
+            w.sync_segment([(0, 3)])
+            w.notify_changed()
+        a[5:7] = 7
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            # Changes outside the synced segment are not checked
+            w.sync_segment([(0, 3)])
+        with pytest.warns(UserWarning, match='modify the array attribute'):
+            w.sync_segment([(5, 7)])
+        # The full array is checked on notify_changed
+        w.array = a = np.zeros(10, dtype=np.float32)
+        a[8] = 7
+        with pytest.warns(UserWarning, match='modify the array attribute'):
+            w.notify_changed()
+    finally:
+        w.close()
+
+
+def test_widget_close_keeps_arrays(mock_comm):
+    w = NDArrayWidget(np.arange(6, dtype=np.float32), transport='shared_memory')
+    a = w.array
+    view = a[2:]
+    w.close()
+    assert w._shared is None
+    assert a.sum() == 15
+    assert view.sum() == 14
+    # The widget keeps a private copy
+    assert w.array is not a
+    np.testing.assert_equal(w.array, np.arange(6))
+    del w
+    import gc
+    gc.collect()
+    assert view.sum() == 14
+
+
+def test_widget_collected_keeps_arrays(mock_comm):
+    import gc
+    w = NDArrayWidget(np.arange(6, dtype=np.float32), transport='shared_memory')
+    a = w.array
+    del w
+    gc.collect()
+    assert a.sum() == 15
+
+
+def test_widget_transport_switch(mock_comm):
+    data = np.arange(6, dtype=np.float64)
+    w = NDArrayWidget(data)
+    assert w.shared_handle is None
+    w.transport = 'shared_memory'
+    assert w.shared_handle is not None
+    np.testing.assert_equal(w.array, data)
+
+    w.transport = 'comm'
+    assert w.shared_handle is None
+    np.testing.assert_equal(w.array, data)
+    state = w.get_state('array')
+    assert 'shared_memory' not in state['array']
+    w.close()
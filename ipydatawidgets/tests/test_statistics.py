@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import numpy as np
+
+from ..ndarray.statistics import array_statistics
+from ..ndarray.widgets import NDArrayWidget
+from .conftest import DummyComm
+
+
+def test_array_statistics():
+    stats = array_statistics(np.arange(10, dtype=np.int32), bins=5)
+    assert stats['min'] == 0
+    assert stats['max'] == 9
+    assert stats['mean'] == 4.5
+    assert stats['nan_count'] == 0
+    assert stats['histogram'] == [2, 2, 2, 2, 2]
+    assert stats['bin_edges'][0] == 0
+    assert stats['bin_edges'][-1] == 9
+
+
+def test_array_statistics_nonfinite():
+    data = np.array([np.nan, 1, 3, np.inf, np.nan], dtype=np.float32)
+    stats = array_statistics(data, bins=2)
+    assert stats['nan_count'] == 2
+    assert stats['min'] == 1
+    assert stats['max'] == 3
+    assert stats['mean'] == 2
+    assert stats['histogram'] == [1, 1]
+
+
+def test_array_statistics_all_nan():
+    stats = array_statistics(np.full(3, np.nan))
+    assert stats['nan_count'] == 3
+    assert stats['min'] is None
+    assert stats['histogram'] == []
+
+
+def test_array_statistics_bool():
+    stats = array_statistics(np.array([True, False, True]), bins=2)
+    assert stats['min'] == 0
+    assert stats['max'] == 1
+    assert stats['histogram'] == [1, 2]
+
+
+def test_statistics_disabled_by_default():
+    w = NDArrayWidget(np.arange(4))
+    assert w.statistics == {}
+
+
+def test_statistics_follow_array(mock_comm):
+    w = NDArrayWidget(np.arange(4, dtype=np.float32), compute_statistics=True)
+    assert w.statistics['max'] == 3
+    w.comm = DummyComm()
+    w.array = np.arange(8, dtype=np.float32)
+    assert w.statistics['max'] == 7
+    # Statistics are sent in the same message as the array
+    assert len(w.comm.log_send) == 1
+    state = w.comm.log_send[0][1]['data']['state']
+    assert set(state) == {'array', 'array_version', 'statistics'}
+    assert state['statistics']['max'] == 7
+
+
+def test_statistics_segment_update(mock_comm):
+    w = NDArrayWidget(np.zeros(4, dtype=np.float32), compute_statistics=True)
+    w.array[1] = 5
+    w.send_segment([(1, 2)])
+    assert w.statistics['max'] == 5
+
+
+def test_statistics_cached_per_version(monkeypatch):
+    from ..ndarray import widgets
+    calls = []
+    def counting(array, bins):
+        calls.append(bins)
+        return array_statistics(array, bins)
+    monkeypatch.setattr(widgets, 'array_statistics', counting)
+
+    w = NDArrayWidget(np.arange(4), compute_statistics=True)
+    assert len(calls) == 1
+    w._update_statistics()
+    assert len(calls) == 1
+    w.histogram_bins = 4
+    assert calls == [32, 4]
+    assert len(w.statistics['histogram']) == 4
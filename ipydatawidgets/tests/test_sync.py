@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import comm
+import pytest
+
+import numpy as np
+from traitlets import TraitError
+
+from ..ndarray.traits import shape_constraints
+from ..ndarray.widgets import (
+    NDArrayWidget, create_array_widgets, create_constrained_arraywidget
+)
+from ..sync import batched_sync, SyncBatchWidget
+from ..widgets import DataWidget
+from .conftest import DummyComm
+
+
+@pytest.fixture
+def batch_comm(mock_comm):
+    widget = SyncBatchWidget()
+    widget.comm = DummyComm()
+    SyncBatchWidget._instance = widget
+    yield widget.comm
+    SyncBatchWidget._instance = None
+
+
+def _widgets(n):
+    widgets = []
+    for i in range(n):
+        w = NDArrayWidget(np.zeros(4, dtype=np.float32))
+        w.comm = DummyComm()
+        widgets.append(w)
+    return widgets
+
+
+def test_batched_sync_single_message(batch_comm):
+    widgets = _widgets(3)
+    with batched_sync():
+        for i, w in enumerate(widgets):
+            w.array = np.full(4, i + 1, dtype=np.float32)
+        assert len(batch_comm.log_send) == 0
+
+    for w in widgets:
+        assert len(w.comm.log_send) == 0
+    assert len(batch_comm.log_send) == 1
+    kwargs = batch_comm.log_send[0][1]
+    msg = kwargs['data']['content']
+    assert msg['method'] == 'batch_update'
+    assert [u['model_id'] for u in msg['updates']] == [w.model_id for w in widgets]
+    assert all(u['msg']['method'] == 'update' for u in msg['updates'])
+    assert [u['n_buffers'] for u in msg['updates']] == [1, 1, 1]
+    buffers = kwargs['buffers']
+    assert len(buffers) == 3
+    np.testing.assert_equal(np.frombuffer(buffers[2], np.float32), 3)
+
+
+def test_batched_sync_segments(batch_comm):
+    widgets = _widgets(2)
+    with batched_sync():
+        widgets[0].array = np.ones(4, dtype=np.float32)
+        widgets[1].array[:2] = 5
+        widgets[1].sync_segment([(0, 2)])
+
+    msg = batch_comm.log_send[0][1]['data']['content']
+    methods = [u['msg'].get('content', u['msg'])['method'] for u in msg['updates']]
+    assert methods == ['update', 'update_array_segment']
+
+
+def test_batched_sync_single_update_sent_directly(batch_comm):
+    w, = _widgets(1)
+    with batched_sync():
+        w.array = np.ones(4, dtype=np.float32)
+    assert len(batch_comm.log_send) == 0
+    assert len(w.comm.log_send) == 1
+
+
+def test_batched_sync_nested(batch_comm):
+    widgets = _widgets(2)
+    with batched_sync():
+        with batched_sync():
+            widgets[0].array = np.ones(4, dtype=np.float32)
+        assert len(batch_comm.log_send) == 0
+        widgets[1].array = np.ones(4, dtype=np.float32)
+    assert len(batch_comm.log_send) == 1
+    assert len(batch_comm.log_send[0][1]['data']['content']['updates']) == 2
+
+
+def test_batched_sync_sends_on_error(batch_comm):
+    widgets = _widgets(2)
+    with pytest.raises(ValueError):
+        with batched_sync():
+            widgets[0].array = np.ones(4, dtype=np.float32)
+            widgets[1].array = np.ones(4, dtype=np.float32)
+            raise ValueError()
+    assert len(batch_comm.log_send) == 1
+    assert DataWidget._active_batch is None
+
+
+def test_no_batch_outside_context(batch_comm):
+    w, = _widgets(1)
+    w.array = np.ones(4, dtype=np.float32)
+    assert len(w.comm.log_send) == 1
+    assert len(batch_comm.log_send) == 0
+
+
+def test_create_array_widgets(batch_comm, monkeypatch):
+    monkeypatch.setattr(comm, 'create_comm', lambda **kwargs: DummyComm(**kwargs))
+    arrays = [np.full(3, i, dtype=np.float32) for i in range(4)]
+    widgets = create_array_widgets(arrays, compression_level=1)
+
+    assert [w.compression_level for w in widgets] == [1] * 4
+    for w, array in zip(widgets, arrays):
+        assert w.array is array
+        # Opened without the array data
+        open_state = w.comm.log_open[0][1]['data']['state']
+        assert 'array' not in open_state
+        assert 'compression_level' in open_state
+        assert len(w.comm.log_send) == 0
+    assert len(batch_comm.log_send) == 1
+    msg = batch_comm.log_send[0][1]['data']['content']
+    assert [u['model_id'] for u in msg['updates']] == [w.model_id for w in widgets]
+    # Later states include the array again
+    assert 'array' in widgets[0].get_state()
+
+
+def test_create_array_widgets_error(batch_comm):
+    created = []
+    class Recorded(create_constrained_arraywidget(shape_constraints(None, 3))):
+        def __init__(self, *args, **kwargs):
+            super(Recorded, self).__init__(*args, **kwargs)
+            created.append(self)
+
+    with pytest.raises(TraitError):
+        create_array_widgets([np.zeros((2, 3)), np.zeros((2, 2))], Recorded)
+    # The widget created before the error is closed
+    assert len(created) == 1
+    assert created[0].comm is None
+    assert len(batch_comm.log_send) == 0
+    # Later widgets are not affected
+    w = NDArrayWidget(np.zeros(3))
+    assert 'array' in w.get_state()
+
+
+def test_create_array_widgets_constrained(batch_comm, monkeypatch):
+    monkeypatch.setattr(comm, 'create_comm', lambda **kwargs: DummyComm(**kwargs))
+    cls = create_constrained_arraywidget(shape_constraints(None, 3), dtype=np.float32)
+    widgets = create_array_widgets([np.zeros((2, 3)), np.ones((4, 3))], cls)
+    assert all(type(w) is cls for w in widgets)
+    assert widgets[1].array.dtype == np.float32
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+import numpy as np
+from traitlets import TraitError
+
+from ..ndarray.table import NDArrayTable
+from ..ndarray.serializers import table_to_json, table_from_json
+
+
+def test_table_creation():
+    x = np.zeros(5, dtype=np.float32)
+    pos = np.zeros((5, 3), dtype=np.float32)
+    w = NDArrayTable({'x': x, 'pos': pos})
+    assert w['x'] is x
+    assert w.num_rows == 5
+    assert w.column_names == ['x', 'pos']
+
+
+def test_table_creation_blank():
+    w = NDArrayTable()
+    assert w.num_rows == 0
+    assert w.column_names == []
+
+
+def test_table_coerces_columns():
+    w = NDArrayTable({'x': [1., 2., 3.]})
+    assert isinstance(w['x'], np.ndarray)
+    assert w.num_rows == 3
+
+
+def test_table_row_count_mismatch():
+    with pytest.raises(TraitError):
+        NDArrayTable({'x': np.zeros(5), 'y': np.zeros(4)})
+
+
+def test_table_scalar_column():
+    with pytest.raises(TraitError):
+        NDArrayTable({'x': np.array(5.)})
+
+
+def test_table_json_roundtrip():
+    columns = {
+        'x': np.arange(4, dtype=np.float32),
+        'id': np.arange(4, dtype=np.int32),
+    }
+    json_data = table_to_json(columns, None)
+    assert sorted(json_data.keys()) == ['id', 'x']
+    assert json_data['x']['buffer'] == memoryview(columns['x'])
+    result = table_from_json(json_data, None)
+    for name, column in columns.items():
+        np.testing.assert_equal(result[name], column)
+        assert result[name].dtype == column.dtype
+
+
+def test_table_single_message(mock_comm):
+    w = NDArrayTable({'x': np.zeros(5), 'y': np.zeros(5)})
+    w.comm = mock_comm
+    w.columns = {'x': np.ones(3), 'y': np.ones(3)}
+
+    assert len(mock_comm.log_send) == 1
+    buffers = mock_comm.log_send[0][1]['buffers']
+    assert len(buffers) == 2
+
+
+def test_table_sync_rows(mock_comm):
+    x = np.zeros(5, dtype=np.float32)
+    pos = np.zeros((5, 3), dtype=np.float32)
+    w = NDArrayTable({'x': x, 'pos': pos})
+    w.comm = mock_comm
+
+    x[1:3] = 1
+    pos[1:3] = 2
+    w.sync_rows(1, 3)
+
+    assert len(mock_comm.log_send) == 1
+    args, kwargs = mock_comm.log_send[0]
+    msg = kwargs['data']['content']
+    assert msg['method'] == 'update_table_rows'
+    assert msg['start'] == 1
+    assert msg['columns'] == ['x', 'pos']
+    buffers = kwargs['buffers']
+    assert len(buffers) == 2
+    np.testing.assert_equal(buffers[0], memoryview(x[1:3]))
+    np.testing.assert_equal(buffers[1], memoryview(pos[1:3]))
+
+
+def test_table_sync_rows_negative(mock_comm):
+    w = NDArrayTable({'x': np.arange(5, dtype=np.float32)})
+    w.comm = mock_comm
+    w.sync_rows(-2, None)
+
+    args, kwargs = mock_comm.log_send[0]
+    assert kwargs['data']['content']['start'] == 3
+    np.testing.assert_equal(kwargs['buffers'][0], memoryview(w['x'][3:]))
+
+
+def test_table_sync_rows_int64(mock_comm):
+    w = NDArrayTable({'x': np.arange(5)})
+    w.comm = mock_comm
+    with pytest.warns(UserWarning, match='Cannot serialize'):
+        assert table_to_json(w.columns, w)['x']['dtype'] == 'int32'
+    with pytest.warns(UserWarning, match='Cannot serialize'):
+        w.sync_rows(1, 3)
+
+    buffer = np.asarray(mock_comm.log_send[0][1]['buffers'][0])
+    assert buffer.dtype == np.int32
+    np.testing.assert_equal(buffer, [1, 2])
+
+
+def test_table_hold_sync_rows(mock_comm):
+    w = NDArrayTable({'x': np.zeros(5), 'y': np.zeros(5)})
+    w.comm = mock_comm
+
+    with w.hold_sync():
+        w.sync_rows(0, 2)
+        w.sync_rows(3, 4)
+        assert len(mock_comm.log_send) == 0
+
+    row_msgs = [m for m in mock_comm.log_send
+                if m[1]['data'].get('content', {}).get('method') == 'update_table_rows']
+    assert len(row_msgs) == 2
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import numpy as np
+import pytest
+
+from .. import transport
+from ..ndarray.widgets import NDArrayWidget
+from ..transport import LinkEstimate, choose_compression_level
+
+
+@pytest.fixture
+def link():
+    transport.link_estimate.reset()
+    yield transport.link_estimate
+    transport.link_estimate.reset()
+
+
+def _link(latency, bandwidth):
+    link = LinkEstimate()
+    link.observe(100, 2 * latency, 0)
+    link.observe(10 ** 6, latency + 10 ** 6 / bandwidth, 0)
+    return link
+
+
+def test_link_estimate():
+    link = _link(0.05, 1e6)
+    assert link.latency == pytest.approx(0.1)
+    assert link.bandwidth == pytest.approx(1e6 * 1 / 0.95, rel=1e-3)
+    link.observe(10 ** 6, 2.0, 0.5, compressed=True)
+    assert link.decode_rates[True] == pytest.approx(2e6)
+    assert link.time_to_display(0) == pytest.approx(0.1)
+
+
+def test_choose_unmeasured():
+    assert choose_compression_level(b'x' * 1000, LinkEstimate()) is None
+
+
+def test_choose_slow_link():
+    data = np.zeros(10 ** 6, dtype=np.float32)
+    assert choose_compression_level(data, _link(0.05, 1e6)) > 0
+
+
+def test_choose_fast_link_random_data():
+    data = np.random.rand(10 ** 6).astype(np.float32)
+    assert choose_compression_level(data, _link(0.0001, 1e10)) == 0
+
+
+def test_choose_levels():
+    data = np.zeros(10 ** 5, dtype=np.float32)
+    assert choose_compression_level(data, _link(0.05, 1e6), levels=(0,)) == 0
+    assert choose_compression_level(data, _link(0.05, 1e6), levels=(9,)) == 9
+
+
+def test_ack_updates_link_estimate(mock_comm, link):
+    w = NDArrayWidget(np.zeros(10 ** 5, dtype=np.float32))
+    w.comm = mock_comm
+    w._handle_ack(w, {'method': 'ack', 'seq': 0}, [])
+    w.array = np.ones(10 ** 5, dtype=np.float32)
+    seq = mock_comm.log_send[-1][1]['data']['seq']
+    w._handle_ack(w, {'method': 'ack', 'seq': seq, 'decode_time': 0.0}, [])
+    assert link.bandwidth > 0
+    assert w.pending_messages == 0
+
+
+def test_auto_compression(mock_comm, link):
+    w = NDArrayWidget(np.zeros(10 ** 5, dtype=np.float32), auto_compression=True)
+    # Not measured yet, so compression_level is used
+    assert 'buffer' in w.get_state()['array']
+    link.observe(100, 0.1, 0)
+    link.observe(10 ** 6, 1.05, 0)
+    w.notify_changed()
+    assert 'compressed_buffer' in w.get_state()['array']
+
+
+def test_auto_compression_follows_link(mock_comm, link):
+    w = NDArrayWidget(np.zeros(10 ** 5, dtype=np.float32), auto_compression=True)
+    assert 'buffer' in w.get_state()['array']
+    # Without a change of the array, the cached state follows the link
+    link.observe(100, 0.1, 0)
+    link.observe(10 ** 6, 1.05, 0)
+    assert 'compressed_buffer' in w.get_state()['array']
+    link.reset()
+    link.observe(100, 0.0002, 0)
+    link.observe(10 ** 6, 0.0003, 0)
+    assert 'buffer' in w.get_state()['array']
+
+
+@pytest.fixture
+def kernel_activity(monkeypatch):
+    monkeypatch.setattr(transport, '_idle_since', 0.0)
+    yield
+
+
+def test_acks_while_executing_are_skipped(mock_comm, link, kernel_activity):
+    w = NDArrayWidget(np.zeros(10 ** 5, dtype=np.float32))
+    w.comm = mock_comm
+    w._handle_ack(w, {'method': 'ack', 'seq': 0}, [])
+    transport._on_pre_execute()
+    w.array = np.ones(10 ** 5, dtype=np.float32)
+    seq = mock_comm.log_send[-1][1]['data']['seq']
+    # Handled right after the execution finished, so it may have been queued
+    transport._on_post_execute()
+    w._handle_ack(w, {'method': 'ack', 'seq': seq, 'decode_time': 0.0}, [])
+    assert link.bandwidth is None
+    assert w.pending_messages == 0
+
+    # Sent and acknowledged while idle
+    w.array = np.zeros(10 ** 5, dtype=np.float32)
+    seq = mock_comm.log_send[-1][1]['data']['seq']
+    w._handle_ack(w, {'method': 'ack', 'seq': seq, 'decode_time': 0.0, 'nbytes': 4 * 10 ** 5}, [])
+    assert link.bandwidth > 0
+
+
+def test_ack_measures_link(kernel_activity):
+    transport._on_pre_execute()
+    assert not transport.ack_measures_link(0.0)
+    transport._on_post_execute()
+    idle_since = transport._idle_since
+    assert transport.ack_measures_link(idle_since + 0.001, idle_since + 0.002)
+    assert not transport.ack_measures_link(idle_since - 1, idle_since + 0.001)
+    assert transport.ack_measures_link(idle_since - 1, idle_since + 1)
@@ -4,6 +4,9 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
+import gc
+import weakref
+
 import pytest
 
 import numpy as np
@@ -124,6 +127,90 @@ def test_dataunion_widget_change_notified(mock_comm):
     assert ns['counter'] == 5
 
 
+def test_dataunion_segment_upload_notified(mock_comm):
+    changes = []
+    class Foo(Widget):
+        bar = DataUnion().tag(sync=True)
+
+        @observe('bar')
+        def on_bar_change(self, change):
+            changes.append(change)
+
+    w = NDArrayWidget(np.zeros(4, dtype=np.float32))
+    foo = Foo(bar=w)
+    changes.clear()
+    w._handle_custom_msg({'method': 'upload_array_segment', 'name': 'array',
+                          'starts': [1], 'dtype': 'float32'},
+                         [memoryview(np.ones(2, dtype=np.float32))])
+    assert len(changes) == 1
+    assert changes[0]['new'] is w
+
+
+def test_dataunion_frontend_update_skips_comparison(mock_comm, monkeypatch):
+    changes = []
+    class Foo(Widget):
+        bar = DataUnion().tag(sync=True)
+
+    foo = Foo(bar=np.zeros(4, dtype=np.float32))
+    foo.comm = mock_comm
+    foo.observe(changes.append, 'bar')
+    def fail(*args, **kwargs):
+        raise AssertionError('Arrays should not be compared')
+    monkeypatch.setattr(np, 'array_equal', fail)
+    buffer = memoryview(np.ones(4, np.float32))
+    foo.set_state({'bar': {'shape': [4], 'dtype': 'float32', 'buffer': buffer}})
+    np.testing.assert_equal(foo.bar, 1)
+    assert len(changes) == 1
+
+
+def test_dataunion_owner_garbage_collected():
+    class Foo(HasTraits):
+        bar = DataUnion()
+
+    w = NDArrayWidget(np.zeros(4))
+    foo = Foo(bar=w)
+    ref = weakref.ref(foo)
+    assert len(w._instance_validators) == 1
+    del foo
+    gc.collect()
+    assert ref() is None
+    assert len(w._instance_validators) == 0
+    assert len(w._union_links) == 0
+
+
+def test_dataunion_owner_closed(mock_comm):
+    class Foo(Widget):
+        bar = DataUnion().tag(sync=True)
+
+    w = NDArrayWidget(np.zeros(4))
+    foo = Foo(bar=w)
+    ref = weakref.ref(foo)
+    assert len(w._union_links) == 1
+    foo.close()
+    assert len(w._instance_validators) == 0
+    assert len(w._union_links) == 0
+    del foo
+    gc.collect()
+    assert ref() is None
+
+
+def test_dataunion_many_owners():
+    class Foo(HasTraits):
+        bar = DataUnion()
+
+    w = NDArrayWidget(np.zeros(4))
+    owners = [Foo(bar=w) for i in range(100)]
+    assert len(w._union_links) == 100
+    for foo in owners[::2]:
+        foo.bar = np.zeros(2)
+    assert len(w._union_links) == 50
+    assert len(Foo.bar._links) == 50
+    del owners
+    gc.collect()
+    assert len(w._union_links) == 0
+    assert len(Foo.bar._links) == 0
+
+
 def test_get_union_array_with_array():
     class Foo(Widget):
         bar = DataUnion()
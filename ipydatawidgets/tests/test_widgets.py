@@ -4,12 +4,14 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
+import zlib
+
 import pytest
 
 import numpy as np
 from traitlets import TraitError, Undefined
 
-from ..ndarray.traits import shape_constraints
+from ..ndarray.traits import NDArray, shape_constraints
 from ..ndarray.widgets import (
     NDArrayWidget,  NDArraySource,
     create_constrained_arraywidget, ConstrainedNDArrayWidget,
@@ -56,6 +58,25 @@ def test_constrained_datawidget():
     np.testing.assert_equal(w.array, np.zeros((4, 4, 3), dtype=np.uint8))
 
 
+def test_constrained_datawidget_cached():
+    cls = create_constrained_arraywidget(shape_constraints(None, 3), dtype=np.uint8)
+    assert create_constrained_arraywidget(shape_constraints(None, 3), dtype='uint8') is cls
+    assert create_constrained_arraywidget(shape_constraints(None, 3)) is not cls
+    assert create_constrained_arraywidget(shape_constraints(None, 4), dtype=np.uint8) is not cls
+
+
+def test_constrained_datawidget_cache_is_weak():
+    import gc
+    from ..ndarray import widgets
+    gc.collect()
+    n_cached = len(widgets._constrained_arraywidgets)
+    cls = create_constrained_arraywidget(lambda trait, value: value)
+    assert len(widgets._constrained_arraywidgets) == n_cached + 1
+    del cls
+    gc.collect()
+    assert len(widgets._constrained_arraywidgets) == n_cached
+
+
 def test_constrained_datawidget_deprecated():
     with pytest.warns(UserWarning) as warnings:
         ColorImage = ConstrainedNDArrayWidget(shape_constraints(None, None, 3), dtype=np.uint8)
@@ -139,3 +160,277 @@ def test_source_must_implement_shape():
         w.shape
     with pytest.raises(NotImplementedError):
         w.dtype
+
+
+def test_hold_sync_multiple_segments(mock_comm):
+    data = np.zeros((2, 4))
+    w = NDArrayWidget(data)
+    w.comm = mock_comm
+
+    with w.hold_sync():
+        w.sync_segment([(0, 2), (4, 6)])
+        w.sync_segment([[6, 8]])
+
+    msg = mock_comm.log_send[0][1]
+    assert sorted(msg['data']['content']['starts']) == [0, 4, 6]
+    assert len(msg['buffers']) == 3
+
+
+def _count_compressions(monkeypatch):
+    from ..ndarray import serializers
+    calls = []
+    orig_compress = zlib.compress
+    def compress(data, level):
+        calls.append(level)
+        return orig_compress(data, level)
+    monkeypatch.setattr(serializers.zlib, 'compress', compress)
+    return calls
+
+
+def test_serialization_cache(monkeypatch):
+    calls = _count_compressions(monkeypatch)
+    w = NDArrayWidget(np.zeros((20, 20)), compression_level=6)
+    first = w.get_state('array')['array']
+    second = w.get_state('array')['array']
+    assert len(calls) == 1
+    assert first['compressed_buffer'] is second['compressed_buffer']
+    assert first is not second
+
+
+def test_serialization_cache_invalidation(monkeypatch):
+    calls = _count_compressions(monkeypatch)
+    data = np.zeros((20, 20))
+    w = NDArrayWidget(data, compression_level=6)
+    w.get_state('array')
+    assert len(calls) == 1
+
+    data[0, 0] = 1
+    w.notify_changed()
+    state = w.get_state('array')['array']
+    assert len(calls) == 2
+    assert zlib.decompress(state['compressed_buffer'])[:8] == data[0, :1].tobytes()
+
+    w.array = np.ones((20, 20))
+    w.get_state('array')
+    assert len(calls) == 3
+
+    w.send_segment([(0, 4)])
+    w.get_state('array')
+    assert len(calls) == 4
+
+    w.compression_level = 3
+    w.get_state('array')
+    assert calls[-1] == 3
+
+
+def test_serialization_cache_sends_new_data(mock_comm):
+    data = np.zeros(4, dtype=np.float32)
+    w = NDArrayWidget(data)
+    w.comm = mock_comm
+    w.get_state('array')
+
+    data[:] = 1
+    w.notify_changed()
+    buffers = mock_comm.log_send[-1][1]['buffers']
+    np.testing.assert_equal(np.frombuffer(buffers[0], np.float32), 1)
+
+
+def _upload(widget, starts, buffers, dtype):
+    content = {'method': 'upload_array_segment', 'name': 'array',
+               'starts': starts, 'dtype': dtype}
+    widget._handle_custom_msg(content, [memoryview(b) for b in buffers])
+
+
+def test_segment_upload_in_place(mock_comm):
+    data = np.zeros((2, 4), dtype=np.float32)
+    w = NDArrayWidget(data)
+    changes = []
+    w.observe(changes.append, 'array')
+    segments = []
+    w.on_segment_change(lambda widget, s: segments.append(s))
+
+    _upload(w, [1, 6], [np.ones(2, np.float32), np.full(1, 2, np.float32)], 'float32')
+
+    assert w.array is data
+    np.testing.assert_equal(data, [[0, 1, 1, 0], [0, 0, 2, 0]])
+    assert segments == [[(1, 3), (6, 7)]]
+    assert changes == []
+
+
+def test_segment_upload_wire_dtype(mock_comm):
+    w = NDArrayWidget(np.zeros(4, dtype=np.int64))
+    _upload(w, [2], [np.array([5, 6], np.int32)], 'int32')
+    np.testing.assert_equal(w.array, [0, 0, 5, 6])
+    assert w.array.dtype == np.int64
+
+
+def test_segment_upload_readonly(mock_comm):
+    data = np.zeros(4, dtype=np.float32)
+    data.flags.writeable = False
+    w = NDArrayWidget(data)
+    _upload(w, [0], [np.ones(1, np.float32)], 'float32')
+    np.testing.assert_equal(w.array, [1, 0, 0, 0])
+    assert w.array.flags.writeable
+    # Later uploads are applied to the same copy
+    copy = w.array
+    _upload(w, [3], [np.ones(1, np.float32)], 'float32')
+    assert w.array is copy
+
+
+def test_segment_upload_out_of_bounds(mock_comm):
+    w = NDArrayWidget(np.zeros(4, dtype=np.float32))
+    segments = []
+    w.on_segment_change(lambda widget, s: segments.append(s))
+    # Errors in message handlers are logged, not raised
+    _upload(w, [0, 3], [np.ones(1, np.float32), np.ones(2, np.float32)], 'float32')
+    np.testing.assert_equal(w.array, 0)
+    assert segments == []
+
+
+def test_segment_upload_invalidates_cache(mock_comm):
+    w = NDArrayWidget(np.zeros(4, dtype=np.float32))
+    w.get_state('array')
+    _upload(w, [0], [np.ones(4, np.float32)], 'float32')
+    state = w.get_state('array')['array']
+    np.testing.assert_equal(np.frombuffer(state['buffer'], np.float32), 1)
+
+
+def test_frontend_update_skips_comparison(mock_comm, monkeypatch):
+    w = NDArrayWidget(np.zeros(4, dtype=np.float32))
+    w.comm = mock_comm
+    def fail(*args, **kwargs):
+        raise AssertionError('Arrays should not be compared')
+    monkeypatch.setattr(np, 'array_equal', fail)
+    buffer = memoryview(np.ones(4, np.float32))
+    w.set_state({'array': {'shape': [4], 'dtype': 'float32', 'buffer': buffer}})
+    np.testing.assert_equal(w.array, 1)
+
+
+def test_replace_array(mock_comm):
+    w = NDArrayWidget(np.zeros((2, 2), dtype=np.float32))
+    w.comm = mock_comm
+    changes = []
+    w.observe(changes.append, 'array')
+    data = np.ones((2, 2), dtype=np.float32)
+    w.replace_array(data)
+    assert w.array is data
+    assert len(changes) == 1
+    assert len(mock_comm.log_send) == 1
+
+
+def test_replace_array_skips_validation(mock_comm, monkeypatch):
+    w = NDArrayWidget(np.zeros(4, dtype=np.float32))
+    def fail(*args, **kwargs):
+        raise AssertionError('Should not validate')
+    monkeypatch.setattr(NDArray, 'validate', fail)
+    monkeypatch.setattr(np, 'array_equal', fail)
+    w.replace_array(np.ones(4, dtype=np.float32))
+    np.testing.assert_equal(w.array, 1)
+
+
+def test_replace_array_checks_metadata():
+    w = NDArrayWidget(np.zeros(4, dtype=np.float32))
+    with pytest.raises(TraitError):
+        w.replace_array(np.zeros(4, dtype=np.float64))
+    with pytest.raises(TraitError):
+        w.replace_array(np.zeros(5, dtype=np.float32))
+    with pytest.raises(TraitError):
+        w.replace_array([0, 0, 0, 0])
+    with pytest.raises(TraitError):
+        NDArrayWidget().replace_array(np.zeros(4))
+
+
+def _segment_msgs(comm):
+    return [m[1]['data']['content'] for m in comm.log_send
+            if m[1]['data'].get('content', {}).get('method') == 'update_array_segment']
+
+
+def test_segment_versions(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32))
+    w.comm = mock_comm
+    version = w.get_state()['array_version']
+    w.send_segment([(0, 2)])
+    w.send_segment([(4, 6)])
+    msgs = _segment_msgs(mock_comm)
+    assert [(m['base_version'], m['version']) for m in msgs] == [
+        (version, version + 1), (version + 1, version + 2)]
+    assert not any(m['resync'] for m in msgs)
+    assert w.get_state()['array_version'] == version + 2
+
+
+def test_segments_since(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32), resync_log_size=3)
+    version = w._array_version
+    w.send_segment([(0, 2)])
+    w.send_segment([(1, 4), (8, 9)])
+    w.send_segment([(6, 7)])
+    assert w.segments_since(version) == [(0, 4), (6, 7), (8, 9)]
+    assert w.segments_since(version + 2) == [(6, 7)]
+    assert w.segments_since(version + 3) == []
+    # The log only holds the last three updates
+    w.send_segment([(9, 10)])
+    assert w.segments_since(version) is None
+    assert w.segments_since(version + 1) == [(1, 4), (6, 7), (8, 10)]
+    # A full change resets the log
+    w.array = np.ones(10, dtype=np.float32)
+    assert w.segments_since(version + 3) is None
+    assert w.segments_since(w._array_version) == []
+
+
+def test_resync_sends_missed_segments(mock_comm):
+    w = NDArrayWidget(np.zeros(100, dtype=np.float32))
+    w.comm = mock_comm
+    version = w._array_version
+    w.array[10:20] = 1
+    w.send_segment([(10, 20)])
+    w.array[50:55] = 2
+    w.send_segment([(50, 55)])
+    mock_comm.log_send.clear()
+
+    w._handle_resync(w, {'method': 'resync', 'name': 'array', 'version': version}, [])
+    msg, = _segment_msgs(mock_comm)
+    assert msg['starts'] == [10, 50]
+    assert (msg['base_version'], msg['version']) == (version, w._array_version)
+    assert msg['resync']
+    buffers = mock_comm.log_send[0][1]['buffers']
+    np.testing.assert_equal(np.frombuffer(buffers[0], np.float32), 1)
+    np.testing.assert_equal(np.frombuffer(buffers[1], np.float32), 2)
+
+
+def test_resync_up_to_date(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32))
+    w.comm = mock_comm
+    w.resync(w._array_version)
+    msg, = _segment_msgs(mock_comm)
+    assert msg['starts'] == []
+    assert msg['version'] == msg['base_version'] == w._array_version
+    # Marked as a reply, so the front-end stops waiting for it
+    assert msg['resync']
+
+
+def test_resync_falls_back_to_full_state(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32), resync_log_size=1)
+    w.comm = mock_comm
+    version = w._array_version
+    w.send_segment([(0, 1)])
+    w.send_segment([(1, 2)])
+    mock_comm.log_send.clear()
+    # Beyond the log
+    w.resync(version)
+    state = mock_comm.log_send[0][1]['data']['state']
+    assert state['array_version'] == w._array_version
+    assert 'array' in state
+    # Changes covering most of the array
+    w.send_segment([(0, 8)])
+    mock_comm.log_send.clear()
+    w.resync(w._array_version - 1)
+    assert 'array' in mock_comm.log_send[0][1]['data']['state']
+
+
+def test_segment_upload_is_logged(mock_comm):
+    w = NDArrayWidget(np.zeros(10, dtype=np.float32))
+    version = w._array_version
+    w._handle_segment_upload(w, {'method': 'upload_array_segment', 'name': 'array',
+                                 'starts': [3], 'dtype': 'float32'},
+                             [np.ones(2, dtype=np.float32).tobytes()])
+    assert w.segments_since(version) == [(3, 5)]
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+"""
+Link-aware tuning of the transport of data widgets.
+
+The front-end acknowledges every data widget message with the time it
+took to decode and apply it (see `DataWidget`). Together with the round
+trip time measured on the kernel, this gives an estimate of the latency
+and bandwidth of the link, and of the decode rate of the front-end,
+which is kept in `link_estimate`. Widgets with `auto_compression` use
+it to pick the compression level that minimizes the time until the
+data is displayed: compression pays off over slow links, but only
+costs time on localhost.
+
+All data widgets of a kernel share the estimate. Comm messages are
+broadcast to all front-ends connected to a kernel, so the estimate is
+dominated by the slowest one. With e.g. Voila, every client gets its
+own kernel, and thereby its own estimate.
+
+The kernel only handles acks between cell executions. An ack that
+arrived while a cell was executing waited for it, and does not measure
+the link, so such acks are skipped (see `ack_measures_link`).
+"""
+
+import time
+import zlib
+
+
+# The compression levels considered by `choose_compression_level`
+compression_levels = (0, 1, 6)
+
+# Messages smaller than this mostly measure latency, not bandwidth
+small_message_size = 16 * 1024
+
+# The number of bytes compressed to estimate the compression ratio and speed
+sample_size = 64 * 1024
+
+# Front-end decode rates (in received bytes per second) assumed before
+# they have been measured
+default_decode_rates = {False: 1e9, True: 1.5e8}
+
+# Acks handled within this time after an execution finished may have
+# been queued while it executed
+idle_margin = 0.02
+
+
+class LinkEstimate(object):
+    """Running estimates of the link to the front-end.
+
+    Parameters
+    ----------
+    smoothing : float
+        The weight of a new measurement in the moving averages.
+
+    Attributes
+    ----------
+    latency : float or None
+        The one-way transfer time of small messages, in seconds.
+    bandwidth : float or None
+        The transfer rate of large messages, in bytes per second.
+    decode_rates : dict
+        The front-end decode rate in received bytes per second, for
+        uncompressed (False) and compressed (True) messages.
+    """
+
+    def __init__(self, smoothing=0.25):
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.latency = None
+        self.bandwidth = None
+        self.decode_rates = {}
+
+    def _average(self, current, value):
+        if current is None:
+            return value
+        return current + self.smoothing * (value - current)
+
+    def observe(self, nbytes, round_trip, decode_time, compressed=False):
+        """Add a measurement of an acknowledged message.
+
+        Parameters
+        ----------
+        nbytes : int
+            The size of the binary buffers of the message.
+        round_trip : float
+            The time from sending the message to receiving the ack.
+        decode_time : float
+            The time the front-end spent decoding and applying the message.
+        compressed : bool
+            Whether the message contained compressed buffers.
+        """
+        transfer = max(round_trip - decode_time, 0.0)
+        if nbytes < small_message_size:
+            self.latency = self._average(self.latency, transfer)
+        else:
+            duration = max(transfer - (self.latency or 0.0), 1e-6)
+            self.bandwidth = self._average(self.bandwidth, nbytes / duration)
+            if decode_time > 0:
+                self.decode_rates[compressed] = self._average(
+                    self.decode_rates.get(compressed), nbytes / decode_time)
+
+    def time_to_display(self, nbytes, compressed=False):
+        """Estimate the time from sending a message until it is applied.
+
+        Returns None while the bandwidth is unknown.
+        """
+        if self.bandwidth is None:
+            return None
+        decode_rate = self.decode_rates.get(compressed, default_decode_rates[compressed])
+        return (self.latency or 0.0) + nbytes / self.bandwidth + nbytes / decode_rate
+
+
+# The estimate shared by all data widgets in the kernel
+link_estimate = LinkEstimate()
+
+
+# When the kernel last finished executing code, None while executing
+_idle_since = 0.0
+_watching = False
+
+
+def _on_pre_execute():
+    global _idle_since
+    _idle_since = None
+
+
+def _on_post_execute():
+    global _idle_since
+    _idle_since = time.perf_counter()
+
+
+def watch_kernel_activity():
+    """Start tracking when the IPython kernel executes code, if running in one."""
+    global _watching, _idle_since
+    if _watching:
+        return
+    _watching = True
+    try:
+        from IPython import get_ipython
+    except ImportError:
+        return
+    shell = get_ipython()
+    if shell is None:
+        return
+    shell.events.register('pre_execute', _on_pre_execute)
+    shell.events.register('post_execute', _on_post_execute)
+    # Widgets are usually first created by executing a cell
+    _idle_since = None
+
+
+def ack_measures_link(sent, now=None):
+    """Whether the ack of a message measures the link to the front-end.
+
+    This is the case if the kernel was idle when the ack arrived, so that
+    it was handled right away. Outside of an IPython kernel, this is
+    always the case.
+
+    Parameters
+    ----------
+    sent : float
+        When the message was sent, as given by `time.perf_counter()`.
+    now : float or None
+        When the ack is handled, the current time if None.
+    """
+    if _idle_since is None:
+        return False
+    if sent >= _idle_since:
+        # Sent while idle, and the kernel has been idle since
+        return True
+    if now is None:
+        now = time.perf_counter()
+    return now - _idle_since > idle_margin
+
+
+def choose_compression_level(data, link=None, levels=compression_levels):
+    """Pick the compression level that displays data the fastest.
+
+    The compression ratio and speed of each level are measured on a
+    sample of the data, and the time to display is estimated from the
+    compression time, and the transfer and decode times of the link.
+
+    Parameters
+    ----------
+    data : bytes-like
+        The data to send.
+    link : LinkEstimate or None
+        The link estimate to use, `link_estimate` if None.
+    levels : tuple of int
+        The zlib compression levels to consider, 0 meaning no compression.
+
+    Returns
+    -------
+    The chosen level, or None if the link has not been measured yet.
+    """
+    if link is None:
+        link = link_estimate
+    if link.bandwidth is None:
+        return None
+    data = memoryview(data).cast('B')
+    sample = data[:sample_size]
+    best_level, best_time = None, None
+    for level in levels:
+        if level == 0:
+            estimate = link.time_to_display(len(data))
+        elif not len(sample):
+            continue
+        else:
+            start = time.perf_counter()
+            ratio = len(zlib.compress(sample, level)) / len(sample)
+            compress_time = (time.perf_counter() - start) * len(data) / len(sample)
+            estimate = compress_time + link.time_to_display(len(data) * ratio, compressed=True)
+        if best_time is None or estimate < best_time:
+            best_level, best_time = level, estimate
+    return best_level
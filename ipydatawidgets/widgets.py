@@ -8,14 +8,218 @@
 Common base widgets for ipydatawidgets.
 """
 
+import asyncio
+from collections import OrderedDict
+import time
+
 from ipywidgets import Widget
-from traitlets import Unicode
+import numpy as np
+from traitlets import Float, Int, Unicode, observe
 
 from ._frontend import module_name, EXTENSION_SPEC_VERSION
+from .memory import _data_widgets, buffers_nbytes, check_memory_budget, value_nbytes
+from .transport import ack_measures_link, link_estimate, watch_kernel_activity
+
+
+def _buffer_nbytes(buffers):
+    return sum(memoryview(b).nbytes for b in buffers or ())
+
+
+def _is_compressed(msg):
+    return any(path and path[-1] == 'compressed_buffer'
+               for path in msg.get('buffer_paths', ()))
 
 
 class DataWidget(Widget):
     """An abstract widget class representing data.
+
+    Every message a data widget sends to the front-end is tagged with a
+    sequence number, which the front-end acknowledges once the message
+    has been applied. This gives producers a way to keep track of how
+    much data is still in flight (`pending_bytes`), and to either wait
+    for the front-end to catch up (`synced`) or drop updates while it
+    is `congested`. The front-end also reports how long it took to
+    apply each message, which is used to estimate the link to the
+    front-end (see `ipydatawidgets.transport`).
+
+    Messages are only tracked once a front-end has acknowledged one, so
+    nothing accumulates when no front-end is connected (e.g. when
+    running headless). With several front-ends, a message is pending
+    until all of them have acknowledged it. Front-ends that have not
+    acknowledged anything for `ack_timeout` seconds are no longer
+    waited for.
+
+    All data widgets are tracked for memory accounting, see
+    `ipydatawidgets.memory`.
     """
     _model_module = Unicode(module_name).tag(sync=True)
     _model_module_version = Unicode(EXTENSION_SPEC_VERSION).tag(sync=True)
+
+    max_in_flight = Int(None, allow_none=True,
+        help='The number of unacknowledged messages above which the widget '
+        'is considered congested. None means no limit.')
+
+    ack_timeout = Float(10.0,
+        help='The time in seconds after which a front-end that has not '
+        'acknowledged pending messages is no longer waited for.')
+
+    # The currently active message batch, if any (see `batched_sync`)
+    _active_batch = None
+
+    def __init__(self, **kwargs):
+        self._seq = 0
+        # The unacknowledged messages, by seq: their size, when they were
+        # sent if they can be timed, whether they were compressed, and when
+        # they were queued
+        self._pending = OrderedDict()
+        # The last acknowledged seq of each front-end, and when it was received
+        self._client_acks = {}
+        self._sync_waiters = []
+        super(DataWidget, self).__init__(**kwargs)
+        self.on_msg(self._handle_ack)
+        _data_widgets.add(self)
+        watch_kernel_activity()
+
+    @property
+    def pending_messages(self):
+        """The number of sent messages not yet acknowledged by the front-end."""
+        self._release_acked()
+        return len(self._pending)
+
+    @property
+    def pending_bytes(self):
+        """The size of the binary buffers not yet acknowledged by the front-end."""
+        self._release_acked()
+        return sum(entry[0] for entry in self._pending.values())
+
+    @property
+    def congested(self):
+        """Whether there are more messages in flight than `max_in_flight`."""
+        self._release_acked()
+        return self.max_in_flight is not None and len(self._pending) >= self.max_in_flight
+
+    async def synced(self, max_pending=0):
+        """Wait until the front-end has acknowledged the sent messages.
+
+        Note that acknowledgements are handled by the kernel between cell
+        executions, so this should be awaited from a background task
+        rather than directly in a cell.
+
+        Parameters
+        ----------
+        max_pending : int
+            Return once at most this many messages are unacknowledged.
+            E.g. a producer can use `max_in_flight - 1` to wait until
+            there is room for another message.
+        """
+        if self.pending_messages <= max_pending:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._sync_waiters.append((max_pending, future))
+        while not future.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.ack_timeout)
+            except asyncio.TimeoutError:
+                # Stop waiting for front-ends that no longer respond
+                self._release_acked()
+        await future
+
+    def _send(self, msg, buffers=None):
+        if self.comm is not None and 'seq' not in msg:
+            # Before the new message, which no front-end can have acknowledged
+            self._expire_clients()
+            self._seq += 1
+            msg['seq'] = self._seq
+            if self._client_acks:
+                # Batched messages are not timed, as they are sent later
+                queued = time.perf_counter()
+                sent = None if DataWidget._active_batch is not None else queued
+                self._pending[self._seq] = (
+                    _buffer_nbytes(buffers), sent, _is_compressed(msg), queued)
+        batch = DataWidget._active_batch
+        if batch is not None and self.comm is not None:
+            batch.add(self, msg, buffers)
+        else:
+            super(DataWidget, self)._send(msg, buffers)
+        check_memory_budget(self)
+
+    def _memory_usage(self):
+        """The bytes held by the widget, per category (see `memory_report`)."""
+        values = [self._trait_values.get(name, None) for name in self.trait_names()]
+        data = sum(value_nbytes(v) for v in values)
+        batched = 0
+        batch = DataWidget._active_batch
+        if batch is not None:
+            arrays = [v for v in values if isinstance(v, np.ndarray)]
+            batched = buffers_nbytes(batch.buffers_of(self), arrays)
+        return {'data': data, 'cache': 0, 'batched': batched}
+
+    def _evict_caches(self):
+        """Drop any data kept only to speed up later messages."""
+        pass
+
+    def _handle_ack(self, widget, content, buffers):
+        if content.get('method') != 'ack':
+            return
+        # Messages are applied in order, so an ack covers all earlier messages
+        seq = content['seq']
+        client = content.get('client')
+        now = time.perf_counter()
+        last_seq, _ = self._client_acks.get(client, (seq, None))
+        self._client_acks[client] = (max(seq, last_seq), now)
+        if 'decode_time' in content and seq in self._pending:
+            nbytes, sent, compressed, _ = self._pending[seq]
+            if sent is not None and ack_measures_link(sent, now):
+                # The front-end reports the size it received, and the time
+                # from receiving the message until it was applied
+                link_estimate.observe(content.get('nbytes', nbytes), now - sent,
+                                      content['decode_time'], compressed)
+        self._release_acked()
+
+    def _expire_clients(self):
+        """Stop waiting for front-ends that have not acknowledged a message
+        within `ack_timeout` of it being sent."""
+        now = time.perf_counter()
+        for client, (seq, received) in list(self._client_acks.items()):
+            if seq >= self._seq:
+                continue
+            # The oldest message the front-end has not acknowledged
+            oldest = self._pending.get(seq + 1)
+            waiting_since = oldest[3] if oldest is not None else received
+            if now - waiting_since > self.ack_timeout:
+                del self._client_acks[client]
+
+    def _release_acked(self):
+        """Drop the messages acknowledged by all front-ends."""
+        self._expire_clients()
+        if self._client_acks:
+            acked = min(seq for seq, _ in self._client_acks.values())
+        else:
+            # No front-end left to wait for
+            acked = self._seq
+        while self._pending:
+            first = next(iter(self._pending))
+            if first > acked:
+                break
+            del self._pending[first]
+        self._resolve_sync_waiters()
+
+    def _resolve_sync_waiters(self):
+        n_pending = len(self._pending)
+        waiting = []
+        for max_pending, future in self._sync_waiters:
+            if future.done():
+                continue
+            if n_pending <= max_pending:
+                future.set_result(None)
+            else:
+                waiting.append((max_pending, future))
+        self._sync_waiters = waiting
+
+    @observe('comm')
+    def _on_comm_change(self, change):
+        if change['new'] is None:
+            # Closed, nothing more will be acknowledged
+            self._pending.clear()
+            self._client_acks.clear()
+            self._resolve_sync_waiters()
@@ -0,0 +1,51 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  DataModel
+} from './base';
+
+import {
+  ISerializers, arrow_serialization, arrowColumnToArray
+} from 'jupyter-dataserializers';
+
+import type {
+  Table
+} from 'apache-arrow';
+
+import ndarray = require('ndarray');
+
+
+/**
+ * Model for an Apache Arrow table.
+ */
+export class ArrowTableModel extends DataModel {
+  defaults() {
+    return {...super.defaults(), ...{
+      _model_name: ArrowTableModel.model_name,
+      table: null,
+    }} as any;
+  }
+
+  /**
+   * Get a column of the table as an ndarray.
+   */
+  getNDArray(key?: string): ndarray.NdArray | null {
+    const table = this.get('table') as Table | null;
+    if (key === undefined || table === null) {
+      return null;
+    }
+    const array = arrowColumnToArray(table, key);
+    if (array === null) {
+      throw new Error(`Unknown table column: ${key}`);
+    }
+    return array;
+  }
+
+  static serializers: ISerializers = {
+    ...DataModel.serializers,
+    table: arrow_serialization,
+  };
+
+  static model_name = 'ArrowTableModel';
+}
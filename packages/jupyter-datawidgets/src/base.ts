@@ -2,13 +2,17 @@
 // Distributed under the terms of the Modified BSD License.
 
 import {
-  WidgetModel
+  IWidgetManager, WidgetModel, uuid
 } from '@jupyter-widgets/base';
 
 import {
   ISerializers, IDataSource
 } from 'jupyter-dataserializers';
 
+import {
+  resolveBufferRefs
+} from './embed';
+
 import {
   version
 } from './version';
@@ -16,6 +20,12 @@ import {
 import ndarray = require('ndarray');
 
 
+/**
+ * Identifies this front-end in acknowledgements, as the kernel waits
+ * for every connected front-end.
+ */
+const clientId = uuid();
+
 
 export
 abstract class DataModel extends WidgetModel implements IDataSource {
@@ -31,6 +41,51 @@ abstract class DataModel extends WidgetModel implements IDataSource {
 
   abstract getNDArray(key?: string): ndarray.NdArray | null;
 
+  /**
+   * Handle a comm message, and acknowledge it once it has been applied.
+   *
+   * The time from receiving the message until it has been applied, and
+   * the size of its buffers, are included in the acknowledgement, so the
+   * kernel can tune the transport to the link.
+   */
+  async _handle_comm_msg(msg: any): Promise<void> {
+    const start = performance.now();
+    await super._handle_comm_msg(msg);
+    // Also wait for any state changes queued by custom message handlers
+    await this.state_change;
+    const seq = msg.content.data.seq;
+    if (seq !== undefined) {
+      const nbytes = (msg.buffers || []).reduce(
+        (n: number, b: ArrayBuffer | ArrayBufferView) => n + b.byteLength, 0);
+      this.acknowledge(seq, (performance.now() - start) / 1000, nbytes);
+    }
+  }
+
+  /**
+   * Tell the kernel that all messages up to `seq` have been applied.
+   *
+   * @param decodeTime The time in seconds it took to apply message `seq`.
+   * @param nbytes The size of the buffers of message `seq`.
+   */
+  acknowledge(seq: number, decodeTime?: number, nbytes?: number): void {
+    const content: any = {method: 'ack', seq, client: clientId};
+    if (decodeTime !== undefined) {
+      content.decode_time = decodeTime;
+    }
+    if (nbytes !== undefined) {
+      content.nbytes = nbytes;
+    }
+    this.send(content, {});
+  }
+
+  /**
+   * Deserialize the state, loading any buffers referenced by a compact
+   * embedded state first (see `ipydatawidgets.embed`).
+   */
+  static async _deserialize_state(state: any, manager: IWidgetManager): Promise<any> {
+    return super._deserialize_state(await resolveBufferRefs(state), manager);
+  }
+
   static serializers: ISerializers = {
     ...WidgetModel.serializers,
   }
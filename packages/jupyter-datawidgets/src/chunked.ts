@@ -0,0 +1,138 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  DataModel
+} from './base';
+
+import {
+  ISerializers, IArrayLookup, typesToArray
+} from 'jupyter-dataserializers';
+
+import ndarray = require('ndarray');
+
+
+/**
+ * Copy the content of a chunk into the full array, at the given offset.
+ */
+function assignChunk(target: ndarray.NdArray, offset: number[], chunk: ndarray.NdArray) {
+  const view = target.lo(...offset).hi(...chunk.shape);
+  const n = chunk.shape.length;
+  const index = new Array<number>(n).fill(0);
+  for (let i = 0; i < chunk.size; ++i) {
+    view.set(...index, chunk.get(...index));
+    // Increment the multi-dimensional index, last dimension fastest
+    for (let d = n - 1; d >= 0; --d) {
+      if (++index[d] < chunk.shape[d]) {
+        break;
+      }
+      index[d] = 0;
+    }
+  }
+}
+
+
+/**
+ * Model for a chunked array, where chunks are computed by the kernel on request.
+ *
+ * Chunks are requested with `requestChunks`, and a 'chunk' event is
+ * triggered for each chunk as it arrives.
+ */
+export class ChunkedArrayModel extends DataModel {
+  defaults() {
+    return {...super.defaults(), ...{
+      _model_name: ChunkedArrayModel.model_name,
+      array_shape: [],
+      array_dtype: 'float32',
+      chunks: [],
+    }} as any;
+  }
+
+  initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+    this.on('msg:custom', this.onCustomMessage, this);
+  }
+
+  /**
+   * Ask the kernel to compute and send the given chunks.
+   *
+   * Chunks that have already been received are not requested again.
+   */
+  requestChunks(indices: number[][]): void {
+    const missing = indices.filter(index => !this._chunks.has(index.join(',')));
+    if (missing.length > 0) {
+      this.send({method: 'request_chunks', indices: missing}, {});
+    }
+  }
+
+  /**
+   * Get a chunk, if it has been received.
+   */
+  getChunk(index: number[]): ndarray.NdArray | null {
+    return this._chunks.get(index.join(',')) || null;
+  }
+
+  /**
+   * Get the offset of a chunk in the full array.
+   */
+  chunkOffset(index: number[]): number[] {
+    const chunks = this.get('chunks') as number[][];
+    return index.map((i, dim) => chunks[dim].slice(0, i).reduce((a, b) => a + b, 0));
+  }
+
+  /**
+   * Get the full array, with the content of all chunks received so far.
+   *
+   * Note: This allocates the full array, so for large arrays, prefer
+   * accessing the chunks individually.
+   */
+  getNDArray(key='array'): ndarray.NdArray | null {
+    if (key !== 'array') {
+      throw new Error(`Unknown array key: ${key}`);
+    }
+    if (this._full === null) {
+      const shape = this.get('array_shape') as number[];
+      const ctor = typesToArray[this.get('array_dtype') as keyof IArrayLookup];
+      this._full = ndarray(new ctor(shape.reduce((a, b) => a * b, 1)), shape);
+      this._chunks.forEach((chunk, key) => {
+        assignChunk(this._full!, this.chunkOffset(key.split(',').map(Number)), chunk);
+      });
+    }
+    return this._full;
+  }
+
+  /**
+   * Handle a custom message from the kernel.
+   */
+  protected onCustomMessage(content: any, buffers: DataView[]) {
+    if (content.method === 'chunk_data') {
+      const buffer = buffers[0];
+      const data = buffer.buffer.slice(buffer.byteOffset, buffer.byteOffset + buffer.byteLength);
+      const chunk = ndarray(
+        new typesToArray[content.dtype as keyof IArrayLookup](data),
+        content.shape
+      );
+      const index = content.index as number[];
+      this._chunks.set(index.join(','), chunk);
+      if (this._full !== null) {
+        assignChunk(this._full, this.chunkOffset(index), chunk);
+      }
+      this.trigger('chunk', index, chunk);
+      this.trigger('change', this, {});
+    } else if (content.method === 'invalidate_chunks') {
+      this._chunks.clear();
+      this._full = null;
+      this.trigger('invalidate', this);
+      this.trigger('change', this, {});
+    }
+  }
+
+  static serializers: ISerializers = {
+    ...DataModel.serializers,
+  };
+
+  static model_name = 'ChunkedArrayModel';
+
+  private _chunks = new Map<string, ndarray.NdArray>();
+  private _full: ndarray.NdArray | null = null;
+}
@@ -0,0 +1,233 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  IWidgetManager, WidgetModel, put_buffers
+} from '@jupyter-widgets/base';
+
+
+/**
+ * The key of buffer references in compact model states. A reference
+ * has the form `{datawidgets_ref: hash}`, and takes the place of the
+ * buffer in the state.
+ */
+const refKey = 'datawidgets_ref';
+
+/**
+ * A stored buffer, either inline as base64, or in a sidecar file.
+ */
+type StoredBuffer = {encoding: 'base64', data: string} | {url: string};
+
+/**
+ * A widget manager state in the compact embedding format
+ * (see `ipydatawidgets.embed`).
+ */
+export interface ICompactManagerState {
+  version_major: number;
+  version_minor: number;
+  state: {[model_id: string]: any};
+  datawidgets_buffers: {[hash: string]: StoredBuffer};
+}
+
+interface IBufferStore {
+  buffers: {[hash: string]: StoredBuffer};
+  baseUrl: string;
+}
+
+/**
+ * The stores that buffer references are resolved against.
+ */
+const stores: IBufferStore[] = [];
+
+/**
+ * The embedded widget states of the page that have been searched for stores.
+ */
+const searchedScripts: Element[] = [];
+
+/**
+ * The loaded buffers, by hash, so that shared buffers are only loaded once.
+ */
+const loaded: {[hash: string]: Promise<DataView>} = {};
+
+
+function base64ToBuffer(data: string): ArrayBuffer {
+  const binary = atob(data);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; ++i) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes.buffer;
+}
+
+function hexToBuffer(data: string): ArrayBuffer {
+  const bytes = new Uint8Array(data.length / 2);
+  for (let i = 0; i < bytes.length; ++i) {
+    bytes[i] = parseInt(data.substr(2 * i, 2), 16);
+  }
+  return bytes.buffer;
+}
+
+
+/**
+ * Find the store of a buffer.
+ *
+ * Pages embedding widgets with the standard HTML embed manager have
+ * their state in script tags, which are searched for the compact
+ * buffer stores as needed.
+ */
+function findStore(hash: string): IBufferStore | undefined {
+  let store = findRegisteredStore(hash);
+  if (store !== undefined || typeof document === 'undefined') {
+    return store;
+  }
+  const scripts = document.querySelectorAll(
+    'script[type="application/vnd.jupyter.widget-state+json"]');
+  for (let i = 0; i < scripts.length; ++i) {
+    const script = scripts[i];
+    if (searchedScripts.indexOf(script) !== -1) {
+      continue;
+    }
+    searchedScripts.push(script);
+    try {
+      const state = JSON.parse(script.textContent || '');
+      if (state.datawidgets_buffers) {
+        registerBuffers(state.datawidgets_buffers);
+      }
+    } catch (error) {
+      // Not for us to report, the embed manager will
+    }
+  }
+  return findRegisteredStore(hash);
+}
+
+function findRegisteredStore(hash: string): IBufferStore | undefined {
+  for (let store of stores) {
+    if (store.buffers[hash] !== undefined) {
+      return store;
+    }
+  }
+  return undefined;
+}
+
+
+/**
+ * Make the buffers of a compact manager state available to data widget models.
+ *
+ * @param buffers The `datawidgets_buffers` of the state
+ * @param baseUrl The URL that relative sidecar URLs are resolved against
+ */
+export function registerBuffers(
+  buffers: {[hash: string]: StoredBuffer},
+  baseUrl: string = document.baseURI
+): void {
+  stores.push({buffers, baseUrl});
+}
+
+
+/**
+ * Load a referenced buffer, decoding it, or fetching it from its sidecar file.
+ */
+function loadBuffer(hash: string): Promise<DataView> {
+  if (loaded[hash] === undefined) {
+    const store = findStore(hash);
+    if (store === undefined) {
+      return Promise.reject(new Error(`Missing embedded buffer: ${hash}`));
+    }
+    const stored = store.buffers[hash];
+    loaded[hash] = ('url' in stored ?
+      fetch(new URL(stored.url, store.baseUrl).href).then(response => {
+        if (!response.ok) {
+          throw new Error(`Could not load ${stored.url}: ${response.statusText}`);
+        }
+        return response.arrayBuffer();
+      }) :
+      Promise.resolve().then(() => base64ToBuffer(stored.data))
+    ).then(buffer => new DataView(buffer));
+  }
+  return loaded[hash];
+}
+
+
+function isPlainValue(value: any): boolean {
+  return value === null || typeof value !== 'object' ||
+    ArrayBuffer.isView(value) || value instanceof ArrayBuffer;
+}
+
+
+/**
+ * Replace the buffer references in a serialized model state by their buffers.
+ *
+ * Data widget models call this when they deserialize their state, so
+ * that buffers are only loaded when a model using them is created.
+ *
+ * @returns The state, or a promise resolving to it if it had references.
+ */
+export function resolveBufferRefs(state: any): any {
+  const pending: Promise<void>[] = [];
+  function visit(value: any): void {
+    for (let key of Object.keys(value)) {
+      const child = value[key];
+      if (isPlainValue(child)) {
+        continue;
+      }
+      const keys = Object.keys(child);
+      if (keys.length === 1 && keys[0] === refKey) {
+        pending.push(loadBuffer(child[refKey]).then(buffer => {
+          value[key] = buffer;
+        }));
+      } else {
+        visit(child);
+      }
+    }
+  }
+  if (!isPlainValue(state)) {
+    visit(state);
+  }
+  if (pending.length === 0) {
+    return state;
+  }
+  return Promise.all(pending).then(() => state);
+}
+
+
+/**
+ * Load a compact widget manager state into a widget manager.
+ *
+ * This is only needed for custom widget managers, as data widget models
+ * find the buffers of states embedded in the page themselves. Buffers
+ * are decoded, or fetched from their sidecar files, when a model
+ * referencing them is created. Buffers shared by several models are
+ * only loaded once.
+ *
+ * @param manager The widget manager to create the models in
+ * @param state The compact manager state
+ * @param baseUrl The URL that relative sidecar URLs are resolved against
+ *
+ * @returns A promise resolving to the created models.
+ */
+export function loadCompactState(
+  manager: IWidgetManager,
+  state: ICompactManagerState,
+  baseUrl: string = document.baseURI
+): Promise<WidgetModel[]> {
+  registerBuffers(state.datawidgets_buffers || {}, baseUrl);
+  // Models are registered as they are created, so references between
+  // models resolve regardless of the order they are deserialized in
+  return Promise.all(Object.keys(state.state).map(model_id => {
+    const model = state.state[model_id];
+    const modelState = {...model.state};
+    if (model.buffers) {
+      // Models of other packages keep standard buffers
+      put_buffers(modelState,
+        model.buffers.map((b: any) => b.path),
+        model.buffers.map((b: any) => new DataView(
+          b.encoding === 'hex' ? hexToBuffer(b.data) : base64ToBuffer(b.data))));
+    }
+    return manager.new_model({
+      model_name: model.model_name,
+      model_module: model.model_module,
+      model_module_version: model.model_module_version,
+      model_id,
+    }, modelState);
+  }));
+}
@@ -4,9 +4,33 @@ export {
 } from './ndarray';
 
 export {
-  DataImageModel, DataImageView
+  NDArrayTableModel
+} from './table';
+
+export {
+  ArrowTableModel
+} from './arrow';
+
+export {
+  ChunkedArrayModel
+} from './chunked';
+
+export {
+  IPointCloudNode, PointCloudModel, frustumPlanes
+} from './pointcloud';
+
+export {
+  DataImageModel, DataImageView, TiledDataImageModel, TiledDataImageView
 } from './media';
 
+export {
+  SyncBatchModel
+} from './sync';
+
+export {
+  ICompactManagerState, loadCompactState, registerBuffers, resolveBufferRefs
+} from './embed';
+
 export {
   version
 } from './version';
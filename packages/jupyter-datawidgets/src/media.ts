@@ -2,14 +2,18 @@
 // Distributed under the terms of the Modified BSD License.
 
 import {
-  DOMWidgetModel, DOMWidgetView
+  DOMWidgetModel, DOMWidgetView, IWidgetManager, WidgetModel
 } from '@jupyter-widgets/base';
 
 import {
-  ISerializers, data_union_serialization, getArray,
-  listenToUnion
+  ISerializers, IReceivedSerializedArray, DataUnion, JSONToUnion,
+  unionToJSON, getArray, listenToUnion, array_serialization, TypedArray
 } from 'jupyter-dataserializers';
 
+import {
+  resolveBufferRefs
+} from './embed';
+
 import {
   version
 } from './version';
@@ -17,6 +21,115 @@ import {
 import ndarray = require('ndarray');
 
 
+/**
+ * An image encoded by the kernel, to be decoded by the browser.
+ */
+export interface IEncodedImage {
+  format: 'png' | 'jpeg' | 'webp';
+  shape: number[];
+  data: Uint8Array;
+}
+
+/**
+ * The serialized representation of an encoded image.
+ */
+interface IReceivedEncodedImage {
+  format: 'png' | 'jpeg' | 'webp';
+  shape: number[];
+  buffer: DataView;
+}
+
+/**
+ * Whether the value is an encoded image.
+ */
+export function isEncodedImage(value: any): value is IEncodedImage {
+  return value && typeof value.format === 'string' && value.data instanceof Uint8Array;
+}
+
+/**
+ * Deserializes image data, which is either an encoded image, an array or a data widget.
+ */
+export async function JSONToImageUnion(
+  obj: IReceivedSerializedArray | IReceivedEncodedImage | string | null,
+  manager?: IWidgetManager
+): Promise<DataUnion | IEncodedImage | null> {
+  if (obj !== null && typeof obj === 'object' && 'format' in obj && obj.format as string !== 'raw') {
+    const view = obj.buffer;
+    return {
+      format: obj.format,
+      shape: obj.shape,
+      data: new Uint8Array(view.buffer, view.byteOffset, view.byteLength),
+    };
+  }
+  return JSONToUnion(obj as IReceivedSerializedArray | string | null, manager);
+}
+
+/**
+ * Serializes image data. Encoded images are passed back with their encoding.
+ */
+export function imageUnionToJSON(obj: DataUnion | IEncodedImage | null, widget?: WidgetModel) {
+  if (isEncodedImage(obj)) {
+    return { format: obj.format, shape: obj.shape, buffer: obj.data };
+  }
+  return unionToJSON(obj, widget);
+}
+
+export const image_union_serialization = {
+  deserialize: JSONToImageUnion,
+  serialize: imageUnionToJSON
+};
+
+
+/**
+ * The default value range of scalar image data, by dtype.
+ */
+const defaultValueRanges: {[dtype: string]: [number, number]} = {
+  uint8: [0, 255],
+  uint16: [0, 65535],
+};
+
+/**
+ * Map scalar image data to RGBA colors, using a colormap lookup table.
+ *
+ * @param data The scalar data, with shape (height, width)
+ * @param colormap The RGBA lookup table, with shape (n, 4), or null for grayscale
+ * @param valueRange The values mapped to the ends of the colormap, or null
+ *   for the full range of the dtype
+ *
+ * @returns The RGBA pixel data.
+ */
+export function applyColormap(
+  data: ndarray.NdArray,
+  colormap: ndarray.NdArray | null,
+  valueRange: [number, number] | null
+): Uint8ClampedArray {
+  const [lo, hi] = valueRange || defaultValueRanges[data.dtype] || [0, 1];
+  const values = data.data as TypedArray;
+  const out = new Uint8ClampedArray(4 * values.length);
+  const lut = colormap === null ? null : colormap.data as Uint8Array;
+  const n = lut === null ? 256 : lut.length / 4;
+  const scale = hi > lo ? (n - 1) / (hi - lo) : 0;
+  for (let i = 0; i < values.length; ++i) {
+    const v = values[i];
+    // NaN values are left transparent
+    if (v !== v) {
+      continue;
+    }
+    const idx = Math.min(n - 1, Math.max(0, Math.round((v - lo) * scale)));
+    if (lut === null) {
+      out[4 * i] = out[4 * i + 1] = out[4 * i + 2] = idx;
+      out[4 * i + 3] = 255;
+    } else {
+      out[4 * i] = lut[4 * idx];
+      out[4 * i + 1] = lut[4 * idx + 1];
+      out[4 * i + 2] = lut[4 * idx + 2];
+      out[4 * i + 3] = lut[4 * idx + 3];
+    }
+  }
+  return out;
+}
+
+
 /**
  * Model for the the data widgets based image widget.
  */
@@ -32,12 +145,23 @@ export class DataImageModel extends DOMWidgetModel {
       _view_module_version: DataImageModel.view_module_version,
 
       data: ndarray([]),
+      colormap: null,
+      value_range: null,
     }};
   }
 
+  /**
+   * Deserialize the state, loading any buffers referenced by a compact
+   * embedded state first (see `ipydatawidgets.embed`).
+   */
+  static async _deserialize_state(state: any, manager: IWidgetManager): Promise<any> {
+    return super._deserialize_state(await resolveBufferRefs(state), manager);
+  }
+
   static serializers: ISerializers = {
     ...DOMWidgetModel.serializers,
-    data: data_union_serialization,
+    data: image_union_serialization,
+    colormap: array_serialization,
   };
 
   static model_name = 'DataImageModel';
@@ -57,6 +181,7 @@ export class DataImageView extends DOMWidgetView {
   initialize(parameters: any) {
     super.initialize(parameters);
     listenToUnion(this.model, 'data', this.update.bind(this), true);
+    this.listenTo(this.model, 'change:colormap change:value_range', this.update);
   }
 
   /**
@@ -77,32 +202,52 @@ export class DataImageView extends DOMWidgetView {
    */
   update() {
 
-    let data = getArray(this.model.get('data'));
+    const value = this.model.get('data');
     let url;
 
+    if (this.objectURL !== null) {
+      URL.revokeObjectURL(this.objectURL);
+      this.objectURL = null;
+    }
+
+    if (isEncodedImage(value)) {
+      // Let the browser decode the image natively
+      const blob = new Blob([value.data], {type: `image/${value.format}`});
+      this.objectURL = url = URL.createObjectURL(blob);
+      this.el.setAttribute('width', `${value.shape[1]}`);
+      this.el.setAttribute('height', `${value.shape[0]}`);
+      this.el.src = url;
+      return super.update();
+    }
+
+    let data = getArray(value);
+
     if (data === null || data.data.length === 0) {
       url = '';
       this.el.setAttribute('width', '0');
       this.el.setAttribute('height', '0');
     } else {
-      if (data.shape.length !== 3 || data.shape[2] !== 4) {
+      const scalar = data.shape.length === 2;
+      if (!scalar && (data.shape.length !== 3 || data.shape[2] !== 4)) {
         throw new Error(`DataImage data has invalid shape: ${JSON.stringify(data.shape)}`);
       }
       if (this.canvas === null) {
         this.canvas = document.createElement('canvas');
       }
 
-      this.el.setAttribute('width', `${data.shape[0]}`);
-      this.el.setAttribute('height', `${data.shape[1]}`);
-      this.canvas.setAttribute('width', `${data.shape[0]}`);
-      this.canvas.setAttribute('height', `${data.shape[1]}`);
+      // The data has the shape (height, width[, 4])
+      const width = data.shape[1];
+      const height = data.shape[0];
+      this.el.setAttribute('width', `${width}`);
+      this.el.setAttribute('height', `${height}`);
+      this.canvas.setAttribute('width', `${width}`);
+      this.canvas.setAttribute('height', `${height}`);
 
       const ctx = this.canvas.getContext('2d')!;
-      const imageData = new ImageData(
-        new Uint8ClampedArray(data.data as Uint8Array),
-        data.shape[0],
-        data.shape[1]
-      );
+      const pixels = scalar ?
+        applyColormap(data, this.model.get('colormap'), this.model.get('value_range')) :
+        new Uint8ClampedArray(data.data as Uint8Array);
+      const imageData = new ImageData(pixels, width, height);
       ctx.putImageData(imageData, 0, 0);
       url = this.canvas.toDataURL();
     }
@@ -116,6 +261,10 @@ export class DataImageView extends DOMWidgetView {
     if (this.canvas !== null) {
       this.canvas = null;
     }
+    if (this.objectURL !== null) {
+      URL.revokeObjectURL(this.objectURL);
+      this.objectURL = null;
+    }
     super.remove();
   }
 
@@ -144,4 +293,210 @@ export class DataImageView extends DOMWidgetView {
 
   el: HTMLImageElement;
   canvas: HTMLCanvasElement | null = null;
-}
\ No newline at end of file
+  objectURL: string | null = null;
+}
+
+/**
+ * Model for the tiled image widget.
+ *
+ * Tiles are requested from the kernel with `requestTiles`, and decoded
+ * to bitmaps as they arrive. A 'tile' event is triggered for each
+ * decoded tile, and an 'invalidate' event when all tiles are discarded.
+ */
+export class TiledDataImageModel extends DOMWidgetModel {
+
+  defaults() {
+    return {...super.defaults(), ...{
+      _model_name: TiledDataImageModel.model_name,
+      _model_module_version: TiledDataImageModel.model_module_version,
+      _model_module: TiledDataImageModel.model_module,
+      _view_name: TiledDataImageModel.view_name,
+      _view_module: TiledDataImageModel.view_module,
+      _view_module_version: TiledDataImageModel.view_module_version,
+
+      image_shape: [0, 0],
+      tile_size: 256,
+    }};
+  }
+
+  initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+    this.on('msg:custom', this.onCustomMessage, this);
+  }
+
+  /**
+   * Request tiles that have not already been received or requested.
+   */
+  requestTiles(tiles: [number, number][]): void {
+    const missing = tiles.filter(tile => {
+      const key = tile.join(',');
+      return !this.tiles.has(key) && !this._pending.has(key);
+    });
+    if (missing.length > 0) {
+      for (let tile of missing) {
+        this._pending.add(tile.join(','));
+      }
+      this.send({method: 'request_tiles', tiles: missing}, {});
+    }
+  }
+
+  /**
+   * Handle a custom message from the kernel.
+   */
+  protected onCustomMessage(content: any, buffers: DataView[]) {
+    if (content.method === 'tile_data') {
+      const key = (content.tile as number[]).join(',');
+      const generation = this._generation;
+      this.decodeTile(content, buffers[0]).then(bitmap => {
+        if (generation !== this._generation) {
+          // Tiles were invalidated while decoding
+          bitmap.close();
+          return;
+        }
+        const previous = this.tiles.get(key);
+        if (previous !== undefined) {
+          previous.close();
+        }
+        this.tiles.set(key, bitmap);
+        this._pending.delete(key);
+        this.trigger('tile', content.tile);
+      });
+    } else if (content.method === 'invalidate_tiles') {
+      this._generation += 1;
+      this.tiles.forEach(bitmap => bitmap.close());
+      this.tiles.clear();
+      this._pending.clear();
+      this.trigger('invalidate', this);
+    }
+  }
+
+  /**
+   * Decode tile data to a bitmap, off the main thread where supported.
+   */
+  protected decodeTile(content: any, buffer: DataView): Promise<ImageBitmap> {
+    const [height, width] = content.shape as number[];
+    if (content.format === 'raw') {
+      const pixels = new Uint8ClampedArray(buffer.buffer, buffer.byteOffset, buffer.byteLength);
+      return createImageBitmap(new ImageData(pixels.slice(), width, height));
+    }
+    const blob = new Blob([buffer], {type: `image/${content.format}`});
+    return createImageBitmap(blob);
+  }
+
+  static serializers: ISerializers = {
+    ...DOMWidgetModel.serializers,
+  };
+
+  static model_name = 'TiledDataImageModel';
+  static model_module = 'jupyter-datawidgets';
+  static model_module_version = version;
+  static view_name = 'TiledDataImageView';
+  static view_module = 'jupyter-datawidgets';
+  static view_module_version = version;
+
+  tiles = new Map<string, ImageBitmap>();
+  private _pending = new Set<string>();
+  private _generation = 0;
+}
+
+
+/**
+ * View for the tiled image widget.
+ *
+ * The view is a scrollable viewport onto the image, and only requests
+ * and draws the tiles that intersect the visible area.
+ */
+export class TiledDataImageView extends DOMWidgetView {
+  render() {
+    super.render();
+    this.pWidget.addClass('jupyter-widgets');
+    this.pWidget.addClass('widget-image');
+    this.el.style.overflow = 'auto';
+    this.el.style.position = 'relative';
+
+    // A spacer gives the scroll area the size of the full image, while
+    // the canvas only covers the visible part
+    this.spacer = document.createElement('div');
+    this.canvas = document.createElement('canvas');
+    this.canvas.style.position = 'sticky';
+    this.canvas.style.top = '0';
+    this.canvas.style.left = '0';
+    this.canvas.style.display = 'block';
+    this.el.appendChild(this.canvas);
+    this.el.appendChild(this.spacer);
+
+    this.el.addEventListener('scroll', this.scheduleDraw.bind(this));
+    this.listenTo(this.model, 'tile', this.scheduleDraw);
+    this.listenTo(this.model, 'invalidate change:image_shape change:tile_size', this.update);
+    this.update();
+  }
+
+  update() {
+    const [height, width] = this.model.get('image_shape') as [number, number];
+    this.spacer.style.width = `${width}px`;
+    this.spacer.style.height = `${height}px`;
+    this.scheduleDraw();
+    return super.update();
+  }
+
+  /**
+   * Draw on the next animation frame, coalescing several requests.
+   */
+  scheduleDraw() {
+    if (this._frame === null) {
+      this._frame = requestAnimationFrame(() => {
+        this._frame = null;
+        this.draw();
+      });
+    }
+  }
+
+  /**
+   * Draw the visible tiles, and request any that are missing.
+   */
+  draw() {
+    const model = this.model as TiledDataImageModel;
+    const [height, width] = model.get('image_shape') as [number, number];
+    const size = model.get('tile_size') as number;
+    const viewWidth = Math.min(this.el.clientWidth || width, width);
+    const viewHeight = Math.min(this.el.clientHeight || height, height);
+    const left = this.el.scrollLeft;
+    const top = this.el.scrollTop;
+
+    if (this.canvas.width !== viewWidth || this.canvas.height !== viewHeight) {
+      this.canvas.width = viewWidth;
+      this.canvas.height = viewHeight;
+      // Keep the spacer from adding to the scroll height of the canvas
+      this.spacer.style.marginTop = `${-viewHeight}px`;
+    }
+    const ctx = this.canvas.getContext('2d')!;
+    ctx.clearRect(0, 0, viewWidth, viewHeight);
+
+    const missing: [number, number][] = [];
+    const rowEnd = Math.min(Math.ceil((top + viewHeight) / size), Math.ceil(height / size));
+    const colEnd = Math.min(Math.ceil((left + viewWidth) / size), Math.ceil(width / size));
+    for (let row = Math.floor(top / size); row < rowEnd; ++row) {
+      for (let col = Math.floor(left / size); col < colEnd; ++col) {
+        const bitmap = model.tiles.get(`${row},${col}`);
+        if (bitmap === undefined) {
+          missing.push([row, col]);
+        } else {
+          ctx.drawImage(bitmap, col * size - left, row * size - top);
+        }
+      }
+    }
+    model.requestTiles(missing);
+  }
+
+  remove() {
+    if (this._frame !== null) {
+      cancelAnimationFrame(this._frame);
+      this._frame = null;
+    }
+    super.remove();
+  }
+
+  canvas: HTMLCanvasElement;
+  spacer: HTMLDivElement;
+  private _frame: number | null = null;
+}
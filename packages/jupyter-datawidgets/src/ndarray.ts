@@ -6,7 +6,7 @@ import {
 } from './base';
 
 import {
-  ISerializers, IDataWriteBack, compressed_array_serialization
+  ISerializers, IDataWriteBack, TypedArray, async_compressed_array_serialization
 } from 'jupyter-dataserializers';
 
 import ndarray = require('ndarray');
@@ -26,18 +26,181 @@ export class NDArrayBaseModel extends DataModel {
 
   static serializers: ISerializers = {
     ...DataModel.serializers,
-    array: compressed_array_serialization,
+    array: async_compressed_array_serialization,
   };
 }
 
 
+/**
+ * Serialization of arrays, that also accepts shared memory handles.
+ *
+ * With `transport='shared_memory'`, the kernel only sends a handle to a
+ * shared memory block, which browsers can not attach to. Such arrays
+ * are replaced by an empty array, with a warning.
+ */
+export const shared_array_serialization = {
+  ...async_compressed_array_serialization,
+  deserialize(value: any, manager?: any): any {
+    if (value && value.shared_memory !== undefined) {
+      console.warn(`Array in shared memory block ${value.shared_memory} ` +
+        'can not be displayed, as it is only available to processes on the kernel host.');
+      return ndarray([]);
+    }
+    return async_compressed_array_serialization.deserialize(value, manager);
+  },
+};
+
+
+/**
+ * Copy a buffer into a flat segment of an array, in-place.
+ *
+ * @param array The array to write into
+ * @param start The index of the first element of the segment
+ * @param buffer The raw segment data, with the same dtype as the array
+ */
+export function writeSegment(array: ndarray.NdArray, start: number, buffer: DataView): void {
+  const data = array.data as TypedArray;
+  const offset = data.byteOffset + start * data.BYTES_PER_ELEMENT;
+  if (offset + buffer.byteLength > data.byteOffset + data.byteLength) {
+    throw new Error('Array segment update out of bounds.');
+  }
+  // Copy bytewise to avoid any alignment constraints on the incoming buffer
+  const target = new Uint8Array(data.buffer, offset, buffer.byteLength);
+  target.set(new Uint8Array(buffer.buffer, buffer.byteOffset, buffer.byteLength));
+}
+
+
+/**
+ * Summary statistics of an array, as computed by the kernel.
+ *
+ * Non-finite values are excluded from all but the NaN count.
+ */
+export interface IArrayStatistics {
+  min: number | null;
+  max: number | null;
+  mean: number | null;
+  nan_count: number;
+  histogram: number[];
+  bin_edges: number[];
+}
+
+
 export class NDArrayModel extends NDArrayBaseModel implements IDataWriteBack {
   defaults() {
     return {...super.defaults(), ...{
       _model_name: NDArrayModel.model_name,
+      statistics: {},
+      array_version: 0,
     }} as any;
   }
 
+  /**
+   * Get the statistics of the array, if the kernel computes them.
+   *
+   * This avoids a full pass over the data for e.g. normalization.
+   */
+  getStatistics(): IArrayStatistics | null {
+    const statistics = this.get('statistics');
+    return statistics && statistics.nan_count !== undefined ? statistics : null;
+  }
+
+  initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+    this.on('msg:custom', this.onCustomMessage, this);
+    // Messages sent while disconnected are lost, so resync on reconnect
+    const kernel = this.comm && (this.comm as any).kernel;
+    if (kernel && kernel.connectionStatusChanged) {
+      kernel.connectionStatusChanged.connect((sender: any, status: string) => {
+        if (status === 'connected') {
+          this.resync();
+        }
+      });
+    }
+  }
+
+  set_state(state: any): void {
+    super.set_state(state);
+    if (state.array !== undefined) {
+      // A full array brings us up to date, even if the version is unchanged
+      this._resyncing = false;
+    }
+  }
+
+  /**
+   * Ask the kernel for the changes to the array since the version we have.
+   *
+   * The kernel sends the changed segments, or the full array if it no
+   * longer knows what changed since then.
+   */
+  resync(): void {
+    if (this._resyncing) {
+      return;
+    }
+    this._resyncing = true;
+    this.send({method: 'resync', name: 'array', version: this.get('array_version')}, {});
+  }
+
+  /**
+   * Handle a custom message from the kernel.
+   */
+  protected onCustomMessage(content: any, buffers: DataView[]) {
+    if (content.method === 'update_array_segment') {
+      // Full array updates might still be deserializing, so wait for
+      // them to be applied before applying the segments
+      this.state_change = this.state_change.then(() => {
+        const current = this.get('array_version');
+        if (content.resync) {
+          // A resync reply, possibly requested by another front-end
+          this._resyncing = false;
+        }
+        if (content.version !== undefined && content.version <= current) {
+          // Already up to date, e.g. a resync reply for another front-end
+          return;
+        }
+        const array = this.get(content.name) as ndarray.NdArray;
+        const starts = content.starts as number[];
+        for (let i = 0; i < starts.length; ++i) {
+          writeSegment(array, starts[i], buffers[i]);
+        }
+        if (content.version !== undefined) {
+          if (content.base_version <= current) {
+            // The segments cover all changes since base_version
+            this.set('array_version', content.version);
+          } else {
+            // An update was missed. Keep our version, so the resync
+            // includes everything since then.
+            this.resync();
+          }
+        }
+        // The array is updated in-place, so trigger the change manually
+        this.trigger(`change:${content.name}`, this, array, {});
+        this.trigger('change', this, {});
+      });
+    }
+  }
+
+  /**
+   * Upload modified segments of the array to the kernel.
+   *
+   * The kernel applies the segments in-place, which avoids sending
+   * and comparing the full array for small, local modifications.
+   *
+   * @param segments The modified (start, stop) ranges of the flattened array
+   */
+  uploadSegments(segments: [number, number][], key='array'): void {
+    const array = this.get(key) as ndarray.NdArray;
+    const data = array.data as TypedArray;
+    const starts: number[] = [];
+    const buffers: ArrayBuffer[] = [];
+    for (let [start, stop] of segments) {
+      starts.push(start);
+      // Copy, as buffers are transferred when sent
+      buffers.push(data.slice(start, stop).buffer as ArrayBuffer);
+    }
+    const dtype = array.dtype === 'uint8_clamped' ? 'uint8' : array.dtype;
+    this.send({method: 'upload_array_segment', name: key, starts, dtype}, {}, buffers);
+  }
+
   canWriteBack(key='array'): boolean {
     return key === 'array';
   }
@@ -48,7 +211,10 @@ export class NDArrayModel extends NDArrayBaseModel implements IDataWriteBack {
 
   static serializers: ISerializers = {
     ...NDArrayBaseModel.serializers,
+    array: shared_array_serialization,
   };
 
   static model_name = 'NDArrayModel';
+
+  private _resyncing = false;
 }
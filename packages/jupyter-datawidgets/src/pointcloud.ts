@@ -0,0 +1,152 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  DataModel
+} from './base';
+
+import {
+  ISerializers, array_serialization
+} from 'jupyter-dataserializers';
+
+import ndarray = require('ndarray');
+
+
+/**
+ * The points of an octree node.
+ */
+export interface IPointCloudNode {
+  /**
+   * The positions of the points, as consecutive (x, y, z) triplets.
+   */
+  positions: Float32Array;
+
+  /**
+   * The RGBA colors of the points, if the point cloud has colors.
+   */
+  colors: Uint8Array | null;
+}
+
+
+/**
+ * Get the planes of a view frustum from a column-major view-projection
+ * matrix (e.g. `camera.projectionMatrix * camera.matrixWorldInverse` in
+ * three.js), as rows of [a, b, c, d], where a point is inside if
+ * a*x + b*y + c*z + d >= 0 for all planes.
+ */
+export function frustumPlanes(m: ArrayLike<number>): number[][] {
+  const row = (i: number) => [m[i], m[i + 4], m[i + 8], m[i + 12]];
+  const [r0, r1, r2, r3] = [row(0), row(1), row(2), row(3)];
+  const add = (a: number[], b: number[], sign: number) => a.map((v, i) => v + sign * b[i]);
+  return [
+    add(r3, r0, 1), add(r3, r0, -1),
+    add(r3, r1, 1), add(r3, r1, -1),
+    add(r3, r2, 1), add(r3, r2, -1),
+  ];
+}
+
+
+/**
+ * Model for a point cloud, streamed by the kernel according to the view.
+ *
+ * Call `updateView` when the camera changes. The kernel then sends the
+ * list of nodes to show, which triggers a 'visible' event, followed by
+ * the data of the nodes not yet received, each triggering a 'node' event.
+ */
+export class PointCloudModel extends DataModel {
+  defaults() {
+    return {...super.defaults(), ...{
+      _model_name: PointCloudModel.model_name,
+      point_budget: 1000000,
+      num_points: 0,
+      origin: [0, 0, 0],
+      size: 1,
+      nodes: null,
+    }} as any;
+  }
+
+  initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+    this.on('msg:custom', this.onCustomMessage, this);
+  }
+
+  /**
+   * Send the current view to the kernel.
+   *
+   * @param planes The frustum planes, see `frustumPlanes`.
+   * @param cameraPosition The camera position, used to refine nearby nodes first.
+   */
+  updateView(planes: number[][], cameraPosition?: number[]): void {
+    this.send({
+      method: 'update_view',
+      planes,
+      camera_position: cameraPosition === undefined ? null : cameraPosition,
+    }, {});
+  }
+
+  /**
+   * The nodes to show for the last view.
+   */
+  get visibleNodes(): number[] {
+    return this._visible;
+  }
+
+  /**
+   * Get the points of a node, if it has been received.
+   */
+  getNode(index: number): IPointCloudNode | null {
+    return this._nodes.get(index) || null;
+  }
+
+  /**
+   * Get the positions of the points of the visible nodes received so far.
+   */
+  getNDArray(key='positions'): ndarray.NdArray | null {
+    if (key !== 'positions') {
+      throw new Error(`Unknown array key: ${key}`);
+    }
+    const loaded = this._visible.map(i => this._nodes.get(i)).filter(n => n !== undefined);
+    const size = loaded.reduce((n, node) => n + node!.positions.length, 0);
+    const data = new Float32Array(size);
+    let offset = 0;
+    for (let node of loaded) {
+      data.set(node!.positions, offset);
+      offset += node!.positions.length;
+    }
+    return ndarray(data, [size / 3, 3]);
+  }
+
+  /**
+   * Handle a custom message from the kernel.
+   */
+  protected onCustomMessage(content: any, buffers: DataView[]) {
+    if (content.method === 'node_data') {
+      const copy = (b: DataView) => b.buffer.slice(b.byteOffset, b.byteOffset + b.byteLength);
+      this._nodes.set(content.node, {
+        positions: new Float32Array(copy(buffers[0])),
+        colors: content.colors ? new Uint8Array(copy(buffers[1])) : null,
+      });
+      this.trigger('node', content.node);
+      this.trigger('change', this, {});
+    } else if (content.method === 'visible_nodes') {
+      this._visible = content.nodes;
+      this.trigger('visible', this._visible);
+      this.trigger('change', this, {});
+    } else if (content.method === 'invalidate_nodes') {
+      this._nodes.clear();
+      this._visible = [];
+      this.trigger('invalidate', this);
+      this.trigger('change', this, {});
+    }
+  }
+
+  static serializers: ISerializers = {
+    ...DataModel.serializers,
+    nodes: array_serialization,
+  };
+
+  static model_name = 'PointCloudModel';
+
+  private _nodes = new Map<number, IPointCloudNode>();
+  private _visible: number[] = [];
+}
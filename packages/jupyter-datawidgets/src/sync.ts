@@ -0,0 +1,110 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  WidgetModel, put_buffers
+} from '@jupyter-widgets/base';
+
+import {
+  DataModel
+} from './base';
+
+import {
+  ISerializers
+} from 'jupyter-dataserializers';
+
+import ndarray = require('ndarray');
+
+
+/**
+ * A single update in a batch message.
+ */
+interface IBatchEntry {
+  model_id: string;
+  msg: any;
+  n_buffers: number;
+}
+
+
+/**
+ * Model that applies batches of updates to other data widgets.
+ *
+ * All updates in a batch are deserialized first, and then applied
+ * together synchronously, so that no view renders a partial batch.
+ */
+export class SyncBatchModel extends DataModel {
+  defaults() {
+    return {...super.defaults(), ...{
+      _model_name: SyncBatchModel.model_name,
+    }} as any;
+  }
+
+  initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+    this.on('msg:custom', this.onCustomMessage, this);
+  }
+
+  getNDArray(key?: string): ndarray.NdArray | null {
+    return null;
+  }
+
+  /**
+   * Handle a custom message from the kernel.
+   */
+  protected onCustomMessage(content: any, buffers: DataView[]) {
+    if (content.method === 'batch_update') {
+      // Chain on state_change, so the batch message is only acknowledged
+      // once all its updates have been applied
+      this.state_change = this.state_change.then(
+        () => this.applyBatch(content.updates, buffers)
+      ).catch(reason => {
+        console.error('Could not apply batch update', reason);
+      });
+    }
+  }
+
+  /**
+   * Apply a batch of updates atomically.
+   */
+  async applyBatch(entries: IBatchEntry[], buffers: DataView[]): Promise<void> {
+    const manager = this.widget_manager;
+    let offset = 0;
+    const pending = entries.map(entry => {
+      const entryBuffers = buffers.slice(offset, offset + entry.n_buffers);
+      offset += entry.n_buffers;
+      return this.prepareUpdate(entry, entryBuffers);
+    });
+    const updates = await Promise.all(pending);
+    // Apply all updates synchronously, so no rendering can happen in between
+    for (let apply of updates) {
+      apply();
+    }
+  }
+
+  /**
+   * Deserialize a single update, returning a function to apply it.
+   */
+  protected async prepareUpdate(entry: IBatchEntry, buffers: DataView[]): Promise<() => void> {
+    const model = await this.widget_manager.get_model(entry.model_id);
+    const msg = entry.msg;
+    const acknowledge = () => {
+      if (msg.seq !== undefined && model instanceof DataModel) {
+        model.acknowledge(msg.seq);
+      }
+    };
+    if (msg.method === 'update') {
+      put_buffers(msg.state, msg.buffer_paths || [], buffers);
+      const state = await (model.constructor as typeof WidgetModel)._deserialize_state(
+        msg.state, this.widget_manager);
+      return () => { model.set_state(state); acknowledge(); };
+    }
+    // Custom messages are forwarded, as if they were sent directly
+    return () => { model.trigger('msg:custom', msg.content, buffers); acknowledge(); };
+  }
+
+  static serializers: ISerializers = {
+    ...DataModel.serializers,
+  };
+
+  static model_name = 'SyncBatchModel';
+}
@@ -0,0 +1,68 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  DataModel
+} from './base';
+
+import {
+  ISerializers, ITable, table_serialization, writeRows
+} from 'jupyter-dataserializers';
+
+import ndarray = require('ndarray');
+
+
+/**
+ * Model for a table of named columns sharing the same number of rows.
+ */
+export class NDArrayTableModel extends DataModel {
+  defaults() {
+    return {...super.defaults(), ...{
+      _model_name: NDArrayTableModel.model_name,
+      columns: {},
+      compression_level: 0,
+    }} as any;
+  }
+
+  initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+    this.on('msg:custom', this.onCustomMessage, this);
+  }
+
+  /**
+   * Get a column of the table.
+   */
+  getNDArray(key?: string): ndarray.NdArray | null {
+    if (key === undefined) {
+      return null;
+    }
+    const columns = this.get('columns') as ITable;
+    if (!(key in columns)) {
+      throw new Error(`Unknown table column: ${key}`);
+    }
+    return columns[key];
+  }
+
+  /**
+   * Handle a custom message from the kernel.
+   */
+  protected onCustomMessage(content: any, buffers: DataView[]) {
+    if (content.method === 'update_table_rows') {
+      const columns = this.get('columns') as ITable;
+      const names = content.columns as string[];
+      for (let i = 0; i < names.length; ++i) {
+        writeRows(columns[names[i]], content.start, buffers[i]);
+      }
+      // The columns are updated in-place, so trigger the change manually
+      this.trigger('change:columns', this, columns, {});
+      this.trigger('change', this, {});
+    }
+  }
+
+  static serializers: ISerializers = {
+    ...DataModel.serializers,
+    columns: table_serialization,
+  };
+
+  static model_name = 'NDArrayTableModel';
+}
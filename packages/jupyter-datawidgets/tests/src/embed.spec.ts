@@ -0,0 +1,62 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import expect = require('expect.js');
+
+import {
+  registerBuffers, resolveBufferRefs
+} from '../../src/'
+
+
+describe('embed', () => {
+
+  describe('resolveBufferRefs', () => {
+
+    it('should leave states without references as they are', () => {
+      const state = {array: {shape: [2], dtype: 'uint8', buffer: new DataView(new ArrayBuffer(2))}};
+      expect(resolveBufferRefs(state)).to.be(state);
+    });
+
+    it('should resolve references to registered buffers', async () => {
+      // [1, 2, 3] as base64
+      registerBuffers({'registered': {encoding: 'base64', data: 'AQID'}});
+      const state: any = await resolveBufferRefs({
+        columns: {x: {shape: [3], dtype: 'uint8', buffer: {datawidgets_ref: 'registered'}}},
+      });
+      const buffer = state.columns.x.buffer;
+      expect(buffer).to.be.a(DataView);
+      expect(Array.from(new Uint8Array(buffer.buffer))).to.eql([1, 2, 3]);
+    });
+
+    it('should find buffers in the widget state of the page', async () => {
+      const script = document.createElement('script');
+      script.type = 'application/vnd.jupyter.widget-state+json';
+      script.textContent = JSON.stringify({
+        version_major: 2,
+        version_minor: 0,
+        state: {},
+        datawidgets_buffers: {'embedded': {encoding: 'base64', data: 'BAU='}},
+      });
+      document.body.appendChild(script);
+      try {
+        const state: any = await resolveBufferRefs({array: {buffer: {datawidgets_ref: 'embedded'}}});
+        expect(Array.from(new Uint8Array(state.array.buffer.buffer))).to.eql([4, 5]);
+      } finally {
+        document.body.removeChild(script);
+      }
+    });
+
+    it('should reject missing buffers', async () => {
+      let error: any = null;
+      try {
+        await resolveBufferRefs({array: {buffer: {datawidgets_ref: 'missing'}}});
+      } catch (e) {
+        error = e;
+      }
+      expect(error).to.be.an(Error);
+      expect(error.message).to.contain('missing');
+    });
+
+  });
+
+});
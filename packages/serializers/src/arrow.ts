@@ -0,0 +1,132 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  WidgetModel, IWidgetManager
+} from '@jupyter-widgets/base';
+
+import type {
+  Table
+} from 'apache-arrow';
+
+import {
+  TypedArray
+} from './ndarray';
+
+import ndarray = require('ndarray');
+
+
+type ArrowModule = typeof import('apache-arrow');
+
+let arrowModule: ArrowModule | null = null;
+
+
+/**
+ * Load apache-arrow, which is an optional dependency.
+ *
+ * It is only loaded once the first Arrow table is received, so that
+ * front-ends not using Arrow do not pay for it.
+ */
+export
+async function loadArrow(): Promise<ArrowModule> {
+  if (arrowModule === null) {
+    try {
+      arrowModule = await import('apache-arrow');
+    } catch (e) {
+      throw new Error(`The apache-arrow package is needed to deserialize Arrow tables: ${e}`);
+    }
+  }
+  return arrowModule;
+}
+
+
+/**
+ * The serialized representation of a received Arrow table
+ */
+export
+interface IReceivedSerializedArrow {
+  format: 'arrow-ipc';
+  buffer: DataView;
+}
+
+/**
+ * The serialized representation of an Arrow table for sending
+ */
+export
+interface ISendSerializedArrow {
+  format: 'arrow-ipc';
+  buffer: Uint8Array;
+}
+
+
+/**
+ * Deserialize from JSON to an Arrow table.
+ *
+ * The column data is viewed directly from the received buffer.
+ *
+ * @param obj The deserialized JSON to convert
+ * @param manager The owning widget manager
+ *
+ * @returns A new Arrow table.
+ */
+export
+async function JSONToArrow(obj: IReceivedSerializedArrow | null, manager?: IWidgetManager): Promise<Table | null> {
+  if (obj === null) {
+    return null;
+  }
+  if (obj.format !== 'arrow-ipc') {
+    throw new Error(`Unknown Arrow serialization format: ${obj.format}`);
+  }
+  const arrow = await loadArrow();
+  return arrow.tableFromIPC(new Uint8Array(obj.buffer.buffer, obj.buffer.byteOffset, obj.buffer.byteLength));
+}
+
+
+/**
+ * Serialize to JSON from an Arrow table.
+ *
+ * Tables are only available after apache-arrow has been loaded, either
+ * by deserializing a table, or by calling `loadArrow`.
+ *
+ * @param obj The Arrow table to convert
+ * @param widget The owning widget model
+ *
+ * @returns The JSON object representing the table.
+ */
+export
+function arrowToJSON(obj: Table | null, widget?: WidgetModel): ISendSerializedArrow | null {
+  if (obj === null) {
+    return null;
+  }
+  if (arrowModule === null) {
+    throw new Error('apache-arrow has not been loaded, see loadArrow().');
+  }
+  return { format: 'arrow-ipc', buffer: arrowModule.tableToIPC(obj, 'stream') };
+}
+
+
+/**
+ * Serializers for to/from Arrow tables
+ */
+export
+const arrow_serialization = { deserialize: JSONToArrow, serialize: arrowToJSON };
+
+
+/**
+ * Get a column of an Arrow table as an ndarray.
+ *
+ * Primitive columns with a single chunk and no nulls are viewed
+ * without copying the data.
+ */
+export
+function arrowColumnToArray(table: Table, name: string): ndarray.NdArray | null {
+  const column = table.getChild(name);
+  if (column === null) {
+    return null;
+  }
+  const data = column.toArray() as TypedArray;
+  if (!ArrayBuffer.isView(data)) {
+    throw new Error(`Arrow column '${name}' cannot be represented as a typed array.`);
+  }
+  return ndarray(data, [data.length]);
+}
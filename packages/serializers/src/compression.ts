@@ -16,3 +16,25 @@ export function compress(buffer: ArrayBuffer, level: number): Uint8Array {
 export function decompress(buffer: ArrayBuffer): ArrayBuffer {
   return pako.inflate(new Uint8Array(buffer)).buffer;
 }
+
+/**
+ * Whether the browser supports native, streaming zlib decompression.
+ */
+export function hasNativeDecompression(): boolean {
+  return typeof (self as any).DecompressionStream !== 'undefined';
+}
+
+/**
+ * Decompress a zlib compressed buffer, without blocking the main thread.
+ *
+ * This uses the native DecompressionStream where available, and falls
+ * back to synchronous decompression otherwise.
+ */
+export async function decompressAsync(buffer: ArrayBuffer): Promise<ArrayBuffer> {
+  if (!hasNativeDecompression()) {
+    return decompress(buffer);
+  }
+  const stream = new Blob([buffer]).stream().pipeThrough(
+    new (self as any).DecompressionStream('deflate'));
+  return new Response(stream).arrayBuffer();
+}
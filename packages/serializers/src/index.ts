@@ -5,6 +5,12 @@ export * from './common';
 
 export * from './union';
 
+export * from './table';
+
+export * from './arrow';
+
+export * from './workers';
+
 
 /**
  * The current package version.
@@ -23,6 +23,7 @@ type TypedArrayConstructor = Int8ArrayConstructor | Uint8ArrayConstructor | Int1
 
 export
 interface IArrayLookup {
+    bool: Uint8Array,
     int8: Int8Array,
     int16: Int16Array,
     int32: Int32Array,
@@ -43,6 +44,12 @@ interface IReceivedSerializedArray {
   buffer: DataView;
 }
 
+/**
+ * The encodings that can be applied to a serialized array
+ */
+export
+type ArrayEncoding = 'bitpack' | 'rle' | 'dictionary';
+
 /**
  * The serialized representation of a received, compressed array
  */
@@ -52,6 +59,10 @@ interface IReceivedCompressedSerializedArray {
   dtype: keyof IArrayLookup;
   buffer?: DataView;
   compressed_buffer?: DataView;
+  encoding?: ArrayEncoding;
+  run_lengths?: DataView;
+  dictionary?: DataView;
+  index_dtype?: keyof IArrayLookup;
 }
 
 /**
@@ -135,6 +146,7 @@ const array_serialization = { deserialize: JSONToArray, serialize: arrayToJSON }
 
 export
 const typesToArray = {
+    bool: Uint8Array,
     int8: Int8Array,
     int16: Int16Array,
     int32: Int32Array,
@@ -147,6 +159,48 @@ const typesToArray = {
 }
 
 
+/**
+ * Decode the buffer of an encoded array.
+ *
+ * @param obj The deserialized JSON of the encoded array
+ * @param buffer The (decompressed) encoded payload
+ *
+ * @returns The decoded, flat typed array.
+ */
+export
+function decodeArray(obj: IReceivedCompressedSerializedArray, buffer: ArrayBuffer): TypedArray {
+  const size = obj.shape.reduce((a, b) => a * b, 1);
+  const ctor = typesToArray[obj.dtype];
+  if (obj.encoding === 'bitpack') {
+    const bits = new Uint8Array(buffer);
+    const out = new Uint8Array(size);
+    for (let i = 0; i < size; ++i) {
+      out[i] = (bits[i >> 3] >> (i & 7)) & 1;
+    }
+    return out;
+  } else if (obj.encoding === 'rle') {
+    const values = new ctor(buffer);
+    const lengths = new Uint32Array(obj.run_lengths!.buffer);
+    const out = new ctor(size);
+    let pos = 0;
+    for (let i = 0; i < values.length; ++i) {
+      out.fill(values[i], pos, pos + lengths[i]);
+      pos += lengths[i];
+    }
+    return out;
+  } else if (obj.encoding === 'dictionary') {
+    const indices = new typesToArray[obj.index_dtype!](buffer);
+    const dictionary = new ctor(obj.dictionary!.buffer);
+    const out = new ctor(size);
+    for (let i = 0; i < size; ++i) {
+      out[i] = dictionary[indices[i]];
+    }
+    return out;
+  }
+  throw new Error(`Unknown array encoding: ${obj.encoding}`);
+}
+
+
 export function compressedJSONToArray(
   obj: IReceivedCompressedSerializedArray | null,
   manager?: IWidgetManager
@@ -160,6 +214,9 @@ export function compressedJSONToArray(
   } else {
     buffer = obj.buffer!.buffer;
   }
+  if (obj.encoding !== undefined) {
+    return ndarray(decodeArray(obj, buffer), obj.shape);
+  }
   // obj is {shape: list, dtype: string, array: DataView}
   // return an ndarray object
   return ndarray(new typesToArray[obj.dtype](buffer), obj.shape);
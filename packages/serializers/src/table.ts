@@ -0,0 +1,120 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  WidgetModel, IWidgetManager
+} from '@jupyter-widgets/base';
+
+import {
+  IReceivedCompressedSerializedArray, SendSerializedArray,
+  compressedJSONToArray, arrayToCompressedJSON
+} from './ndarray';
+
+import ndarray = require('ndarray');
+
+
+/**
+ * A table of named columns, all sharing the same number of rows.
+ */
+export
+interface ITable {
+  [name: string]: ndarray.NdArray;
+}
+
+/**
+ * The serialized representation of a received table
+ */
+export
+interface IReceivedSerializedTable {
+  [name: string]: IReceivedCompressedSerializedArray;
+}
+
+/**
+ * The serialized representation of a table for sending
+ */
+export
+interface ISendSerializedTable {
+  [name: string]: SendSerializedArray;
+}
+
+
+/**
+ * Deserialize from JSON to a table of ndarray columns.
+ *
+ * @param obj The deserialized JSON to convert
+ * @param manager The owning widget manager
+ *
+ * @returns A new table object.
+ */
+export
+function JSONToTable(obj: IReceivedSerializedTable | null, manager?: IWidgetManager): ITable | null {
+  if (obj === null) {
+    return null;
+  }
+  const table: ITable = {};
+  for (let name of Object.keys(obj)) {
+    table[name] = compressedJSONToArray(obj[name], manager)!;
+  }
+  return table;
+}
+
+
+/**
+ * Serialize to JSON from a table of ndarray columns.
+ *
+ * @param obj The table to convert
+ * @param widget The owning widget model
+ *
+ * @returns The JSON object representing the table.
+ */
+export
+function tableToJSON(obj: ITable | null, widget?: WidgetModel): ISendSerializedTable | null {
+  if (obj === null) {
+    return null;
+  }
+  const serialized: ISendSerializedTable = {};
+  for (let name of Object.keys(obj)) {
+    serialized[name] = arrayToCompressedJSON(obj[name], widget)!;
+  }
+  return serialized;
+}
+
+
+/**
+ * Serializers for to/from tables of ndarrays
+ */
+export
+const table_serialization = { deserialize: JSONToTable, serialize: tableToJSON };
+
+
+/**
+ * Get the number of elements in one row of a column.
+ */
+export
+function rowStride(column: ndarray.NdArray): number {
+  let stride = 1;
+  for (let i = 1; i < column.shape.length; ++i) {
+    stride *= column.shape[i];
+  }
+  return stride;
+}
+
+
+/**
+ * Copy a buffer of row data into the columns of a table, in-place.
+ *
+ * @param column The column to write into
+ * @param start The first row to write
+ * @param buffer The raw row data, with the same dtype as the column
+ */
+export
+function writeRows(column: ndarray.NdArray, start: number, buffer: DataView): void {
+  const data = column.data as ndarray.TypedArray;
+  const offset = data.byteOffset + start * rowStride(column) * data.BYTES_PER_ELEMENT;
+  if (offset + buffer.byteLength > data.byteOffset + data.byteLength) {
+    throw new Error('Row update out of bounds for table column.');
+  }
+  // Copy bytewise to avoid any alignment constraints on the incoming buffer
+  const target = new Uint8Array(data.buffer, offset, buffer.byteLength);
+  target.set(new Uint8Array(buffer.buffer, buffer.byteOffset, buffer.byteLength));
+}
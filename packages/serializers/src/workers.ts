@@ -0,0 +1,340 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import {
+  IWidgetManager
+} from '@jupyter-widgets/base';
+
+import {
+  decompress, decompressAsync, hasNativeDecompression
+} from './compression';
+
+import {
+  IReceivedCompressedSerializedArray, arrayToCompressedJSON,
+  decodeArray, typesToArray
+} from './ndarray';
+
+import ndarray = require('ndarray');
+
+
+/**
+ * Configuration of the decoding worker pool.
+ */
+export
+interface IWorkerConfig {
+  /**
+   * The maximum number of workers. Set to 0 to decode on the main thread.
+   */
+  poolSize: number;
+
+  /**
+   * Arrays with a smaller payload (in bytes) are decoded on the main
+   * thread, as the overhead of a worker outweighs the benefit.
+   */
+  minBytes: number;
+}
+
+const config: IWorkerConfig = {
+  poolSize: Math.min(4, (typeof navigator !== 'undefined' && navigator.hardwareConcurrency) || 2),
+  minBytes: 1 << 20,
+};
+
+/**
+ * Configure the pool of workers used for decompressing and decoding arrays.
+ */
+export
+function configureWorkers(options: Partial<IWorkerConfig>): void {
+  Object.assign(config, options);
+  // Try workers again, if they failed before
+  workersUnavailable = typeof Worker === 'undefined';
+  // Shrink the pool if needed, idle workers first
+  pool.sort((a, b) => a.pending - b.pending);
+  while (pool.length > config.poolSize) {
+    const entry = pool.pop()!;
+    if (entry.pending === 0) {
+      entry.worker.terminate();
+    } else {
+      entry.retired = true;
+    }
+  }
+}
+
+
+/**
+ * The body of the decoding workers.
+ *
+ * This is stringified to create the workers, so it must be fully
+ * self-contained. It mirrors `decodeArray`.
+ */
+function workerMain() {
+  const types: {[key: string]: any} = {
+    bool: Uint8Array, int8: Int8Array, int16: Int16Array, int32: Int32Array,
+    uint8: Uint8Array, uint16: Uint16Array, uint32: Uint32Array,
+    float32: Float32Array, float64: Float64Array,
+  };
+
+  function inflate(buffer: ArrayBuffer): Promise<ArrayBuffer> {
+    const stream = new Blob([buffer]).stream().pipeThrough(
+      new (self as any).DecompressionStream('deflate'));
+    return new Response(stream).arrayBuffer();
+  }
+
+  function decode(msg: any, buffer: ArrayBuffer): ArrayBuffer {
+    const size = msg.shape.reduce((a: number, b: number) => a * b, 1);
+    const ctor = types[msg.dtype];
+    let out: any;
+    if (msg.encoding === 'bitpack') {
+      const bits = new Uint8Array(buffer);
+      out = new Uint8Array(size);
+      for (let i = 0; i < size; ++i) {
+        out[i] = (bits[i >> 3] >> (i & 7)) & 1;
+      }
+    } else if (msg.encoding === 'rle') {
+      const values = new ctor(buffer);
+      const lengths = new Uint32Array(msg.run_lengths);
+      out = new ctor(size);
+      let pos = 0;
+      for (let i = 0; i < values.length; ++i) {
+        out.fill(values[i], pos, pos + lengths[i]);
+        pos += lengths[i];
+      }
+    } else if (msg.encoding === 'dictionary') {
+      const indices = new types[msg.index_dtype](buffer);
+      const dictionary = new ctor(msg.dictionary);
+      out = new ctor(size);
+      for (let i = 0; i < size; ++i) {
+        out[i] = dictionary[indices[i]];
+      }
+    } else {
+      throw new Error('Unknown array encoding: ' + msg.encoding);
+    }
+    return out.buffer;
+  }
+
+  self.onmessage = (event: MessageEvent) => {
+    const msg = event.data;
+    const ready = msg.compressed ? inflate(msg.buffer) : Promise.resolve(msg.buffer);
+    ready.then((buffer: ArrayBuffer) => {
+      const out = msg.encoding ? decode(msg, buffer) : buffer;
+      (self as any).postMessage({id: msg.id, buffer: out}, [out]);
+    }).catch((error: any) => {
+      (self as any).postMessage({id: msg.id, error: String(error)});
+    });
+  };
+}
+
+
+interface IPoolEntry {
+  worker: Worker;
+  pending: number;
+  retired: boolean;
+  answered: boolean;
+}
+
+interface IPendingTask {
+  resolve: (buffer: ArrayBuffer) => void;
+  reject: (reason: any) => void;
+  entry: IPoolEntry;
+}
+
+const pool: IPoolEntry[] = [];
+const tasks = new Map<number, IPendingTask>();
+let nextTaskId = 0;
+let workerURL: string | null = null;
+let workersUnavailable = typeof Worker === 'undefined';
+
+
+function createWorker(): IPoolEntry | null {
+  try {
+    if (workerURL === null) {
+      const source = `(${workerMain.toString()})()`;
+      workerURL = URL.createObjectURL(new Blob([source], {type: 'text/javascript'}));
+    }
+    const entry = {worker: new Worker(workerURL), pending: 0, retired: false, answered: false};
+    entry.worker.onmessage = (event: MessageEvent) => {
+      entry.answered = true;
+      const task = tasks.get(event.data.id)!;
+      tasks.delete(event.data.id);
+      if (--entry.pending === 0 && entry.retired) {
+        entry.worker.terminate();
+      }
+      if (event.data.error !== undefined) {
+        task.reject(new Error(event.data.error));
+      } else {
+        task.resolve(event.data.buffer);
+      }
+    };
+    entry.worker.onerror = (event: ErrorEvent) => {
+      // E.g. the script failed to load, or an uncaught error in the worker
+      event.preventDefault();
+      if (!entry.answered) {
+        console.warn('Decoding worker failed, decoding on main thread.', event.message);
+        workersUnavailable = true;
+      }
+      failWorker(entry, new Error('Decoding worker failed: ' + event.message));
+    };
+    entry.worker.onmessageerror = () => {
+      failWorker(entry, new Error('Could not receive decoded array from worker'));
+    };
+    return entry;
+  } catch (error) {
+    // E.g. blocked by a content security policy
+    console.warn('Could not create decoding worker, decoding on main thread.', error);
+    workersUnavailable = true;
+    return null;
+  }
+}
+
+
+/**
+ * Retire a failed worker, and reject its pending tasks.
+ *
+ * The tasks can not be retried, as their buffers were transferred to it.
+ */
+function failWorker(entry: IPoolEntry, reason: Error): void {
+  const index = pool.indexOf(entry);
+  if (index !== -1) {
+    pool.splice(index, 1);
+  }
+  entry.retired = true;
+  entry.pending = 0;
+  entry.worker.terminate();
+  tasks.forEach((task, id) => {
+    if (task.entry === entry) {
+      tasks.delete(id);
+      task.reject(reason);
+    }
+  });
+}
+
+
+/**
+ * Get the least busy worker, creating one if below the pool size.
+ */
+function acquireWorker(): IPoolEntry | null {
+  let best: IPoolEntry | null = null;
+  for (let entry of pool) {
+    if (best === null || entry.pending < best.pending) {
+      best = entry;
+    }
+  }
+  if ((best === null || best.pending > 0) && pool.length < config.poolSize) {
+    const entry = createWorker();
+    if (entry !== null) {
+      pool.push(entry);
+      return entry;
+    }
+  }
+  return best;
+}
+
+
+/**
+ * Get an ArrayBuffer with the contents of a view, that can be transferred.
+ *
+ * Views covering a whole buffer are transferred as is, others are copied.
+ */
+function transferable(view: DataView): ArrayBuffer {
+  if (view.byteOffset === 0 && view.byteLength === view.buffer.byteLength) {
+    return view.buffer as ArrayBuffer;
+  }
+  return view.buffer.slice(view.byteOffset, view.byteOffset + view.byteLength) as ArrayBuffer;
+}
+
+
+/**
+ * Decompress and decode a serialized array in a worker.
+ *
+ * The buffers of `obj` are transferred to the worker, and can not be
+ * used afterwards.
+ */
+function decodeInWorker(entry: IPoolEntry, obj: IReceivedCompressedSerializedArray): Promise<ArrayBuffer> {
+  const compressed = obj.compressed_buffer !== undefined;
+  const msg: any = {
+    id: nextTaskId++,
+    shape: obj.shape,
+    dtype: obj.dtype,
+    encoding: obj.encoding,
+    index_dtype: obj.index_dtype,
+    compressed,
+    buffer: transferable(compressed ? obj.compressed_buffer! : obj.buffer!),
+  };
+  const transfer = [msg.buffer];
+  for (let key of ['run_lengths', 'dictionary']) {
+    const view = (obj as any)[key] as DataView | undefined;
+    if (view !== undefined) {
+      msg[key] = transferable(view);
+      transfer.push(msg[key]);
+    }
+  }
+  return new Promise<ArrayBuffer>((resolve, reject) => {
+    tasks.set(msg.id, {resolve, reject, entry});
+    entry.pending++;
+    entry.worker.postMessage(msg, transfer);
+  });
+}
+
+
+function payloadSize(obj: IReceivedCompressedSerializedArray): number {
+  const view = obj.compressed_buffer || obj.buffer!;
+  return view.byteLength;
+}
+
+
+/**
+ * Deserialize a compressed array without blocking the main thread.
+ *
+ * Large payloads that need decompression or decoding are processed in
+ * a pool of web workers (see `configureWorkers`). Where workers are not
+ * available, decompression uses the native DecompressionStream if
+ * possible, and decoding happens on the main thread.
+ *
+ * @returns A promise resolving to a new ndarray object.
+ */
+export
+async function compressedJSONToArrayAsync(
+  obj: IReceivedCompressedSerializedArray | null,
+  manager?: IWidgetManager
+): Promise<ndarray.NdArray | null> {
+  if (obj === null) {
+    return null;
+  }
+  const compressed = obj.compressed_buffer !== undefined;
+  const ctor = typesToArray[obj.dtype];
+  if (!compressed && obj.encoding === undefined) {
+    // Nothing to offload
+    return ndarray(new ctor(obj.buffer!.buffer), obj.shape);
+  }
+  const large = payloadSize(obj) >= config.minBytes;
+  if (large && !workersUnavailable && config.poolSize > 0 &&
+      (!compressed || hasNativeDecompression())) {
+    const entry = acquireWorker();
+    if (entry !== null) {
+      const buffer = await decodeInWorker(entry, obj);
+      return ndarray(new ctor(buffer), obj.shape);
+    }
+  }
+  let buffer: ArrayBuffer;
+  if (compressed) {
+    buffer = large ?
+      await decompressAsync(transferable(obj.compressed_buffer!)) :
+      decompress(obj.compressed_buffer!.buffer);
+  } else {
+    buffer = obj.buffer!.buffer;
+  }
+  if (obj.encoding !== undefined) {
+    return ndarray(decodeArray(obj, buffer), obj.shape);
+  }
+  return ndarray(new ctor(buffer), obj.shape);
+}
+
+
+/**
+ * Serializers for to/from compressed ndarrays, that deserialize
+ * asynchronously (see `compressedJSONToArrayAsync`).
+ */
+export
+const async_compressed_array_serialization = {
+  deserialize: compressedJSONToArrayAsync,
+  serialize: arrayToCompressedJSON
+};
@@ -86,6 +86,57 @@ describe('ndarray', () => {
   });
 
 
+  describe('encoded arrays', () => {
+
+    it('should decode a bit-packed array', () => {
+      let jsonData = {
+        buffer: new DataView(new Uint8Array([0b00000101, 0b1]).buffer),
+        shape: [3, 3],
+        dtype: 'bool',
+        encoding: 'bitpack',
+      } as IReceivedCompressedSerializedArray;
+
+      let array = compressedJSONToArray(jsonData)!;
+
+      expect(array.data).to.be.a(Uint8Array);
+      expect(Array.from(array.data as Uint8Array)).to.eql([1, 0, 1, 0, 0, 0, 0, 0, 1]);
+      expect(array.shape).to.eql([3, 3]);
+    });
+
+    it('should decode a run-length encoded array', () => {
+      let jsonData = {
+        buffer: new DataView(new Int32Array([0, 3, 0]).buffer),
+        run_lengths: new DataView(new Uint32Array([2, 3, 1]).buffer),
+        shape: [2, 3],
+        dtype: 'int32',
+        encoding: 'rle',
+      } as IReceivedCompressedSerializedArray;
+
+      let array = compressedJSONToArray(jsonData)!;
+
+      expect(array.data).to.be.a(Int32Array);
+      expect(Array.from(array.data as Int32Array)).to.eql([0, 0, 3, 3, 3, 0]);
+    });
+
+    it('should decode a dictionary encoded array', () => {
+      let jsonData = {
+        buffer: new DataView(new Uint8Array([1, 0, 2, 1]).buffer),
+        dictionary: new DataView(new Uint16Array([7, 10, 2000]).buffer),
+        index_dtype: 'uint8',
+        shape: [4],
+        dtype: 'uint16',
+        encoding: 'dictionary',
+      } as IReceivedCompressedSerializedArray;
+
+      let array = compressedJSONToArray(jsonData)!;
+
+      expect(array.data).to.be.a(Uint16Array);
+      expect(Array.from(array.data as Uint16Array)).to.eql([10, 7, 2000, 10]);
+    });
+
+  });
+
+
   describe('compressed serializers', () => {
 
     it('should deserialize a non-compressed array', () => {
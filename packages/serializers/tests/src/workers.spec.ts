@@ -0,0 +1,99 @@
+// Copyright (c) Jupyter Development Team.
+// Distributed under the terms of the Modified BSD License.
+
+import expect = require('expect.js');
+
+import {
+  IReceivedCompressedSerializedArray, compressedJSONToArrayAsync,
+  configureWorkers
+} from '../../src'
+
+import pako = require("pako");
+
+
+function compressedRLE(): IReceivedCompressedSerializedArray {
+  const values = new Int32Array([0, 3, 0]);
+  return {
+    compressed_buffer: new DataView(pako.deflate(new Uint8Array(values.buffer)).buffer),
+    run_lengths: new DataView(new Uint32Array([2, 3, 1]).buffer),
+    shape: [2, 3],
+    dtype: 'int32',
+    encoding: 'rle',
+  } as IReceivedCompressedSerializedArray;
+}
+
+
+describe('workers', () => {
+
+  afterEach(() => {
+    configureWorkers({poolSize: 2, minBytes: 1 << 20});
+  });
+
+  it('should deserialize null to null', async () => {
+    const output = await compressedJSONToArrayAsync(null);
+    expect(output).to.be(null);
+  });
+
+  it('should deserialize small arrays on the main thread', async () => {
+    const array = (await compressedJSONToArrayAsync(compressedRLE()))!;
+    expect(array.data).to.be.a(Int32Array);
+    expect(Array.from(array.data as Int32Array)).to.eql([0, 0, 3, 3, 3, 0]);
+    expect(array.shape).to.eql([2, 3]);
+  });
+
+  it('should deserialize arrays in a worker', async () => {
+    configureWorkers({poolSize: 2, minBytes: 0});
+    const array = (await compressedJSONToArrayAsync(compressedRLE()))!;
+    expect(array.data).to.be.a(Int32Array);
+    expect(Array.from(array.data as Int32Array)).to.eql([0, 0, 3, 3, 3, 0]);
+  });
+
+  it('should decompress unencoded arrays in a worker', async () => {
+    configureWorkers({poolSize: 1, minBytes: 0});
+    const raw = new Float32Array([1, 2, 3, 4]);
+    const array = (await compressedJSONToArrayAsync({
+      compressed_buffer: new DataView(pako.deflate(new Uint8Array(raw.buffer)).buffer),
+      shape: [4],
+      dtype: 'float32',
+    } as IReceivedCompressedSerializedArray))!;
+    expect(Array.from(array.data as Float32Array)).to.eql([1, 2, 3, 4]);
+  });
+
+  it('should reject pending tasks of a failing worker', async () => {
+    const OriginalWorker = (window as any).Worker;
+    // A worker that fails to load its script
+    (window as any).Worker = class {
+      onerror: ((event: any) => void) | null = null;
+      postMessage() {
+        setTimeout(() => {
+          this.onerror!({message: 'blocked', preventDefault() {}});
+        }, 0);
+      }
+      terminate() {}
+    };
+    try {
+      configureWorkers({poolSize: 0});
+      configureWorkers({poolSize: 1, minBytes: 0});
+      let error: any = null;
+      try {
+        await compressedJSONToArrayAsync(compressedRLE());
+      } catch (e) {
+        error = e;
+      }
+      expect(error).to.be.an(Error);
+      expect(error.message).to.contain('blocked');
+      // Later arrays are decoded on the main thread
+      const array = (await compressedJSONToArrayAsync(compressedRLE()))!;
+      expect(Array.from(array.data as Int32Array)).to.eql([0, 0, 3, 3, 3, 0]);
+    } finally {
+      (window as any).Worker = OriginalWorker;
+    }
+  });
+
+  it('should decode on the main thread without workers', async () => {
+    configureWorkers({poolSize: 0, minBytes: 0});
+    const array = (await compressedJSONToArrayAsync(compressedRLE()))!;
+    expect(Array.from(array.data as Int32Array)).to.eql([0, 0, 3, 3, 3, 0]);
+  });
+
+});
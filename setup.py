@@ -79,6 +79,12 @@ setup_args = dict(
         'traittypes>=0.2.0',
     ],
     extras_require = {
+        'arrow': [
+            'pyarrow',
+        ],
+        'image': [
+            'Pillow',
+        ],
         'test': [
             'pytest>=4',
             'pytest-cov',